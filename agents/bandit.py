@@ -0,0 +1,142 @@
+# agents/bandit.py
+"""
+Multi-armed bandits that pick a brand's USP and creative lens each round
+from how consumers reacted to earlier campaigns, instead of rotating
+through them in a fixed order.
+
+Each reaction to a campaign is one pull of the arms that produced it, with
+reward 1 for LIKE or SHARE and 0 for IGNORE (the engagement rate served by
+/analytics). USP and lens are learned by separate bandits, so every
+campaign updates both and neither needs to see every combination.
+
+    scheduler = make_scheduler("thompson", usps, lenses)
+    usp, lens = scheduler.choose()
+    ...
+    scheduler.update(usp, lens, ["LIKE", "IGNORE", ...])
+"""
+
+import math
+import os
+import random
+
+# "thompson", "ucb", or unset/"off" to keep the round-robin USP rotation
+BANDIT = os.getenv("MARKETMIND_BANDIT", "").lower()
+
+REWARDS = {"LIKE": 1.0, "SHARE": 1.0, "IGNORE": 0.0}
+
+
+class Bandit:
+    """Per-arm pull counts and reward sums; subclasses decide how to choose."""
+
+    def __init__(self, arms: list, rng=None):
+        self.arms    = list(dict.fromkeys(arms))
+        self.rng     = rng or random
+        self.pulls   = {arm: 0 for arm in self.arms}
+        self.rewards = {arm: 0.0 for arm in self.arms}
+
+    def choose(self):
+        raise NotImplementedError
+
+    def update(self, arm, reward: float, pulls: int = 1):
+        """Credit `arm` with `pulls` outcomes whose rewards sum to `reward`."""
+        if arm not in self.pulls:
+            return
+        self.pulls[arm]   += pulls
+        self.rewards[arm] += reward
+
+    def mean(self, arm) -> float:
+        return self.rewards[arm] / self.pulls[arm] if self.pulls[arm] else 0.0
+
+    def best(self):
+        """Arm with the highest observed mean reward (None before any feedback)."""
+        tried = [a for a in self.arms if self.pulls[a]]
+        return max(tried, key=self.mean) if tried else None
+
+    def state(self) -> dict:
+        return {"pulls": dict(self.pulls), "rewards": dict(self.rewards)}
+
+    def load_state(self, state: dict):
+        for arm in self.arms:
+            self.pulls[arm]   = state.get("pulls", {}).get(arm, 0)
+            self.rewards[arm] = state.get("rewards", {}).get(arm, 0.0)
+
+
+class ThompsonBandit(Bandit):
+    """Beta-Bernoulli Thompson sampling with a uniform Beta(1, 1) prior."""
+
+    def choose(self):
+        return max(
+            self.arms,
+            key=lambda a: self.rng.betavariate(1.0 + self.rewards[a], 1.0 + self.pulls[a] - self.rewards[a])
+        )
+
+
+class UCBBandit(Bandit):
+    """UCB1: untried arms first, then mean reward plus an exploration bonus."""
+
+    def __init__(self, arms: list, rng=None, exploration: float = math.sqrt(2)):
+        super().__init__(arms, rng)
+        self.exploration = exploration
+
+    def choose(self):
+        untried = [a for a in self.arms if not self.pulls[a]]
+        if untried:
+            return self.rng.choice(untried)
+        total = sum(self.pulls.values())
+        return max(
+            self.arms,
+            key=lambda a: self.mean(a) + self.exploration * math.sqrt(math.log(total) / self.pulls[a])
+        )
+
+
+_BANDITS = {"thompson": ThompsonBandit, "ucb": UCBBandit}
+
+
+class CampaignScheduler:
+    """A USP bandit and a lens bandit for one brand."""
+
+    def __init__(self, kind: str, usps: list, lenses: list, rng=None):
+        if kind not in _BANDITS:
+            raise ValueError(f"Unknown bandit {kind!r}; use one of {', '.join(_BANDITS)}")
+        self.kind   = kind
+        self.usp    = _BANDITS[kind](usps, rng)
+        self.lens   = _BANDITS[kind](lenses, rng) if lenses else None
+
+    def choose(self) -> tuple:
+        """(usp, lens) for the next campaign; lens is None if the brand has none."""
+        return self.usp.choose(), (self.lens.choose() if self.lens else None)
+
+    def update(self, usp: str, lens: str, actions: list):
+        """Feed back the actions consumers took on a campaign made with (usp, lens)."""
+        if not actions:
+            return
+        reward = sum(REWARDS.get(a, 0.0) for a in actions)
+        self.usp.update(usp, reward, len(actions))
+        if self.lens and lens is not None:
+            self.lens.update(lens, reward, len(actions))
+
+    def summary(self) -> dict:
+        def arms(bandit):
+            return {a: {"pulls": bandit.pulls[a], "mean": round(bandit.mean(a), 3)} for a in bandit.arms}
+        return {
+            "kind": self.kind,
+            "best_usp": self.usp.best(),
+            "best_lens": self.lens.best() if self.lens else None,
+            "usps": arms(self.usp),
+            "lenses": arms(self.lens) if self.lens else {},
+        }
+
+    def state(self) -> dict:
+        return {"usp": self.usp.state(), "lens": self.lens.state() if self.lens else None}
+
+    def load_state(self, state: dict):
+        self.usp.load_state(state.get("usp") or {})
+        if self.lens and state.get("lens"):
+            self.lens.load_state(state["lens"])
+
+
+def make_scheduler(kind: str, usps: list, lenses: list = None, rng=None):
+    """CampaignScheduler for `kind`, or None when kind is empty/"off"."""
+    if not kind or kind == "off":
+        return None
+    return CampaignScheduler(kind, usps, lenses or [], rng)
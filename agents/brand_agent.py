@@ -1,15 +1,15 @@
 # agents/brand_agent.py
 
 import re
-import random
-import requests
-import difflib
-import os
-from datetime import datetime
-from xml.etree import ElementTree as ET
-from xml.dom import minidom
-from collections import deque
-from llm.local_inference import UIUCChatLLM
+from collections import Counter, deque
+from llm.backends import LLMBackend, get_default_llm
+from llm.stopping import STREAMING
+from agents.similarity import MinHashLSH
+from agents.parsing import MAX_REASKS, PARSE_STATS, captions_complete, parse_captions, reask
+from agents.sinks import ResponseSink, get_default_sink
+from agents.bandit import BANDIT, make_scheduler
+from tracing import traced
+from simulation import determinism
 
 _WORD_RE = re.compile(r"[A-Za-z']+")
 
@@ -19,14 +19,29 @@ def _tokens(text: str):
 def _trigrams(tokens):
     return [" ".join(tokens[i:i+3]) for i in range(len(tokens) - 2)]
 
-# --- New: Softer, dynamic prompt template ---
-_PROMPT_TEMPLATE = """
+_HASHTAG_RE = re.compile(r"#\w+")
+
+# Prompt in two parts: the brand's static prefix, compiled once per agent and
+# identical on every call (so a prefix-caching backend can reuse it), then
+# the parts that change from call to call.
+_PROMPT_PREFIX = """
 You are crafting fresh social captions for the sports-footwear brand {brand_name}.
 
 Brand essence snapshot:
 Vision: {vision_short}
 Mission: {mission_short}
 Core values: {core_vals_short}
+
+Soft guidelines (we’ll post-process):
+- 140–200 characters ideally
+- 1 relevant emoji (not at very start)
+- 1 call-to-action (vary verbs over time)
+- 2 on-brand hashtags (no spam)
+- Do not start with same first 2–3 words as any recent opener
+- No quotation marks around the entire caption
+""".strip()
+
+_PROMPT_SUFFIX = """
 Current USP focus: {usp}
 
 Avoid echoing these recent openers:
@@ -41,41 +56,67 @@ Creative lens for this round:
 Produce TWO distinct Instagram captions, marked as:
 <<A>> caption text
 <<B>> caption text
-
-Soft guidelines (we’ll post-process):
-- 140–200 characters ideally
-- 1 relevant emoji (not at very start)
-- 1 call-to-action (vary verbs over time)
-- 2 on-brand hashtags (no spam)
-- Do not start with same first 2–3 words as any recent opener
-- No quotation marks around the entire caption
 Nothing else.
 """.strip()
 
 class BrandAgent:
     """
     BrandAgent with dynamic prompts, n-gram & fuzzy dedupe,
-    posts campaigns via API, and writes XML.
+    and hands its campaigns to a response sink (the campaign store by default).
     """
 
     def __init__(
         self,
         profile: dict,
-        llm: UIUCChatLLM = None,
+        llm: LLMBackend = None,
         similarity_threshold: float = 0.75,
         trigram_overlap_threshold: float = 0.35,
-        trigram_memory_size: int = 60
+        trigram_memory_size: int = 60,
+        similarity_horizon: int = 200,
+        sink: ResponseSink = None,
+        bandit: str = BANDIT
     ):
         self.profile  = profile
         self.name     = profile.get("name", "UnknownBrand")
-        self.llm      = llm or UIUCChatLLM()
+        self._llm     = llm   # None: the shared default client, built on first use
+        self.sink     = sink or get_default_sink()
         self.similarity_threshold      = similarity_threshold
         self.trigram_overlap_threshold = trigram_overlap_threshold
-        self.history  = []  # List of {"id","caption","usp","timestamp"}
-
-        # memory for diversity
-        self.recent_captions = deque(maxlen=trigram_memory_size)
-        self.trigram_memory  = set()
+        self.history  = []  # List of {"id","caption","usp","timestamp","round","lens"}
+        # Optional bandit choosing USP and lens from reaction feedback
+        # (see agents.bandit); None keeps the round-robin USP rotation
+        self.rng       = determinism.rng_for(f"brand:{self.name}")
+        self.scheduler = make_scheduler(bandit, profile.get("usps", []), profile.get("creative_lenses", []),
+                                        self.rng)
+
+        # memory for diversity: trigram counts cover exactly recent_captions,
+        # the LSH index the last `similarity_horizon` captions
+        self.recent_captions  = deque(maxlen=trigram_memory_size)
+        self.trigram_memory   = Counter()
+        self.similarity_index = MinHashLSH(horizon=similarity_horizon)
+        # prompt inputs kept up to date as captions are recorded
+        self.recent_openers   = deque(maxlen=5)   # first 5 words of the last captions
+        self.recent_hashtags  = deque(maxlen=8)   # hashtags of the last history records
+        self.prompt_prefix    = self._compile_prefix()
+
+    @property
+    def llm(self) -> LLMBackend:
+        if self._llm is None:
+            self._llm = get_default_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value: LLMBackend):
+        self._llm = value
+
+    def _compile_prefix(self) -> str:
+        core_vals = "; ".join(f"{k} — {v}" for k, v in self.profile.get("core_values", {}).items())
+        return _PROMPT_PREFIX.format(
+            brand_name=self.name,
+            vision_short=self.profile.get("vision", "")[:90],
+            mission_short=self.profile.get("mission", "")[:90],
+            core_vals_short=core_vals[:120]
+        )
 
     # ——— Diversity Helpers ———
 
@@ -91,55 +132,65 @@ class BrandAgent:
         return self._trigram_overlap(caption) > self.trigram_overlap_threshold
 
     def _update_trigram_memory(self, caption: str):
+        if len(self.recent_captions) == self.recent_captions.maxlen:
+            # the oldest caption is about to fall out of the window
+            self.trigram_memory.subtract(_trigrams(_tokens(self.recent_captions[0])))
+            self.trigram_memory += Counter()  # drop zero counts
         self.recent_captions.append(caption)
-        toks = _tokens(caption)
-        for tg in _trigrams(toks):
-            self.trigram_memory.add(tg)
+        self.trigram_memory.update(_trigrams(_tokens(caption)))
+        words = caption.split()
+        if words:
+            self.recent_openers.append(" ".join(words[:5]))
+        self.similarity_index.add(caption)
+
+    def _remember(self, record: dict):
+        """Add a posted campaign to history and every structure derived from it."""
+        self.history.append(record)
+        self.recent_hashtags.append(_HASHTAG_RE.findall(record["caption"]))
+        self._update_trigram_memory(record["caption"])
+
+    def reset_memory(self):
+        """Forget history and caption memory (e.g. before replaying a checkpoint)."""
+        self.history = []
+        self.recent_captions.clear()
+        self.trigram_memory.clear()
+        self.similarity_index.clear()
+        self.recent_openers.clear()
+        self.recent_hashtags.clear()
 
     def _is_too_similar(self, candidate: str) -> bool:
-        for record in self.history:
-            prev = record["caption"]
+        import difflib  # only needed once captions start to look alike
+        # LSH narrows the window to near-duplicates; difflib confirms them
+        for prev in self.similarity_index.candidates(candidate):
             if difflib.SequenceMatcher(None, candidate, prev).ratio() >= self.similarity_threshold:
                 return True
         return False
 
     # ——— Main Generation ———
 
-    def generate_campaign(self, focus_usp: str = None) -> str:
+    @traced("brand.generate_campaign")
+    def generate_campaign(self, focus_usp: str = None, round_no: int = None, campaign_id: int = None) -> str:
         usps = self.profile.get("usps", [])
         if not usps:
             raise ValueError("Profile must include at least one USP")
-        usp = focus_usp if focus_usp in usps else usps[0]
-
-        # build core context
-        vision  = self.profile.get("vision", "")
-        mission = self.profile.get("mission", "")
-        core_vals = "; ".join(f"{k} — {v}" for k, v in self.profile.get("core_values", {}).items())
-
-        # gather recent openers (first 5 words) & hashtags
-        recent_openers = []
-        for c in list(self.recent_captions)[-5:]:
-            words = c.split()
-            if words:
-                recent_openers.append(" ".join(words[:5]))
-        recent_openers_str = "\n".join(f"- {o}" for o in recent_openers) or "- None"
-
-        hashtags = set()
-        for rec in self.history[-8:]:
-            tags = re.findall(r"#\w+", rec["caption"])
-            hashtags.update(tags)
+        lens = None
+        if self.scheduler is not None and focus_usp not in usps:
+            usp, lens = self.scheduler.choose()
+        else:
+            usp = focus_usp if focus_usp in usps else usps[0]
+
+        recent_openers_str = "\n".join(f"- {o}" for o in self.recent_openers) or "- None"
+        hashtags = set().union(*self.recent_hashtags)
         recent_hashtags_str = "\n".join(f"- {h}" for h in sorted(hashtags)) or "- None"
 
-        # pick a creative lens from profile
+        # pick a creative lens from profile (unless the scheduler chose one)
         lenses = self.profile.get("creative_lenses", [])
-        lens_line = random.choice(lenses) if lenses else "No lens provided"
+        if lens is None and lenses:
+            lens = self.rng.choice(lenses)
+        lens_line = lens or "No lens provided"
 
-        # assemble the dynamic prompt
-        prompt = _PROMPT_TEMPLATE.format(
-            brand_name=self.name,
-            vision_short=vision[:90],
-            mission_short=mission[:90],
-            core_vals_short=core_vals[:120],
+        # static prefix first, then this call's details
+        prompt = self.prompt_prefix + "\n\n" + _PROMPT_SUFFIX.format(
             usp=usp,
             recent_openers=recent_openers_str,
             recent_hashtags=recent_hashtags_str,
@@ -148,20 +199,26 @@ class BrandAgent:
 
         # ask the LLM
         try:
-            raw = self.llm.generate(prompt, temperature=0.7).strip()
+            raw = self.llm.generate(prompt, temperature=0.7, stop=captions_complete if STREAMING else None).strip()
         except Exception as e:
             print(f"[Warning] LLM error, falling back: {e}")
-            return self._fallback_caption(usp)
-
-        # parse <<A>> / <<B>> lines
-        options = []
-        for line in raw.splitlines():
-            m = re.match(r"<<[AB]>>\s*(.+)", line)
-            if m:
-                options.append(m.group(1).strip())
-        options = list(dict.fromkeys(options))
+            return self._fallback_caption(usp, lens, round_no, campaign_id)
+
+        # parse <<A>> / <<B>> captions, re-asking once for the format if none are found
+        options = parse_captions(raw)
+        outcome = "ok"
+        for _ in range(MAX_REASKS if not options else 0):
+            try:
+                raw = reask(self.llm, raw, "two captions", "<<A>> caption text\n<<B>> caption text",
+                            stop=captions_complete if STREAMING else None)
+            except Exception as e:
+                print(f"[Warning] LLM error on re-ask: {e}")
+                break
+            options = parse_captions(raw)
+            outcome = "reasked"
+        PARSE_STATS.count("captions", outcome if options else "failed")
         if not options:
-            return self._fallback_caption(usp)
+            return self._fallback_caption(usp, lens, round_no, campaign_id)
 
         # apply filters
         ngram_filtered = [o for o in options if not self._too_many_trigram_repeats(o)]
@@ -169,56 +226,50 @@ class BrandAgent:
         candidates = fuzzy_filtered or ngram_filtered or options
 
         # choose & record
-        caption     = random.choice(candidates)
-        campaign_id = int(datetime.utcnow().timestamp() * 1000)
-        timestamp   = datetime.utcnow().isoformat()
-        record = {"id": campaign_id, "caption": caption, "usp": usp, "timestamp": timestamp}
-        self.history.append(record)
-        self._update_trigram_memory(caption)
-
-        # persist & post
-        self._post_to_api(record)
-        self._write_campaign_xml(record)
+        caption     = self.rng.choice(candidates)
+        campaign_id = campaign_id or determinism.next_id()
+        timestamp   = determinism.now().isoformat()
+        record = {"id": campaign_id, "caption": caption, "usp": usp, "timestamp": timestamp, "round": round_no,
+                  "lens": lens}
+        self._remember(record)
+
+        # persist
+        self._persist(record)
         return caption
 
     # ——— Fallback & Persistence ———
 
-    def _fallback_caption(self, usp: str) -> str:
+    def _fallback_caption(self, usp: str, lens: str = None, round_no: int = None, campaign_id: int = None) -> str:
         tag = "#" + self.name.replace(" ", "")
         caption = f"{self.name} {usp}! 🔥 Step up your game. {tag}"
-        cid = int(datetime.utcnow().timestamp() * 1000)
-        ts  = datetime.utcnow().isoformat()
-        record = {"id": cid, "caption": caption, "usp": usp, "timestamp": ts}
-        self.history.append(record)
-        self._update_trigram_memory(caption)
-        self._post_to_api(record)
-        self._write_campaign_xml(record)
+        cid = campaign_id or determinism.next_id()
+        ts  = determinism.now().isoformat()
+        record = {"id": cid, "caption": caption, "usp": usp, "timestamp": ts, "round": round_no, "lens": lens}
+        self._remember(record)
+        self._persist(record)
         return caption
 
-    def _post_to_api(self, record: dict):
-        payload = {"brand_name": self.name, **record}
-        try:
-            resp = requests.post("http://localhost:8000/campaigns/", json=payload, timeout=10)
-            resp.raise_for_status()
-        except Exception as e:
-            print(f"[Warning] Failed to post campaign: {e}")
-
-    def _write_campaign_xml(self, record: dict):
-        base_dir = os.path.join(os.path.dirname(__file__), "brand_responses", self.name)
-        os.makedirs(base_dir, exist_ok=True)
-        root = ET.Element("campaign")
-        for k, v in record.items():
-            ET.SubElement(root, k).text = str(v)
-        ET.SubElement(root, "brand_name").text = self.name
-        xml_bytes = ET.tostring(root, encoding="utf-8")
-        pretty   = minidom.parseString(xml_bytes).toprettyxml(indent="  ")
-        path     = os.path.join(base_dir, f"{record['id']}.xml")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(pretty)
+    def _persist(self, record: dict):
+        self.sink.write_campaign({"brand_name": self.name, **record})
 
     # ——— Utility ———
 
+    def record_feedback(self, campaign_id: int, actions: list):
+        """Pass consumers' actions on one of this brand's campaigns to the scheduler."""
+        if self.scheduler is None or not actions:
+            return
+        for record in reversed(self.history):
+            if record["id"] == campaign_id:
+                self.scheduler.update(record["usp"], record.get("lens"), actions)
+                return
+
+    def reseed(self):
+        """Restart this brand's random stream from the current seed (seeded mode only)."""
+        determinism.reseed(self.rng, f"brand:{self.name}")
+
     def cycle_usp(self):
+        if self.scheduler is not None:
+            return  # the scheduler picks the USP for every campaign
         usps = self.profile.get("usps", [])
         if usps:
             usps.append(usps.pop(0))
@@ -229,5 +280,6 @@ class BrandAgent:
         return {
             "brand_name":    self.name,
             "campaigns_run": len(self.history),
-            "last_usp":      last
+            "last_usp":      last,
+            **({"bandit": self.scheduler.summary()} if self.scheduler else {})
         }
\ No newline at end of file
@@ -3,17 +3,26 @@
 import json
 import glob
 import os
-from xml.etree import ElementTree as ET
-from xml.dom import minidom
-from llm.local_inference import UIUCChatLLM
+from collections import deque
+from llm.backends import LLMBackend, get_default_llm
+from llm.stopping import STREAMING, closed_json_object, closed_json_array
+from agents.parsing import MAX_REASKS, PARSE_STATS, parse_reaction, parse_reactions, reask
+from agents.sinks import ResponseSink, get_default_sink
+from tracing import traced
+from simulation import determinism
 
-def load_consumer_profiles() -> dict:
+_REACTION_FORMAT = '{"thought": "<one-sentence reasoning>", "action": "LIKE"|"SHARE"|"IGNORE"}'
+_BATCH_FORMAT    = '[{"post_id": <post_id>, "thought": "<one-sentence reasoning>", "action": "LIKE"|"SHARE"|"IGNORE"}]'
+_LLM_ERROR       = {"thought": "LLM error; defaulting to IGNORE.", "action": "IGNORE"}
+
+def load_consumer_profiles(folder: str = None) -> dict:
     """
-    Discover and load all consumer profile JSON files from agents/consumer_profiles.
+    Discover and load all consumer profile JSON files from `folder`
+    (default: agents/consumer_profiles).
     Returns a map of consumer_id -> profile dict.
     """
     profiles = {}
-    base = os.path.join(os.path.dirname(__file__), "consumer_profiles")
+    base = folder or os.path.join(os.path.dirname(__file__), "consumer_profiles")
     for filepath in glob.glob(os.path.join(base, "*.json")):
         with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -29,37 +38,73 @@ class ConsumerAgent:
     ConsumerAgent represents an individual consumer with a dynamic personality profile.
     It uses an LLM to generate an internal thought process and an action
     (LIKE, SHARE, or IGNORE) for each campaign post it evaluates, and
-    writes each reaction out as an XML file.
+    hands each reaction to a response sink (the campaign store by default).
     """
 
-    def __init__(self, profile: dict, llm: UIUCChatLLM = None):
+    # Slotted so large populations (see agents.population) stay light.
+    __slots__ = ("id", "name", "demographics", "daily_needs", "traits",
+                 "threshold", "_llm", "sink", "history", "_persona_text")
+
+    def __init__(
+        self,
+        profile: dict,
+        llm: LLMBackend = None,
+        sink: ResponseSink = None,
+        history_size: int = None
+    ):
         self.id           = profile["id"]
         self.name         = profile.get("name", "UnknownConsumer")
         self.demographics = profile.get("demographics", {})
         self.daily_needs  = profile.get("daily_needs", [])
         self.traits       = profile.get("personality_traits", {})
         self.threshold    = profile.get("decision_threshold", 0.5)
-        self.llm          = llm or UIUCChatLLM()
-        self.history      = []  # List of dicts: {post_id, thought, action}
+        self._llm         = llm   # None: the shared default client, built on first use
+        self.sink         = sink or get_default_sink()
+        # Dicts {post_id, thought, action}; history_size keeps only the latest N
+        self.history      = deque(maxlen=history_size)
+        self._persona_text = None
 
-    def evaluate_post(self, post: dict) -> dict:
+    @property
+    def llm(self) -> LLMBackend:
+        if self._llm is None:
+            self._llm = get_default_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value: LLMBackend):
+        self._llm = value
+
+    def _persona(self) -> str:
         """
-        Evaluate a single campaign post via the LLM.
-        Builds a dynamic prompt from the consumer's profile and the post.
-        Returns a dict with keys: post_id, thought, action.
-        Also writes an XML file under agents/consumer_responses/{consumer_id}/{post_id}.xml
+        Persona block that opens every prompt. Built on first use and reused,
+        so all of this consumer's prompts share the same leading text.
         """
-        # Build dynamic prompt
+        if self._persona_text is None:
+            self._persona_text = self._compile_persona()
+        return self._persona_text
+
+    def _compile_persona(self) -> str:
         demo = self.demographics
         needs = "; ".join(self.daily_needs)
         traits = ", ".join(f"{k}={v}" for k, v in self.traits.items())
-
-        prompt = f"""
+        return f"""
 You are {self.name}, a consumer with this background:
 - Age: {demo.get('age')} | Gender: {demo.get('gender', 'N/A')} | Education: {demo.get('education_level', 'N/A')} 
   Occupation: {demo.get('occupation', 'N/A')} | Income: {demo.get('income_range', 'N/A')} | Location: {demo.get('location', 'N/A')}
 - Daily needs: {needs}
 - Personality traits: {traits}
+""".strip()
+
+    @traced("consumer.evaluate_post")
+    def evaluate_post(self, post: dict) -> dict:
+        """
+        Evaluate a single campaign post via the LLM.
+        Builds a dynamic prompt from the consumer's profile and the post.
+        Returns a dict with keys: post_id, thought, action.
+        """
+        # Build dynamic prompt
+        prompt = f"""
+{self._persona()}
 
 Here is a brand campaign post:
 - Caption: "{post.get('caption')}"
@@ -69,23 +114,51 @@ Think step-by-step about this post considering your background and needs.
 Then decide whether to LIKE, SHARE, or IGNORE it.
 
 Respond in JSON exactly as:
-{{"thought": "<one-sentence reasoning>", "action": "LIKE"|"SHARE"|"IGNORE"}}
+{_REACTION_FORMAT}
 """.strip()
 
-        # Call LLM
-        raw = self.llm.generate(prompt).strip()
-
-        # Parse JSON (fallback to IGNORE)
+        # Call LLM, stopping once the JSON object is complete
         try:
-            result = json.loads(raw)
-        except json.JSONDecodeError:
+            raw = self.llm.generate(prompt, stop=closed_json_object if STREAMING else None).strip()
+        except Exception as e:
+            # e.g. a CacheMiss when replaying a cache recorded with other prompts
+            print(f"[Warning] LLM error, defaulting to IGNORE: {e}")
+            return self.record_reaction(post, _LLM_ERROR)
+
+        # Parse tolerantly, re-ask for the format if needed (fallback to IGNORE)
+        result = self._read_reaction(raw)
+        if result is None:
             result = {
                 "thought": "Could not parse response; defaulting to IGNORE.",
                 "action": "IGNORE"
             }
+        return self.record_reaction(post, result)
 
+    def _read_reaction(self, raw: str):
+        result, repaired = parse_reaction(raw)
+        outcome = "repaired" if repaired else "ok"
+        for _ in range(MAX_REASKS if result is None else 0):
+            try:
+                raw = reask(self.llm, raw, "a JSON reaction", _REACTION_FORMAT,
+                            stop=closed_json_object if STREAMING else None)
+            except Exception as e:
+                print(f"[Warning] LLM error on re-ask: {e}")
+                break
+            result, _ = parse_reaction(raw)
+            outcome = "reasked"
+            if result is not None:
+                break
+        PARSE_STATS.count("reaction", outcome if result is not None else "failed")
+        return result
+
+    def record_reaction(self, post: dict, result: dict) -> dict:
+        """
+        Sanitize a {thought, action} result for `post` (from the LLM or a
+        surrogate scorer), save it to history and persist it.
+        Returns the reaction record.
+        """
         # Extract & sanitize
-        action = result.get("action", "IGNORE").upper()
+        action = str(result.get("action", "IGNORE")).upper()
         if action not in ("LIKE", "SHARE", "IGNORE"):
             action = "IGNORE"
         thought = result.get("thought", "No thought provided.")
@@ -100,45 +173,90 @@ Respond in JSON exactly as:
         # Save to history
         self.history.append(record)
 
-        # Write XML side-effect
-        self._write_response_xml(record)
+        # Persist (buffered; the sink writes in batches)
+        # (traits feed the store's per-segment engagement rollups)
+        self.sink.write_reaction({"consumer_id": self.id, **record, "timestamp": determinism.now().isoformat(),
+                                  "traits": self.traits})
 
         return record
 
-    def batch_evaluate(self, posts: list) -> list:
+    @traced("consumer.batch_evaluate")
+    def batch_evaluate(self, posts: list, batch_size: int = 8) -> list:
         """
-        Evaluate a list of posts in sequence and return a list of reaction dicts.
+        Evaluate a list of posts and return a list of reaction dicts in post order.
+        Up to `batch_size` posts are judged by a single LLM call that sends the
+        persona once; batch_size=1 evaluates each post with its own call.
         """
         reactions = []
-        for post in posts:
-            reactions.append(self.evaluate_post(post))
+        step = max(1, batch_size)
+        for i in range(0, len(posts), step):
+            reactions.extend(self._evaluate_chunk(posts[i:i + step]))
         return reactions
 
-    def _write_response_xml(self, record: dict):
+    def _evaluate_chunk(self, posts: list) -> list:
         """
-        Given a record {'post_id', 'thought', 'action'}, write it to
-        agents/consumer_responses/{consumer_id}/{post_id}.xml
+        Judge `posts` in one call. Posts missing from the reply are retried on
+        their own; if nothing could be parsed the chunk is split in half, which
+        bottoms out at one evaluate_post call per post.
         """
-        # Ensure output folder exists
-        out_dir = os.path.join(
-            os.path.dirname(__file__),
-            "consumer_responses",
-            self.id
+        if len(posts) == 1:
+            return [self.evaluate_post(posts[0])]
+
+        stop = closed_json_array if STREAMING else None
+        try:
+            raw = self.llm.generate(self._batch_prompt(posts), stop=stop).strip()
+        except Exception as e:
+            # Splitting the chunk would only repeat the error once per post
+            print(f"[Warning] LLM error, defaulting {len(posts)} post(s) to IGNORE: {e}")
+            return [self.record_reaction(post, _LLM_ERROR) for post in posts]
+        results, repaired = parse_reactions(raw)
+        outcome = "repaired" if repaired else "ok"
+        for _ in range(MAX_REASKS if not results else 0):
+            try:
+                raw = reask(self.llm, raw, "a JSON array of reactions", _BATCH_FORMAT, stop=stop)
+            except Exception as e:
+                print(f"[Warning] LLM error on re-ask: {e}")
+                break
+            results, _ = parse_reactions(raw)
+            outcome = "reasked"
+            if results:
+                break
+        PARSE_STATS.count("batch", outcome if results else "failed")
+
+        by_id = {}
+        for post in posts:
+            result = results.get(str(post.get("id")))
+            if result is not None:
+                by_id[id(post)] = self.record_reaction(post, result)
+
+        missing = [p for p in posts if id(p) not in by_id]
+        if missing:
+            if len(missing) == len(posts):
+                mid = len(posts) // 2
+                retried = self._evaluate_chunk(posts[:mid]) + self._evaluate_chunk(posts[mid:])
+            else:
+                retried = self._evaluate_chunk(missing)
+            for post, record in zip(missing, retried):
+                by_id[id(post)] = record
+
+        return [by_id[id(p)] for p in posts]
+
+    def _batch_prompt(self, posts: list) -> str:
+        listing = "\n".join(
+            f"""[post_id: {post.get('id')}]
+- Caption: "{post.get('caption')}"
+- USP: {post.get('usp')}"""
+            for post in posts
         )
-        os.makedirs(out_dir, exist_ok=True)
-
-        # Build XML tree
-        root = ET.Element("reaction")
-        ET.SubElement(root, "consumer_id").text = self.id
-        ET.SubElement(root, "post_id").text     = str(record["post_id"])
-        ET.SubElement(root, "thought").text     = record["thought"]
-        ET.SubElement(root, "action").text      = record["action"]
-
-        # Pretty-print XML
-        xml_bytes = ET.tostring(root, encoding="utf-8")
-        pretty = minidom.parseString(xml_bytes).toprettyxml(indent="  ")
-
-        # Write to file named by post_id
-        path = os.path.join(out_dir, f"{record['post_id']}.xml")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(pretty)
\ No newline at end of file
+        return f"""
+{self._persona()}
+
+Here are {len(posts)} brand campaign posts:
+{listing}
+
+For each post, think briefly about it considering your background and needs.
+Then decide whether to LIKE, SHARE, or IGNORE it.
+
+Respond with a JSON array only, one object per post, exactly as:
+{_BATCH_FORMAT}
+""".strip()
@@ -0,0 +1,251 @@
+# agents/parsing.py
+"""
+Tolerant parsing of LLM replies. Models wrap JSON in code fences, add
+commentary, use single quotes or trailing commas, and break captions over
+several lines; the parsers here recover what they can before a reply is
+written off. When nothing can be recovered, reask() sends the reply back
+once with a short formatting-only prompt instead of repeating the full call.
+
+Every parse is counted in PARSE_STATS (ok / repaired / reasked / failed per
+kind), so the share of wasted calls is visible at the end of a run.
+"""
+
+import json
+import os
+import re
+import threading
+
+# Formatting re-asks per reply before falling back (0 disables them).
+MAX_REASKS = int(os.getenv("MARKETMIND_PARSE_REASKS", "1"))
+
+ACTIONS = ("LIKE", "SHARE", "IGNORE")
+
+_FENCE_RE      = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_TRAILING_RE   = re.compile(r",\s*([}\]])")
+_BARE_KEY_RE   = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)\s*:")
+_ACTION_RE     = re.compile(r"""["']?action["']?\s*[:=]\s*["']?\s*([A-Za-z]+)""", re.IGNORECASE)
+_THOUGHT_RE    = re.compile(r"""["']?thought["']?\s*[:=]\s*["']?(.+?)["']?\s*(?:[,}\n]|$)""", re.IGNORECASE)
+_ACTION_WORD_RE = re.compile(r"\b(LIKE|SHARE|IGNORE)\b")
+_CAPTION_TAG_RE = re.compile(
+    r"(?:^|\n)[ \t>*_#-]*(?:<<\s*([AB])\s*>>|(?:Caption|Option)\s+([AB])\s*[:.)-])[*_:]*[ \t]*",
+    re.IGNORECASE
+)
+
+
+class ParseStats:
+    """Thread-safe outcome counters per reply kind."""
+
+    OUTCOMES = ("ok", "repaired", "reasked", "failed")
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._counts = {}
+
+    def count(self, kind: str, outcome: str):
+        with self._lock:
+            per_kind = self._counts.setdefault(kind, dict.fromkeys(self.OUTCOMES, 0))
+            per_kind[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {kind: dict(c) for kind, c in self._counts.items()}
+        for c in out.values():
+            total = sum(c.values())
+            c["failure_rate"] = round(c["failed"] / total, 4) if total else 0.0
+        return out
+
+
+PARSE_STATS = ParseStats()
+
+
+# ——— JSON ———
+
+def _repair(text: str) -> str:
+    text = (text.replace("“", '"').replace("”", '"')
+                .replace("‘", "'").replace("’", "'"))
+    if '"' not in text:
+        text = text.replace("'", '"')
+    text = _BARE_KEY_RE.sub(r'\1"\2":', text)
+    text = _TRAILING_RE.sub(r"\1", text)
+    text = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", text)))
+    return text
+
+
+def _close_truncated(text: str) -> str:
+    """Append the brackets (and quote) a reply cut off mid-structure is missing."""
+    stack, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    return text + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def extract_json(text: str, opener: str = "{"):
+    """
+    First JSON value starting with `opener` in `text`. Returns
+    (value, repaired) or (None, False) when nothing can be recovered.
+    """
+    if not text:
+        return None, False
+    sources = [m.group(1) for m in _FENCE_RE.finditer(text)] + [text]
+    decoder = json.JSONDecoder()
+    for source in sources:
+        start = source.find(opener)
+        while start != -1:
+            try:
+                return decoder.raw_decode(source, start)[0], False
+            except ValueError:
+                start = source.find(opener, start + 1)
+    for source in sources:
+        start = source.find(opener)
+        if start == -1:
+            continue
+        fragment = _repair(source[start:])
+        for candidate in (fragment, _close_truncated(fragment)):
+            try:
+                return decoder.raw_decode(candidate)[0], True
+            except ValueError:
+                pass
+    return None, False
+
+
+def normalize_action(value) -> str:
+    """Map LIKE/Liked/share it/ignored... onto ACTIONS; None if unrecognised."""
+    word = str(value or "").strip().strip("\"'.").upper()
+    for action in ACTIONS:
+        if word.startswith(action[:4]):
+            return action
+    return None
+
+
+def _reaction_from(item) -> dict:
+    if not isinstance(item, dict):
+        return None
+    action = normalize_action(item.get("action"))
+    if action is None:
+        return None
+    return {**item, "action": action, "thought": str(item.get("thought") or "No thought provided.").strip()}
+
+
+def parse_reaction(text: str):
+    """
+    {thought, action} from a single-post reply. Returns (result, repaired),
+    or (None, False) when no action can be found.
+    """
+    value, repaired = extract_json(text, "{")
+    result = _reaction_from(value)
+    if result is not None:
+        return result, repaired
+    # No usable JSON: look for "action: X", or a single action word
+    m = _ACTION_RE.search(text or "")
+    action = normalize_action(m.group(1)) if m else None
+    if action is None:
+        words = set(_ACTION_WORD_RE.findall(text or ""))
+        action = words.pop() if len(words) == 1 else None
+    if action is None:
+        return None, False
+    t = _THOUGHT_RE.search(text)
+    thought = t.group(1).strip() if t else (text or "").strip().splitlines()[0][:200]
+    return {"thought": thought, "action": action}, True
+
+
+def parse_reactions(text: str):
+    """
+    Map of str(post_id) -> {thought, action} from a batched reply: a JSON
+    array, an object holding one ({"reactions": [...]}) or keyed by post id,
+    or a run of separate objects. Returns (results, repaired).
+    """
+    value, repaired = extract_json(text, "[")
+    obj = extract_json(text, "{")[0] if not isinstance(value, list) else None
+    if isinstance(obj, dict):
+        nested = next((v for v in obj.values() if isinstance(v, list)), None)
+        if nested is not None:
+            value, repaired = nested, True
+        elif "post_id" not in obj and all(isinstance(v, dict) for v in obj.values()):
+            value, repaired = [{"post_id": k, **v} for k, v in obj.items()], True
+    if not isinstance(value, list):
+        # Objects one after another, without the enclosing array
+        value, decoder, pos = [], json.JSONDecoder(), (text or "").find("{")
+        while pos != -1:
+            try:
+                item, end = decoder.raw_decode(text, pos)
+                value.append(item)
+                pos = text.find("{", end)
+            except ValueError:
+                pos = text.find("{", pos + 1)
+        repaired = bool(value)
+
+    results = {}
+    for item in value:
+        reaction = _reaction_from(item)
+        if reaction is not None and "post_id" in item:
+            results[str(item["post_id"]).strip()] = reaction
+    return results, repaired
+
+
+# ——— Captions ———
+
+def parse_captions(text: str) -> list:
+    """
+    Captions from a <<A>>/<<B>> reply. Tag variants ("**<<A>>**", "<<A>>:",
+    "Caption A:") are accepted, a caption runs until the next tag or a blank
+    line, so wrapped captions are joined, and surrounding quotes are dropped.
+    """
+    text = (text or "").replace("\r\n", "\n")
+    tags = list(_CAPTION_TAG_RE.finditer(text))
+    captions = []
+    for i, m in enumerate(tags):
+        end = tags[i + 1].start() if i + 1 < len(tags) else len(text)
+        body = text[m.end():end].strip("\n")
+        body = body.split("\n\n")[0]
+        caption = " ".join(line.strip() for line in body.splitlines() if line.strip())
+        caption = caption.strip().strip('"“”').strip()
+        if caption:
+            captions.append(caption)
+    return list(dict.fromkeys(captions))
+
+
+def captions_complete(text: str) -> bool:
+    """
+    Stop condition for streamed caption replies, in step with parse_captions:
+    True once an A tag has been seen and the last tag is B with some text
+    followed by a blank line. Otherwise the reply runs to the end of the
+    stream, so wrapped and tag-on-its-own-line captions are never cut short.
+    """
+    text = (text or "").replace("\r\n", "\n")
+    letters = [(m.group(1) or m.group(2)).upper() for m in _CAPTION_TAG_RE.finditer(text)]
+    if "A" not in letters or letters[-1] != "B":
+        return False
+    last = list(_CAPTION_TAG_RE.finditer(text))[-1]
+    body = text[last.end():].lstrip("\n")
+    return "\n\n" in body and bool(body.split("\n\n")[0].strip())
+
+
+# ——— Re-asks ———
+
+_REASK_TEMPLATE = """
+The reply below was supposed to be {what}, but it could not be read.
+Rewrite it in exactly this format, keeping its content, and output nothing else:
+{fmt}
+
+Reply:
+{reply}
+""".strip()
+
+
+def reask(llm, reply: str, what: str, fmt: str, stop=None) -> str:
+    """One short formatting-only call asking the model to fix its own reply."""
+    prompt = _REASK_TEMPLATE.format(what=what, fmt=fmt, reply=(reply or "")[:2000])
+    kwargs = {"stop": stop} if stop is not None else {}
+    return llm.generate(prompt, temperature=0.0, **kwargs).strip()
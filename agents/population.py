@@ -0,0 +1,182 @@
+# agents/population.py
+
+import json
+import sys
+from array import array
+from collections.abc import Mapping
+
+from agents.consumer_agent import ConsumerAgent
+
+# Demographic fields stored as codes into a shared table of interned strings.
+DEMOGRAPHIC_FIELDS = ("gender", "education_level", "occupation", "income_range", "location")
+_MISSING = 0xFFFFFFFF
+
+
+class _Interner:
+    """Maps repeated values to small integer codes and back."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes  = {}
+
+    def code(self, value) -> int:
+        if value is None:
+            return _MISSING
+        if isinstance(value, str):
+            value = sys.intern(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int):
+        return None if code == _MISSING else self.values[code]
+
+
+class Population:
+    """
+    Column-oriented consumer population. Traits, thresholds and ages live in
+    typed arrays (4 bytes per value), demographic strings and daily-needs
+    lists are interned and stored as codes, and a ConsumerAgent is only
+    materialised when one is asked for. A 100k-consumer population takes a few
+    tens of MB instead of one dict tree plus one agent object per consumer.
+    """
+
+    def __init__(self, trait_names=None):
+        self.ids         = []
+        self.names       = []
+        self.trait_names = list(trait_names or [])
+        self.traits      = {t: array("f") for t in self.trait_names}  # one column per trait
+        self.thresholds  = array("f")
+        self.ages        = array("i")
+        self.demographics = {f: array("I") for f in DEMOGRAPHIC_FIELDS}
+        self.needs       = array("I")
+        self._strings    = _Interner()   # demographic values
+        self._needs      = _Interner()   # tuples of daily needs
+        self.index       = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, cid):
+        return cid in self.index
+
+    # ——— Building ———
+
+    def add(self, profile: dict):
+        cid = profile.get("id")
+        if not cid:
+            raise ValueError("Consumer profile missing 'id' field")
+        if cid in self.index:
+            raise ValueError(f"Duplicate consumer id {cid}")
+        row = len(self.ids)
+
+        traits = profile.get("personality_traits", {})
+        for name in traits:
+            if name not in self.traits:
+                # New trait column, back-filled with zeros for earlier rows
+                self.trait_names.append(name)
+                self.traits[name] = array("f", bytes(4 * row))
+        for name in self.trait_names:
+            self.traits[name].append(float(traits.get(name, 0.0)))
+
+        demo = profile.get("demographics", {})
+        self.ages.append(int(demo.get("age") or -1))
+        for field in DEMOGRAPHIC_FIELDS:
+            self.demographics[field].append(self._strings.code(demo.get(field)))
+
+        self.needs.append(self._needs.code(tuple(sys.intern(n) for n in profile.get("daily_needs", []))))
+        self.thresholds.append(float(profile.get("decision_threshold", 0.5)))
+        self.ids.append(sys.intern(cid))
+        self.names.append(profile.get("name", "UnknownConsumer"))
+        self.index[cid] = row
+
+    @classmethod
+    def from_profiles(cls, profiles) -> "Population":
+        """Build from an iterable of profile dicts (or a consumer_id -> profile map)."""
+        pop = cls()
+        for profile in (profiles.values() if isinstance(profiles, Mapping) else profiles):
+            pop.add(profile)
+        return pop
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "Population":
+        """Stream a JSON Lines file with one consumer profile per line."""
+        pop = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    pop.add(json.loads(line))
+        return pop
+
+    # ——— Access ———
+
+    def profile(self, row: int) -> dict:
+        """Rebuild the profile dict of `row` in the agents/consumer_profiles format."""
+        demo = {"age": self.ages[row] if self.ages[row] >= 0 else None}
+        for field in DEMOGRAPHIC_FIELDS:
+            value = self._strings.value(self.demographics[field][row])
+            if value is not None:
+                demo[field] = value
+        return {
+            "id": self.ids[row],
+            "name": self.names[row],
+            "demographics": demo,
+            "daily_needs": list(self._needs.value(self.needs[row]) or ()),
+            "personality_traits": {t: round(self.traits[t][row], 4) for t in self.trait_names},
+            "decision_threshold": round(self.thresholds[row], 4),
+        }
+
+    def agent(self, cid: str, llm, sink=None, history_size: int = 20) -> ConsumerAgent:
+        return ConsumerAgent(self.profile(self.index[cid]), llm=llm, sink=sink, history_size=history_size)
+
+    def as_agents(self, llm, sink=None, history_size: int = 20) -> "PopulationAgents":
+        return PopulationAgents(self, llm, sink, history_size)
+
+    def trait_matrix(self):
+        """consumers × traits float32 NumPy matrix (copies the columns once)."""
+        import numpy as np
+        if not self.trait_names:
+            return np.zeros((len(self), 0), dtype=np.float32)
+        return np.stack([np.frombuffer(self.traits[t], dtype=np.float32) for t in self.trait_names], axis=1)
+
+    def needs_text(self, row: int) -> str:
+        return " ".join(self._needs.value(self.needs[row]) or ())
+
+    def distinct_needs(self):
+        """
+        (texts, rows): each distinct daily-needs text once, and a NumPy array
+        with every consumer's index into `texts`, so per-text work is done once.
+        """
+        import numpy as np
+        texts = [" ".join(needs or ()) for needs in self._needs.values]
+        return texts, np.frombuffer(self.needs, dtype=f"u{self.needs.itemsize}")
+
+
+class PopulationAgents(Mapping):
+    """
+    consumer_id -> ConsumerAgent view over a Population, usable wherever the
+    simulation expects a consumers dict. Agents are built on access and not
+    kept, so their in-memory history only lives as long as the caller holds
+    them; reactions themselves are persisted by the agent's sink.
+    """
+
+    def __init__(self, population: Population, llm, sink=None, history_size: int = 20):
+        self.population   = population
+        self.llm          = llm
+        self.sink         = sink
+        self.history_size = history_size
+
+    def __getitem__(self, cid: str) -> ConsumerAgent:
+        if cid not in self.population.index:
+            raise KeyError(cid)
+        return self.population.agent(cid, self.llm, self.sink, self.history_size)
+
+    def __iter__(self):
+        return iter(self.population.ids)
+
+    def __len__(self):
+        return len(self.population)
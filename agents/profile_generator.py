@@ -0,0 +1,166 @@
+# agents/profile_generator.py
+"""
+Seeded synthetic consumer profiles for load testing.
+
+    python -m agents.profile_generator -n 100000 --seed 7 --out population.jsonl
+    python -m agents.profile_generator -n 50 --format dir --out agents/consumer_profiles
+
+Profiles use the agents/consumer_profiles/*.json schema. Each profile is
+drawn from its own RNG seeded by (seed, index), so any slice of a population
+can be regenerated on its own and output is identical across runs.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+
+DEFAULT_CONFIG = {
+    "id_prefix": "synth",
+    "age": {"dist": "normal", "mean": 34, "std": 11, "min": 16, "max": 80},
+    "gender": {"female": 0.49, "male": 0.48, "non-binary": 0.03},
+    "education_level": {
+        "High school diploma": 0.30, "Associate degree": 0.10, "Bachelor’s degree": 0.35,
+        "Master’s degree": 0.18, "Doctorate": 0.02, "Some college": 0.05
+    },
+    "occupation": {
+        "Software Engineer": 0.08, "Nurse": 0.08, "Teacher": 0.08, "Retail Associate": 0.10,
+        "Student": 0.14, "Warehouse Worker": 0.07, "Designer": 0.05, "Accountant": 0.06,
+        "Personal Trainer": 0.04, "Delivery Driver": 0.07, "Marketing Manager": 0.05,
+        "Construction Worker": 0.06, "Freelancer": 0.06, "Retired": 0.06
+    },
+    "income_range": {
+        "<30k USD": 0.18, "30k–60k USD": 0.30, "60k–80k USD": 0.20,
+        "80k–120k USD": 0.20, ">120k USD": 0.12
+    },
+    "location": {
+        "Urban downtown": 0.30, "Suburban": 0.40, "Small town": 0.15,
+        "Rural": 0.10, "College campus": 0.05
+    },
+    "daily_needs": {
+        "min": 2,
+        "max": 4,
+        "choices": [
+            "morning jog around the neighborhood", "comfortable shoes for standing at work",
+            "stylish sneakers for weekend outings", "durable footwear for occasional trail runs",
+            "lightweight shoes for gym sessions", "supportive shoes for long walks",
+            "water-resistant shoes for commuting", "versatile shoes for travel",
+            "affordable shoes that last", "eco-friendly footwear", "shoes for pickup basketball",
+            "cushioned shoes for long shifts"
+        ]
+    },
+    "personality_traits": {
+        "loyalty":                {"dist": "beta", "a": 2.0, "b": 2.0},
+        "trend_seeker":           {"dist": "beta", "a": 2.0, "b": 2.5},
+        "value_shopper":          {"dist": "beta", "a": 2.5, "b": 2.0},
+        "sustainability_concern": {"dist": "beta", "a": 2.0, "b": 2.5}
+    },
+    "decision_threshold": {"dist": "uniform", "low": 0.35, "high": 0.65}
+}
+
+_FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn",
+                "Priya", "Wei", "Lucia", "Omar", "Hana", "Mateo", "Amara", "Noah", "Elena", "Kai"]
+_LAST_NAMES  = ["Smith", "Garcia", "Chen", "Patel", "Johnson", "Kim", "Nguyen", "Lopez", "Okafor",
+                "Müller", "Rossi", "Silva", "Haddad", "Brown", "Sato", "Kowalski", "Singh", "Ali"]
+
+
+def load_config(path: str = None) -> dict:
+    """DEFAULT_CONFIG, with the top-level keys of the JSON file at `path` replacing it."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+def _draw(rng: random.Random, spec):
+    """Sample one value from a distribution spec or a {value: weight} table."""
+    if isinstance(spec, (int, float, str)):
+        return spec
+    dist = spec.get("dist") if isinstance(spec, dict) else None
+    if dist == "normal":
+        value = rng.gauss(spec["mean"], spec["std"])
+    elif dist == "uniform":
+        value = rng.uniform(spec["low"], spec["high"])
+    elif dist == "beta":
+        value = rng.betavariate(spec["a"], spec["b"])
+    elif dist is None:
+        values, weights = zip(*spec.items())
+        return rng.choices(values, weights=weights)[0]
+    else:
+        raise ValueError(f"Unknown distribution {dist!r}")
+    return min(spec.get("max", value), max(spec.get("min", value), value))
+
+
+def generate_profile(index: int, seed: int = 0, config: dict = None) -> dict:
+    config = config or DEFAULT_CONFIG
+    rng = random.Random(f"{seed}:{index}")
+
+    needs_cfg = config["daily_needs"]
+    n_needs = rng.randint(needs_cfg["min"], min(needs_cfg["max"], len(needs_cfg["choices"])))
+    return {
+        "id": f"{config['id_prefix']}_{index:07d}",
+        "name": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+        "demographics": {
+            "age": int(round(_draw(rng, config["age"]))),
+            "gender": _draw(rng, config["gender"]),
+            "education_level": _draw(rng, config["education_level"]),
+            "occupation": _draw(rng, config["occupation"]),
+            "income_range": _draw(rng, config["income_range"]),
+            "location": _draw(rng, config["location"])
+        },
+        "daily_needs": rng.sample(needs_cfg["choices"], n_needs),
+        "personality_traits": {
+            trait: round(_draw(rng, spec), 2) for trait, spec in config["personality_traits"].items()
+        },
+        "decision_threshold": round(_draw(rng, config["decision_threshold"]), 2)
+    }
+
+
+def generate_profiles(n: int, seed: int = 0, config: dict = None, start: int = 0):
+    """Lazily yield profiles start .. start+n-1."""
+    config = config or DEFAULT_CONFIG
+    for i in range(start, start + n):
+        yield generate_profile(i, seed, config)
+
+
+def write_profiles(out: str, n: int, seed: int = 0, config: dict = None, fmt: str = "jsonl",
+                   start: int = 0) -> int:
+    """
+    Stream profiles to disk without holding them in memory.
+    fmt="jsonl": one profile per line in the file `out` (see Population.from_jsonl).
+    fmt="dir":   one <id>.json per profile in the folder `out` (see load_consumer_profiles).
+    Returns the number of profiles written.
+    """
+    count = 0
+    if fmt == "jsonl":
+        if os.path.dirname(out):
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            for profile in generate_profiles(n, seed, config, start):
+                f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+                count += 1
+    elif fmt == "dir":
+        os.makedirs(out, exist_ok=True)
+        for profile in generate_profiles(n, seed, config, start):
+            with open(os.path.join(out, f"{profile['id']}.json"), "w", encoding="utf-8") as f:
+                json.dump(profile, f, indent=2, ensure_ascii=False)
+            count += 1
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic consumer profiles")
+    parser.add_argument("-n", "--count", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=int, default=0, help="index of the first profile")
+    parser.add_argument("--config", help="JSON file overriding DEFAULT_CONFIG keys")
+    parser.add_argument("--format", choices=["jsonl", "dir"], default="jsonl")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    written = write_profiles(args.out, args.count, args.seed, load_config(args.config), args.format, args.start)
+    print(f"Wrote {written} profile(s) to {args.out}")
@@ -0,0 +1,92 @@
+# agents/similarity.py
+
+import random
+import re
+import zlib
+from collections import deque
+
+_PRIME = (1 << 61) - 1
+_SPACE_RE = re.compile(r"\s+")
+
+
+def shingles(text: str, k: int = 4) -> set:
+    """Character k-grams of the lower-cased, whitespace-collapsed text."""
+    norm = _SPACE_RE.sub(" ", text.lower()).strip()
+    if len(norm) <= k:
+        return {norm}
+    return {norm[i:i + k] for i in range(len(norm) - k + 1)}
+
+
+class MinHashLSH:
+    """
+    Windowed near-duplicate index: MinHash signatures over character shingles,
+    split into LSH bands so a lookup only touches captions that share at least
+    one band bucket with the query. Only the last `horizon` captions are kept;
+    older ones are removed from their buckets as new ones arrive, so memory
+    and lookup cost stay bounded however long a brand runs.
+
+    With the defaults (64 permutations, 32 bands of 2 rows) a pair with shingle
+    Jaccard 0.3 becomes a candidate ~95% of the time, 0.1 only ~27%.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 32, shingle_size: int = 4,
+                 horizon: int = 200, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, _PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _PRIME) for _ in range(num_perm)]
+        self.rows         = num_perm // bands
+        self.bands        = bands
+        self.shingle_size = shingle_size
+        self.horizon      = horizon
+
+        self._buckets = [{} for _ in range(bands)]  # band -> {band_key: {item_id}}
+        self._items   = {}                          # item_id -> (text, signature)
+        self._order   = deque()                     # item ids, oldest first
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def signature(self, text: str) -> list:
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in zip(self._a, self._b)]
+
+    def _band_keys(self, sig: list):
+        r = self.rows
+        return [tuple(sig[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def add(self, text: str):
+        item_id = self._next_id
+        self._next_id += 1
+        sig = self.signature(text)
+        for band, key in enumerate(self._band_keys(sig)):
+            self._buckets[band].setdefault(key, set()).add(item_id)
+        self._items[item_id] = (text, sig)
+        self._order.append(item_id)
+        while len(self._order) > self.horizon:
+            self._evict(self._order.popleft())
+
+    def _evict(self, item_id: int):
+        _, sig = self._items.pop(item_id)
+        for band, key in enumerate(self._band_keys(sig)):
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                continue
+            bucket.discard(item_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def candidates(self, text: str) -> list:
+        """Indexed texts sharing at least one band with `text`, newest first."""
+        hits = set()
+        for band, key in enumerate(self._band_keys(self.signature(text))):
+            hits.update(self._buckets[band].get(key, ()))
+        return [self._items[i][0] for i in sorted(hits, reverse=True)]
+
+    def clear(self):
+        for buckets in self._buckets:
+            buckets.clear()
+        self._items.clear()
+        self._order.clear()
@@ -0,0 +1,200 @@
+# agents/sinks.py
+
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from xml.etree import ElementTree as ET
+
+from interface.store import CampaignStore, get_store
+from tracing import inc, span
+
+# Records buffered by the default sink before it writes a batch.
+FLUSH_EVERY = int(os.getenv("MARKETMIND_SINK_FLUSH_EVERY", "500"))
+# MARKETMIND_XML_EXPORT=1 also writes the legacy per-record XML files
+# (brand_responses/, consumer_responses/) under RESPONSES_DIR.
+XML_EXPORT    = os.getenv("MARKETMIND_XML_EXPORT") == "1"
+RESPONSES_DIR = os.getenv("MARKETMIND_RESPONSES_DIR", os.path.dirname(__file__))
+
+_open_sinks = weakref.WeakSet()
+
+
+class ResponseSink:
+    """
+    Destination for agent output. Campaign records look like
+    {brand_name, id, caption, usp, timestamp}; reaction records like
+    {consumer_id, post_id, thought, action}.
+
+    Records are buffered and written in batches of `flush_every` (and on
+    flush()/close()), so a round's C×B reactions cost a handful of writes
+    instead of one file or transaction each.
+    """
+
+    def __init__(self, flush_every: int = FLUSH_EVERY):
+        self.flush_every   = max(1, flush_every)
+        self.records       = 0
+        self.batches       = 0
+        self.write_seconds = 0.0
+        self._campaigns    = []
+        self._reactions    = []
+        self._buffer_lock  = threading.Lock()
+        self._write_lock   = threading.Lock()
+        _open_sinks.add(self)
+
+    def write_campaign(self, record: dict):
+        self._add(self._campaigns, record)
+
+    def write_reaction(self, record: dict):
+        self._add(self._reactions, record)
+
+    def _add(self, buffer: list, record: dict):
+        with self._buffer_lock:
+            buffer.append(record)
+            full = len(self._campaigns) + len(self._reactions) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._buffer_lock:
+                campaigns, self._campaigns = self._campaigns, []
+                reactions, self._reactions = self._reactions, []
+            if not campaigns and not reactions:
+                return
+            started = time.perf_counter()
+            with span("sink.write_batch", sink=type(self).__name__):
+                self._write_batch(campaigns, reactions)
+            self.write_seconds += time.perf_counter() - started
+            inc("sink_records_total", len(campaigns) + len(reactions), sink=type(self).__name__)
+            self.records += len(campaigns) + len(reactions)
+            self.batches += 1
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "sink": type(self).__name__,
+            "records": self.records,
+            "batches": self.batches,
+            "write_seconds": round(self.write_seconds, 4),
+            "records_per_sec": round(self.records / self.write_seconds, 1) if self.write_seconds else 0.0
+        }
+
+
+class SQLiteSink(ResponseSink):
+    """Batches records into the campaign store (one transaction per table per batch)."""
+
+    def __init__(self, store: CampaignStore = None, flush_every: int = FLUSH_EVERY):
+        super().__init__(flush_every)
+        self.store = store or get_store()
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        if campaigns:
+            self.store.add_campaigns(campaigns)
+        if reactions:
+            self.store.add_reactions(reactions)
+
+
+class JSONLSink(ResponseSink):
+    """Appends campaigns.jsonl / reactions.jsonl under `directory`."""
+
+    def __init__(self, directory: str, flush_every: int = FLUSH_EVERY):
+        super().__init__(flush_every)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        for name, records in (("campaigns.jsonl", campaigns), ("reactions.jsonl", reactions)):
+            if records:
+                with open(os.path.join(self.directory, name), "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+
+
+class XMLSink(ResponseSink):
+    """
+    Export in the legacy layout: brand_responses/<brand>/<id>.xml and
+    consumer_responses/<consumer_id>/<post_id>.xml under `base_dir`.
+    """
+
+    def __init__(self, base_dir: str = RESPONSES_DIR, flush_every: int = FLUSH_EVERY):
+        super().__init__(flush_every)
+        self.base_dir = base_dir
+
+    def _write_xml(self, path: str, root: ET.Element):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ET.indent(root, space="  ")
+        with open(path, "wb") as f:
+            f.write(ET.tostring(root, encoding="utf-8", xml_declaration=True))
+            f.write(b"\n")
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        for record in campaigns:
+            root = ET.Element("campaign")
+            for k, v in record.items():
+                if k != "brand_name" and v is not None:
+                    ET.SubElement(root, k).text = str(v)
+            ET.SubElement(root, "brand_name").text = record["brand_name"]
+            self._write_xml(os.path.join(self.base_dir, "brand_responses", record["brand_name"],
+                                         f"{record['id']}.xml"), root)
+        for record in reactions:
+            root = ET.Element("reaction")
+            for k in ("consumer_id", "post_id", "thought", "action"):
+                ET.SubElement(root, k).text = str(record.get(k, ""))
+            self._write_xml(os.path.join(self.base_dir, "consumer_responses", record["consumer_id"],
+                                         f"{record['post_id']}.xml"), root)
+
+
+class MultiSink(ResponseSink):
+    """Forwards every record to several sinks; each keeps its own buffer and stats."""
+
+    def __init__(self, *sinks: ResponseSink):
+        super().__init__(flush_every=1)
+        self.sinks = list(sinks)
+
+    def write_campaign(self, record: dict):
+        for sink in self.sinks:
+            sink.write_campaign(record)
+
+    def write_reaction(self, record: dict):
+        for sink in self.sinks:
+            sink.write_reaction(record)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def stats(self) -> dict:
+        return {"sink": "MultiSink", "sinks": [s.stats() for s in self.sinks]}
+
+
+_default_sink = None
+_default_lock = threading.Lock()
+
+def get_default_sink() -> ResponseSink:
+    """
+    Process-wide sink used by agents that are not given one: the campaign
+    store, plus the XML export when MARKETMIND_XML_EXPORT=1.
+    """
+    global _default_sink
+    with _default_lock:
+        if _default_sink is None:
+            sink = SQLiteSink()
+            if XML_EXPORT:
+                sink = MultiSink(sink, XMLSink())
+            _default_sink = sink
+        return _default_sink
+
+
+def flush_all():
+    """Flush every live sink, e.g. at the end of a simulation phase."""
+    for sink in list(_open_sinks):
+        sink.flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,63 @@
+# agents/test_bandit.py
+"""Unit tests for agents.bandit and the brand's use of it (no network): python -m pytest agents"""
+
+import random
+
+import pytest
+
+from agents.bandit import ThompsonBandit, UCBBandit, make_scheduler
+from agents.brand_agent import BrandAgent
+from agents.brand_profiles import load_profile
+from agents.sinks import JSONLSink
+from llm.backends import RuleBasedLLM
+
+
+class _FailingLLM:
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        raise RuntimeError("backend down")
+
+
+def _brand(tmp_path, llm) -> BrandAgent:
+    return BrandAgent(load_profile("endurastride.json"), llm=llm, sink=JSONLSink(str(tmp_path)), bandit="thompson")
+
+
+@pytest.mark.parametrize("llm", [RuleBasedLLM(), _FailingLLM()], ids=["captions", "fallback"])
+def test_record_feedback_updates_usp_and_lens(tmp_path, llm):
+    brand = _brand(tmp_path, llm)
+    brand.generate_campaign(round_no=1, campaign_id=7)
+    record = brand.history[-1]
+    assert record["lens"] in brand.profile["creative_lenses"]
+
+    brand.record_feedback(7, ["LIKE", "SHARE", "IGNORE"])
+    scheduler = brand.scheduler
+    assert scheduler.usp.pulls[record["usp"]] == 3
+    assert scheduler.usp.rewards[record["usp"]] == 2.0
+    assert scheduler.lens.pulls[record["lens"]] == 3
+    assert scheduler.lens.rewards[record["lens"]] == 2.0
+
+
+def test_record_feedback_ignores_unknown_campaign(tmp_path):
+    brand = _brand(tmp_path, RuleBasedLLM())
+    brand.generate_campaign(round_no=1, campaign_id=7)
+    brand.record_feedback(8, ["LIKE"])
+    assert sum(brand.scheduler.usp.pulls.values()) == 0
+    assert sum(brand.scheduler.lens.pulls.values()) == 0
+
+
+@pytest.mark.parametrize("cls", [ThompsonBandit, UCBBandit])
+def test_bandit_converges_on_better_arm(cls):
+    rng = random.Random(3)
+    rates = {"good": 0.8, "poor": 0.2, "bad": 0.1}
+    bandit = cls(list(rates), rng=rng)
+    for _ in range(1000):
+        arm = bandit.choose()
+        bandit.update(arm, 1.0 if rng.random() < rates[arm] else 0.0)
+    assert bandit.best() == "good"
+    assert bandit.pulls["good"] > 0.7 * sum(bandit.pulls.values())
+
+
+def test_make_scheduler_off_and_unknown():
+    assert make_scheduler("", ["a"]) is None
+    assert make_scheduler("off", ["a"]) is None
+    with pytest.raises(ValueError):
+        make_scheduler("greedy", ["a"])
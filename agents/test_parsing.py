@@ -0,0 +1,175 @@
+# agents/test_parsing.py
+"""Unit tests for agents.parsing (no network): python -m pytest agents"""
+
+import pytest
+
+from agents.parsing import (
+    captions_complete, extract_json, normalize_action, parse_captions, parse_reaction,
+    parse_reactions, reask,
+)
+
+
+def _stream(text: str, stop, chunk: int = 3) -> str:
+    """What a streaming client returns: chunks until `stop` holds or the text runs out."""
+    received = ""
+    for i in range(0, len(text), chunk):
+        received += text[i:i + chunk]
+        if stop(received):
+            break
+    return received
+
+
+# ——— JSON ———
+
+@pytest.mark.parametrize("text", [
+    '{"thought": "Nice shoes.", "action": "LIKE"}',
+    'Sure! Here you go:\n```json\n{"thought": "Nice shoes.", "action": "LIKE"}\n```\nHope that helps.',
+    'My answer is {"thought": "Nice shoes.", "action": "LIKE"} and that is final.',
+])
+def test_extract_json_clean(text):
+    assert extract_json(text) == ({"thought": "Nice shoes.", "action": "LIKE"}, False)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("{'thought': 'ok', 'action': 'LIKE'}", {"thought": "ok", "action": "LIKE"}),
+    ('{thought: "ok", action: "SHARE"}', {"thought": "ok", "action": "SHARE"}),
+    ('{"thought": "ok", "action": "LIKE",}', {"thought": "ok", "action": "LIKE"}),
+    ('{“thought”: “ok”, “action”: “IGNORE”}', {"thought": "ok", "action": "IGNORE"}),
+    ('{"seen": True, "extra": None, "skip": False}', {"seen": True, "extra": None, "skip": False}),
+    ('{"thought": "cut off mid', {"thought": "cut off mid"}),
+    ('[{"post_id": 1, "action": "LIKE"}, {"post_id": 2', [{"post_id": 1, "action": "LIKE"}, {"post_id": 2}]),
+])
+def test_extract_json_repaired(text, expected):
+    opener = text.lstrip()[0]
+    assert extract_json(text, opener) == (expected, True)
+
+
+def test_extract_json_nothing():
+    assert extract_json("no json here") == (None, False)
+    assert extract_json("") == (None, False)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("LIKE", "LIKE"), ("liked", "LIKE"), ("Share it", "SHARE"), ("ignored.", "IGNORE"),
+    ('"IGNORE"', "IGNORE"), ("maybe", None), (None, None),
+])
+def test_normalize_action(value, expected):
+    assert normalize_action(value) == expected
+
+
+# ——— Reactions ———
+
+def test_parse_reaction_json():
+    result, repaired = parse_reaction('{"thought": "Fits my runs.", "action": "liked"}')
+    assert result["action"] == "LIKE" and result["thought"] == "Fits my runs." and not repaired
+
+
+def test_parse_reaction_prose():
+    result, repaired = parse_reaction("Thought: not for me\nAction: Ignored")
+    assert result == {"thought": "not for me", "action": "IGNORE"} and repaired
+
+
+def test_parse_reaction_single_action_word():
+    result, _ = parse_reaction("I would SHARE this with my running club.")
+    assert result["action"] == "SHARE"
+
+
+def test_parse_reaction_unreadable():
+    assert parse_reaction("I could LIKE or IGNORE it, hard to say.") == (None, False)
+
+
+@pytest.mark.parametrize("text", [
+    '[{"post_id": 1, "thought": "a", "action": "LIKE"}, {"post_id": 2, "thought": "b", "action": "IGNORE"}]',
+    '{"reactions": [{"post_id": 1, "thought": "a", "action": "LIKE"},'
+    ' {"post_id": 2, "thought": "b", "action": "IGNORE"}]}',
+    '{"1": {"thought": "a", "action": "LIKE"}, "2": {"thought": "b", "action": "IGNORE"}}',
+    '{"post_id": 1, "thought": "a", "action": "LIKE"}\n{"post_id": 2, "thought": "b", "action": "IGNORE"}',
+    '```json\n[{"post_id": 1, "thought": "a", "action": "LIKE"},\n {"post_id": 2, "thought": "b", "action": "IGNORE"},]\n```',
+])
+def test_parse_reactions_layouts(text):
+    results, _ = parse_reactions(text)
+    assert {k: v["action"] for k, v in results.items()} == {"1": "LIKE", "2": "IGNORE"}
+
+
+def test_parse_reactions_skips_unusable_items():
+    results, _ = parse_reactions('[{"post_id": 1, "action": "LIKE"}, {"post_id": 2, "action": "??"}, {"action": "LIKE"}]')
+    assert list(results) == ["1"]
+
+
+# ——— Captions ———
+
+@pytest.mark.parametrize("text", [
+    "<<A>> cap a\n<<B>> cap b",
+    "<<A>> cap a\n<<B>> cap b\n\nNote: these use the USP.",
+    "<<A>>\ncap a\n\n<<B>>\ncap b\n",
+    "**<<A>>** cap a\n**<<B>>**: cap b",
+    "<<A>>: \"cap a\"\n<<B>>: “cap b”",
+    "Caption A: cap a\nCaption B: cap b",
+    "- Option A) cap a\n- Option B) cap b",
+])
+def test_parse_captions_variants(text):
+    assert parse_captions(text) == ["cap a", "cap b"]
+
+
+def test_parse_captions_wrapped():
+    text = "<<A>> cap a wraps\nmore of a\n<<B>> cap b wraps\nmore of b\n\nextra commentary"
+    assert parse_captions(text) == ["cap a wraps more of a", "cap b wraps more of b"]
+
+
+def test_parse_captions_drops_empty_and_duplicates():
+    assert parse_captions("<<A>> same\n<<B>> same") == ["same"]
+    assert parse_captions("<<A>>\n<<B>> only b") == ["only b"]
+    assert parse_captions("no tags at all") == []
+
+
+@pytest.mark.parametrize("text", [
+    "<<A>> cap a\n<<B>> cap b\n\nNote: commentary the stop should save.",
+    "<<A>>\ncap a\n\n<<B>>\ncap b\n\nNote: commentary",
+    "<<A>> cap a wraps\nmore of a\n<<B>> cap b wraps\nmore of b\n\nextra",
+    "**<<A>>** cap a\n**<<B>>**: cap b\n",
+    "<<A>> cap a\n<<B>>\n\ncap b\nmore of b",
+    "<<B>> cap b first\n\n<<A>> cap a after\n\nmore",
+])
+def test_stop_agrees_with_parser(text):
+    # Streaming with early termination must parse like the full reply
+    for chunk in (1, 3, 8):
+        assert parse_captions(_stream(text, captions_complete, chunk)) == parse_captions(text)
+
+
+def test_stop_saves_commentary():
+    text = "<<A>> cap a\n<<B>> cap b\n\n" + "Note: " + "padding " * 50
+    assert len(_stream(text, captions_complete)) < len(text)
+
+
+def test_stop_waits_for_caption_b():
+    assert not captions_complete("<<A>> cap a\n\n")
+    assert not captions_complete("<<A>> cap a\n<<B>>\n")
+    assert not captions_complete("<<A>> cap a\n<<B>> cap b\n")
+    assert captions_complete("<<A>> cap a\n<<B>> cap b\n\n")
+
+
+# ——— Re-asks ———
+
+class _EchoLLM:
+    def __init__(self, reply):
+        self.reply, self.calls = reply, []
+
+    def generate(self, prompt, temperature=0.6, stop=None):
+        self.calls.append((prompt, temperature, stop))
+        return "  " + self.reply + "\n"
+
+
+def test_reask_sends_reply_and_format():
+    llm = _EchoLLM('{"thought": "x", "action": "LIKE"}')
+    out = reask(llm, "garbled reply", "a JSON reaction", '{"thought": ..., "action": ...}')
+    prompt, temperature, stop = llm.calls[0]
+    assert out == '{"thought": "x", "action": "LIKE"}'
+    assert "garbled reply" in prompt and "a JSON reaction" in prompt
+    assert temperature == 0.0 and stop is None
+
+
+def test_reask_truncates_long_replies():
+    llm = _EchoLLM("ok")
+    reask(llm, "x" * 5000, "a JSON reaction", "{}", stop=str.isspace)
+    prompt, _, stop = llm.calls[0]
+    assert "x" * 2000 in prompt and "x" * 2001 not in prompt and stop is str.isspace
@@ -0,0 +1,77 @@
+# agents/test_population.py
+"""Unit tests for agents.population (no network): python -m pytest agents"""
+
+import sys
+
+import pytest
+
+from agents.population import Population
+from agents.profile_generator import generate_profiles, write_profiles
+from llm.backends import RuleBasedLLM
+
+
+@pytest.fixture
+def profiles():
+    return list(generate_profiles(40, seed=3))
+
+
+def test_profiles_round_trip(profiles):
+    pop = Population.from_profiles(profiles)
+    assert len(pop) == len(profiles)
+    assert [pop.profile(row) for row in range(len(pop))] == profiles
+
+
+def test_jsonl_round_trip(tmp_path, profiles):
+    path = str(tmp_path / "population.jsonl")
+    write_profiles(path, 40, seed=3)
+    pop = Population.from_jsonl(path)
+    assert [pop.profile(pop.index[p["id"]]) for p in profiles] == profiles
+
+
+def test_repeated_strings_are_interned(profiles):
+    pop = Population.from_profiles(profiles)
+    rebuilt = [pop.profile(row) for row in range(len(pop))]
+    by_occupation, by_need = {}, {}
+    for profile in rebuilt:
+        occupation = profile["demographics"]["occupation"]
+        assert by_occupation.setdefault(occupation, occupation) is occupation
+        for need in profile["daily_needs"]:
+            assert by_need.setdefault(need, need) is need
+    assert len(pop._strings.values) < len(profiles)
+    assert all(cid is sys.intern(cid) for cid in pop.ids)
+
+
+def test_missing_fields_and_new_traits():
+    pop = Population.from_profiles([
+        {"id": "a", "personality_traits": {"loyalty": 0.5}},
+        {"id": "b", "demographics": {"age": 30, "gender": "female"}, "daily_needs": ["x"],
+         "personality_traits": {"loyalty": 0.25, "thrift": 0.75}, "decision_threshold": 0.4},
+    ])
+    first, second = pop.profile(0), pop.profile(1)
+    assert first["demographics"] == {"age": None}
+    assert first["daily_needs"] == []
+    assert first["personality_traits"] == {"loyalty": 0.5, "thrift": 0.0}   # back-filled column
+    assert first["decision_threshold"] == 0.5
+    assert second["demographics"] == {"age": 30, "gender": "female"}
+    assert second["personality_traits"] == {"loyalty": 0.25, "thrift": 0.75}
+    assert pop.trait_matrix().shape == (2, 2)
+
+
+def test_rejects_duplicate_and_missing_ids():
+    pop = Population()
+    pop.add({"id": "a"})
+    with pytest.raises(ValueError):
+        pop.add({"id": "a"})
+    with pytest.raises(ValueError):
+        pop.add({"name": "no id"})
+
+
+def test_agents_view(profiles):
+    pop = Population.from_profiles(profiles)
+    agents = pop.as_agents(RuleBasedLLM())
+    assert len(agents) == len(profiles)
+    assert list(agents) == [p["id"] for p in profiles]
+    agent = agents[profiles[5]["id"]]
+    assert agent.daily_needs == profiles[5]["daily_needs"]
+    with pytest.raises(KeyError):
+        agents["nobody"]
@@ -0,0 +1,80 @@
+# agents/test_similarity.py
+"""Unit tests for agents.similarity (no network): python -m pytest agents"""
+
+import itertools
+
+import pytest
+
+from agents.brand_agent import BrandAgent
+from agents.brand_profiles import load_profile
+from agents.similarity import MinHashLSH, shingles
+from agents.sinks import JSONLSink
+from llm.backends import RuleBasedLLM
+
+CAPTIONS = [
+    "EnduraStride trail shoes take every mile you throw at them. #EnduraStride",
+    "Rainy commute? Our water-resistant uppers keep your socks dry all week long.",
+    "Double shift on your feet? Cushioning built for nurses, teachers and night crews.",
+    "SprintStyle drops a pastel colourway for weekend brunch and city strolls.",
+    "Pickup basketball tonight: grip that holds when the court gets dusty.",
+    "Recycled foam, plant-based laces and a box you can compost at home.",
+    "Student budget, pro comfort: under fifty dollars and built to last a semester.",
+    "Gym day starts with a shoe light enough to forget you are wearing it.",
+]
+
+NEAR_DUPLICATES = [
+    (CAPTIONS[0], "EnduraStride trail shoes take every single mile you throw at them! #EnduraStride"),
+    (CAPTIONS[1], "Rainy commute? Our water-resistant uppers keep your socks dry all week."),
+    (CAPTIONS[2], "double shift on your feet?  Cushioning built for nurses, teachers & night crews"),
+]
+
+
+def test_shingles_normalise_case_and_whitespace():
+    assert shingles("Step  UP\nyour game") == shingles("step up your game")
+    assert shingles("abc") == {"abc"}
+
+
+@pytest.mark.parametrize("original, edited", NEAR_DUPLICATES)
+def test_near_duplicates_are_candidates(original, edited):
+    index = MinHashLSH()
+    for caption in CAPTIONS:
+        index.add(caption)
+    assert original in index.candidates(edited)
+
+
+def test_distinct_captions_rarely_are_candidates():
+    # Jaccard ~0.05 between these; the band layout lets the odd pair through for difflib to clear
+    pairs = list(itertools.combinations(CAPTIONS, 2))
+    collisions = 0
+    for first, second in pairs:
+        index = MinHashLSH()
+        index.add(first)
+        collisions += bool(index.candidates(second))
+    assert collisions <= len(pairs) // 10
+
+
+def test_brand_flags_near_duplicates_only(tmp_path):
+    brand = BrandAgent(load_profile("endurastride.json"), llm=RuleBasedLLM(), sink=JSONLSink(str(tmp_path)))
+    for caption in CAPTIONS:
+        brand.similarity_index.add(caption)
+    for _, edited in NEAR_DUPLICATES:
+        assert brand._is_too_similar(edited)
+    for i, caption in enumerate(CAPTIONS):
+        brand.similarity_index.clear()
+        for other in CAPTIONS[:i] + CAPTIONS[i + 1:]:
+            brand.similarity_index.add(other)
+        assert not brand._is_too_similar(caption)
+
+
+def test_candidates_newest_first_and_bounded_by_horizon():
+    index = MinHashLSH(horizon=2)
+    for text in ("Step up your game today", "Step up your game tonight", "Step up your game tomorrow"):
+        index.add(text)
+    assert len(index) == 2
+    assert index.candidates("Step up your game today!") == ["Step up your game tomorrow", "Step up your game tonight"]
+    assert all(key for band in index._buckets for key in band.values())
+
+
+def test_band_layout_must_divide_permutations():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=64, bands=24)
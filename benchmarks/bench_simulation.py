@@ -0,0 +1,238 @@
+# benchmarks/bench_simulation.py
+"""
+End-to-end throughput benchmark against a local mock LLM.
+
+    python -m benchmarks.bench_simulation --brands 10 --consumers 1000 --rounds 3
+
+Everything runs in a temporary directory (SQLite store, optional XML export) with the
+FastAPI app served on a free local port, so the real uiuc.chat endpoint and
+the repo's data folders are never touched. Results are printed as JSON and
+optionally appended as one JSON line to --out for tracking across commits.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _latency_summary(seconds) -> dict:
+    return {
+        "count":  len(seconds),
+        "p50_ms": round(_percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(_percentile(seconds, 95) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+
+def _run_digest(campaigns: list) -> str:
+    """Hash of every campaign and reaction (ids, text, actions, timestamps), in a fixed order."""
+    h = hashlib.sha1()
+    for c in sorted(campaigns, key=lambda c: c["id"]):
+        h.update(json.dumps([c["id"], c["brand_name"], c["caption"], c["usp"], c["timestamp"], c["round"]],
+                            ensure_ascii=False).encode("utf-8"))
+        for r in sorted(c["reactions"], key=lambda r: r["consumer_id"]):
+            h.update(json.dumps([r["consumer_id"], r["action"], r["thought"]], ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+class TimedLLM:
+    """Records the client-side latency of every generate() call."""
+
+    def __init__(self, llm):
+        self.llm       = llm
+        self.latencies = []
+        self._lock     = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        started = time.perf_counter()
+        try:
+            return self.llm.generate(prompt, temperature=temperature, stop=stop)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+
+
+def synthetic_brand(i: int) -> dict:
+    name = f"BenchBrand{i:03d}"
+    return {
+        "name": name,
+        "vision": f"{name} builds footwear for everyday athletes.",
+        "mission": "Durable, stylish shoes at a fair price.",
+        "core_values": {"Durability": "Built to last.", "Style": "Looks good anywhere."},
+        "usps": [f"{name} Cushion Core", f"{name} Eco Knit", f"{name} Direct Pricing"],
+        "creative_lenses": ["A dawn run through the city", "Trail miles in the rain", "Gym to coffee shop"],
+    }
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--brands", type=int, default=10)
+    parser.add_argument("--consumers", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--surrogate-margin", type=float, default=None,
+                        help="enable the surrogate pre-screen with this uncertainty margin")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="median mock LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0, help="mock generation time per 8 characters")
+    parser.add_argument("--chatter-chars", type=int, default=0, help="mock commentary after each answer")
+    parser.add_argument("--stream", action="store_true", help="stream with early termination (MARKETMIND_STREAMING=1)")
+    parser.add_argument("--brand-calls", type=int, default=50, help="generate_campaign calls in the brand micro-benchmark")
+    parser.add_argument("--api-requests", type=int, default=20)
+    parser.add_argument("--backend", choices=["uiuc", "local", "stub"], default="uiuc",
+                        help="LLM client: uiuc.chat or local OpenAI-compatible API against the mock, "
+                             "or the rule-based stub (no LLM calls over HTTP)")
+    parser.add_argument("--llm-batch", type=int, default=0,
+                        help="coalesce concurrent LLM calls into batches of up to N (local/stub backends)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deterministic", action="store_true",
+                        help="seeded simulation mode: per-agent RNG streams, virtual clock, ordered ids")
+    parser.add_argument("--out", help="append the JSON result as one line to this file")
+    args = parser.parse_args(argv)
+
+    workdir  = tempfile.mkdtemp(prefix="marketmind-bench-")
+    api_port = _free_port()
+    # Must be set before the project modules read them at import time.
+    os.environ["MARKETMIND_DB"] = os.path.join(workdir, "bench.db")
+    os.environ["MARKETMIND_RESPONSES_DIR"] = workdir
+    os.environ["MARKETMIND_API"] = f"http://127.0.0.1:{api_port}"
+    os.environ["MARKETMIND_STREAMING"] = "1" if args.stream else "0"
+
+    import requests
+    import uvicorn
+    from benchmarks.mock_llm import MockLLMServer
+    from agents.brand_agent import BrandAgent
+    from agents.consumer_agent import ConsumerAgent
+    from agents.profile_generator import generate_profiles
+    from interface.main import app
+    from interface.store import get_store
+    from agents.sinks import get_default_sink
+    from agents.parsing import PARSE_STATS
+    from tracing import REGISTRY
+    from llm.backends import make_llm
+    from simulation import run_simulation
+
+    mock = MockLLMServer(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                         error_rate=args.error_rate, seed=args.seed, token_ms=args.token_ms,
+                         chatter_chars=args.chatter_chars).start()
+    api = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=api_port, log_level="warning"))
+    threading.Thread(target=api.run, daemon=True).start()
+    while not api.started:
+        time.sleep(0.05)
+
+    random.seed(args.seed)
+    client = {"uiuc": {"api_key": "bench", "base_url": mock.url},
+              "local": {"base_url": mock.openai_url}, "stub": {}}[args.backend]
+    backend = make_llm(args.backend, batch=args.llm_batch, pool_size=args.max_in_flight,
+                       backoff_base=0.05, **client)
+    llm = TimedLLM(backend)
+    brands = {}
+    for i in range(args.brands):
+        profile = synthetic_brand(i)
+        brands[profile["name"]] = BrandAgent(profile, llm=llm)
+    consumers = {}
+    for profile in generate_profiles(args.consumers, seed=args.seed):
+        consumers[profile["id"]] = ConsumerAgent(profile, llm=llm)
+
+    # 1) Full simulation rounds
+    started = time.perf_counter()
+    totals = run_simulation.run(rounds=args.rounds, pause=0, max_in_flight=args.max_in_flight,
+                                batch_size=args.batch_size, surrogate_margin=args.surrogate_margin,
+                                brands=brands, consumers=consumers,
+                                seed=args.seed if args.deterministic else None, verbose=False)
+    sim_seconds = time.perf_counter() - started
+    sim_calls = list(llm.latencies)
+    digest = _run_digest(get_store().list_campaigns())
+
+    # 2) BrandAgent.generate_campaign on its own
+    brand = BrandAgent(synthetic_brand(999), llm=llm)
+    del llm.latencies[:]
+    started = time.perf_counter()
+    for _ in range(args.brand_calls):
+        brand.generate_campaign()
+    get_default_sink().flush()
+    brand_seconds = time.perf_counter() - started
+
+    # 3) GET /campaigns over the history the run produced
+    session = requests.Session()
+    api_times = {}
+    for label, params in (("full", {}), ("page_50_no_reactions", {"limit": 50, "include_reactions": "false"})):
+        samples = []
+        for _ in range(args.api_requests):
+            t0 = time.perf_counter()
+            session.get(f"{os.environ['MARKETMIND_API']}/campaigns/", params=params, timeout=60).raise_for_status()
+            samples.append(time.perf_counter() - t0)
+        api_times[label] = _latency_summary(samples)
+
+    api.should_exit = True
+    mock.stop()
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    result = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": vars(args),
+        "simulation": {
+            **totals,
+            "seconds": round(sim_seconds, 3),
+            "rounds_per_sec": round(totals.get("rounds", 0) / sim_seconds, 3),
+            "reactions_per_sec": round(totals.get("reactions", 0) / sim_seconds, 1),
+            "llm_calls_per_sec": round(len(sim_calls) / sim_seconds, 1),
+            "llm_latency": _latency_summary(sim_calls),
+            # Equal digests mean two runs posted the same campaigns and reactions
+            "digest": digest,
+        },
+        "brand_generate": {
+            "calls": args.brand_calls,
+            "campaigns_per_sec": round(args.brand_calls / brand_seconds, 2),
+            "llm_latency": _latency_summary(llm.latencies),
+        },
+        "api_get_campaigns": api_times,
+        "sink": get_default_sink().stats(),
+        "parse": PARSE_STATS.stats(),
+        "spans": REGISTRY.summary(),
+        "mock_llm": {"requests": mock.requests, "errors": mock.errors, "streams": mock.streams,
+                     "aborted": mock.aborted, "chars_sent": mock.chars_sent},
+    }
+    if hasattr(backend, "stats"):
+        result["llm_batching"] = backend.stats()
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
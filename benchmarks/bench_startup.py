@@ -0,0 +1,154 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark: import times, agent loading and API startup.
+
+    python -m benchmarks.bench_startup --repeat 5
+
+Every sample runs in a fresh interpreter, so nothing is warm but the OS
+file cache (and compiled .pyc files, which the first, discarded run writes).
+Reported per case, as medians over --repeat runs:
+
+  imports    time to import each entry-point module, measured inside the child
+  agents     import + load_brand_agents() + one ConsumerAgent per profile, with
+             no UIUC_API_KEY set (agents must not build an LLM client to exist)
+  cli        wall time of `python -m simulation.run_simulation --help`
+  api        launch of `uvicorn interface.main:app` until GET /metrics answers
+
+Results are printed as JSON and optionally appended as one JSON line to
+--out, like benchmarks.bench_simulation.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.bench_simulation import _free_port
+
+MODULES = [
+    "agents.brand_agent",
+    "agents.consumer_agent",
+    "simulation.run_simulation",
+    "simulation.sharded",
+    "interface.main",
+]
+
+_IMPORT = """
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "loaded": [m for m in ("requests", "httpx", "numpy", "fastapi") if m in sys.modules]}))
+"""
+
+_AGENTS = """
+import json, time
+started = time.perf_counter()
+from simulation.run_simulation import load_brand_agents
+from agents.consumer_agent import ConsumerAgent, load_consumer_profiles
+brands = load_brand_agents()
+consumers = [ConsumerAgent(p) for p in load_consumer_profiles().values()]
+print(json.dumps({"seconds": time.perf_counter() - started, "brands": len(brands), "consumers": len(consumers)}))
+"""
+
+
+def _env(workdir: str) -> dict:
+    env = dict(os.environ, MARKETMIND_DB=os.path.join(workdir, "startup.db"),
+               MARKETMIND_RESPONSES_DIR=workdir)
+    env.pop("UIUC_API_KEY", None)
+    return env
+
+
+def _child(code: str, *args, env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "child failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _wall(cmd: list, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(cmd, capture_output=True, env=env, check=True)
+    return time.perf_counter() - started
+
+
+def _api_startup(env: dict, timeout: float = 30.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "interface.main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                    return time.perf_counter() - started
+            except (OSError, socket.timeout):
+                if proc.poll() is not None:
+                    raise RuntimeError("API exited during startup")
+                time.sleep(0.01)
+        raise RuntimeError(f"API not up after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _ms(samples) -> dict:
+    return {"median_ms": round(statistics.median(samples) * 1000, 1),
+            "min_ms": round(min(samples) * 1000, 1)}
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-api", action="store_true", help="skip the uvicorn startup case")
+    parser.add_argument("--out", help="append the JSON result as one line to this file")
+    args = parser.parse_args(argv)
+
+    env = _env(tempfile.mkdtemp(prefix="marketmind-startup-"))
+    # Warm-up: compile .pyc files so every measured run starts alike
+    for module in MODULES:
+        _child(_IMPORT, module, env=env)
+
+    imports = {}
+    for module in MODULES:
+        runs = [_child(_IMPORT, module, env=env) for _ in range(args.repeat)]
+        imports[module] = {**_ms([r["seconds"] for r in runs]), "heavy_modules": runs[-1]["loaded"]}
+
+    agents = [_child(_AGENTS, env=env) for _ in range(args.repeat)]
+    cli = [_wall([sys.executable, "-m", "simulation.run_simulation", "--help"], env) for _ in range(args.repeat)]
+    python = [_wall([sys.executable, "-c", "pass"], env) for _ in range(args.repeat)]
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    result = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": vars(args),
+        "python_startup": _ms(python),
+        "imports": imports,
+        "agents": {**_ms([r["seconds"] for r in agents]),
+                   "brands": agents[-1]["brands"], "consumers": agents[-1]["consumers"]},
+        "cli_help": _ms(cli),
+    }
+    if not args.no_api:
+        result["api_startup"] = _ms([_api_startup(env) for _ in range(args.repeat)])
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
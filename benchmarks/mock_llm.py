@@ -0,0 +1,246 @@
+# benchmarks/mock_llm.py
+"""
+Mock LLM server for the benchmarks: uiuc.chat and OpenAI-compatible endpoints
+on a local port, with tunable latency, error rate and generation speed.
+
+    python -m benchmarks.mock_llm --port 8001 --latency-ms 80 --error-rate 0.02
+
+benchmarks.bench_simulation starts one in-process (see MockLLMServer); run it
+on its own to point the simulation or a local client at it by hand. Replies
+are canned but well-formed, so agents parse them like real completions.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_POST_ID_RE = re.compile(r"^\[post_id: (-?\d+)\]", re.MULTILINE)
+
+_WORDS = (
+    "stride grit dawn trail city comfort style value recycled cushion pace miles "
+    "bold fresh daily hustle street gym weekend lightweight durable modular drop"
+).split()
+_EMOJIS = ["🔥", "🚀", "⚡", "🌱", "💪", "👟"]
+_CTAS   = ["Shop now", "Grab yours today", "Try them on", "Join the run", "Step in"]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Streaming clients hang up as soon as they have what they need
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MockLLMServer:
+    """
+    Local stand-in for the uiuc.chat endpoint and, under /v1, for an
+    OpenAI-compatible local model server (see llm.backends). Answers with
+    canned `<<A>>/<<B>>` captions for brand prompts and `{thought, action}`
+    JSON (or a JSON array for batched prompts) for consumer prompts, after
+    a log-normally distributed delay. A fraction of requests fail with 503
+    to exercise client retries.
+
+    Output is "generated" at `token_ms` per CHUNK_CHARS characters, followed
+    by `chatter_chars` of commentary like a verbose model would add. With
+    "stream": true the text is sent as chunked plain text while it is being
+    generated, so clients that hang up early save the rest. On /v1, chat
+    completions stream as server-sent events and /v1/completions takes a list
+    of prompts, answered together after a single delay like a batching server.
+    """
+
+    CHUNK_CHARS = 8
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 50.0, latency_sigma: float = 0.5,
+                 error_rate: float = 0.0, seed: int = 0,
+                 token_ms: float = 0.0, chatter_chars: int = 0):
+        self.latency_ms    = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate    = error_rate
+        self.token_ms      = token_ms
+        self.chatter_chars = chatter_chars
+        self.requests      = 0
+        self.errors        = 0
+        self.streams       = 0
+        self.aborted       = 0
+        self.chars_sent    = 0
+        self.seed  = seed
+        self._rng  = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/chat-api/chat"
+
+    @property
+    def openai_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # ——— Canned responses ———
+
+    def _plan(self, prompt: str):
+        # Latency and failures: one draw per request, under the lock. The reply
+        # itself depends only on (seed, prompt), so a seeded run gets the same
+        # replies whatever order concurrent requests arrive in.
+        with self._lock:
+            self.requests += 1
+            delay = self._rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000.0
+            fail  = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, fail, random.Random(f"{self.seed}:{prompt}")
+
+    @staticmethod
+    def _caption(rng: random.Random) -> str:
+        body = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(14, 22))).capitalize()
+        tags = " ".join("#" + rng.choice(_WORDS).capitalize() + rng.choice(_WORDS).capitalize() for _ in range(2))
+        return f"{body} {rng.choice(_EMOJIS)} {rng.choice(_CTAS)}. {tags}"
+
+    @staticmethod
+    def _reaction(rng: random.Random) -> dict:
+        action = rng.choices(["LIKE", "SHARE", "IGNORE"], weights=[4, 1, 5])[0]
+        return {"thought": f"Mock reasoning {rng.randint(0, 9999)}.", "action": action}
+
+    def respond(self, prompt: str, rng: random.Random) -> str:
+        if "<<A>>" in prompt:
+            text = f"<<A>> {self._caption(rng)}\n<<B>> {self._caption(rng)}"
+        else:
+            post_ids = _POST_ID_RE.findall(prompt)
+            if post_ids:
+                text = json.dumps([{"post_id": int(pid), **self._reaction(rng)} for pid in post_ids])
+            else:
+                text = json.dumps(self._reaction(rng))
+        if self.chatter_chars:
+            words = []
+            while sum(len(w) + 1 for w in words) < self.chatter_chars:
+                words.append(rng.choice(_WORDS))
+            text += "\n\nNote: " + " ".join(words)
+        return text
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.rstrip("/").endswith("/v1/completions"):
+                    self._completions(payload)
+                    return
+                openai = self.path.rstrip("/").endswith("/v1/chat/completions")
+                prompt = next((m["content"] for m in reversed(payload.get("messages", []))
+                               if m.get("role") == "user"), "")
+                delay, fail, rng = server._plan(prompt)
+                time.sleep(delay)
+                if fail:
+                    self._send(503, {"error": "mock overload"}, {"Retry-After": "0"})
+                    return
+                text = server.respond(prompt, rng)
+                if payload.get("stream"):
+                    self._stream(text, sse=openai)
+                    return
+                time.sleep(server.token_ms / 1000.0 * -(-len(text) // server.CHUNK_CHARS))
+                server._count(chars_sent=len(text))
+                if openai:
+                    self._send(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]})
+                else:
+                    self._send(200, {"message": text})
+
+            def _completions(self, payload):
+                prompts = payload.get("prompt") or [""]
+                prompts = [prompts] if isinstance(prompts, str) else prompts
+                delay, fail, _ = server._plan("")
+                time.sleep(delay)
+                if fail:
+                    self._send(503, {"error": "mock overload"}, {"Retry-After": "0"})
+                    return
+                texts = [server.respond(p, random.Random(f"{server.seed}:{p}")) for p in prompts]
+                # Batched sequences are generated side by side: time of the longest
+                time.sleep(server.token_ms / 1000.0 * -(-max(map(len, texts)) // server.CHUNK_CHARS))
+                server._count(chars_sent=sum(map(len, texts)))
+                self._send(200, {"choices": [{"index": i, "text": t} for i, t in enumerate(texts)]})
+
+            def _stream(self, text, sse=False):
+                server._count(streams=1)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream" if sse else "text/plain; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i in range(0, len(text), server.CHUNK_CHARS):
+                        time.sleep(server.token_ms / 1000.0)
+                        data = text[i:i + server.CHUNK_CHARS].encode("utf-8")
+                        if sse:
+                            delta = {"choices": [{"index": 0, "delta": {"content": text[i:i + server.CHUNK_CHARS]}}]}
+                            data = b"data: %s\n\n" % json.dumps(delta).encode("utf-8")
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                        server._count(chars_sent=len(text[i:i + server.CHUNK_CHARS]))
+                    if sse:
+                        self.wfile.write(b"e\r\ndata: [DONE]\n\n\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count(aborted=1)
+                    self.close_connection = True
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock uiuc.chat LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-ms", type=float, default=0.0, help="generation time per 8 characters")
+    parser.add_argument("--chatter-chars", type=int, default=0, help="commentary appended after the answer")
+    args = parser.parse_args()
+
+    srv = MockLLMServer(port=args.port, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                        error_rate=args.error_rate, seed=args.seed, token_ms=args.token_ms,
+                        chatter_chars=args.chatter_chars)
+    print(f"Mock LLM listening on {srv.url} (OpenAI-compatible: {srv.openai_url})")
+    try:
+        srv._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,11 +1,61 @@
 // src/api/campaigns.js
-export async function getCampaigns() {
-  const res = await fetch("http://localhost:8000/campaigns/");
-  return res.ok ? res.json() : [];
+const API = "http://localhost:8000";
+const PAGE_SIZE = 200;
+
+let campaignsCache = null;   // newest first
+let campaignsEventSeq = null;
+let newCampaignsETag = null;
+
+// Every campaign matching `query` (newest first), a page at a time via X-Next-Cursor.
+// Resolves to null if a request fails; `etag` revalidates the first page.
+async function fetchCampaignPages(query, etag = null) {
+  const campaigns = [];
+  let cursor = null;
+  let first = null;
+  do {
+    const params = new URLSearchParams({ ...query, limit: PAGE_SIZE });
+    if (cursor) params.set("cursor", cursor);
+    const headers = !cursor && etag ? { "If-None-Match": etag } : {};
+    const res = await fetch(`${API}/campaigns/?${params}`, { headers });
+    if (res.status === 304) return { campaigns, first: res, notModified: true };
+    if (!res.ok) return null;
+    first = first || res;
+    campaigns.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return { campaigns, first, notModified: false };
+}
+
+// Campaigns newest first. The first call (or one with `reload`) pages through
+// the whole list; later calls fetch only campaigns newer than the newest one
+// held (since_id), so an idle poll is a single 304. Polls do not refresh the
+// stats of campaigns already held: their reactions come from the live feed.
+export async function getCampaigns({ reload = false } = {}) {
+  return (await getCampaignsSnapshot({ reload })).campaigns;
+}
+
+// getCampaigns() plus the change-feed position (X-Event-Seq) of the first full
+// load; start subscribeCampaignEvents from it to miss nothing since then.
+export async function getCampaignsSnapshot({ reload = false } = {}) {
+  if (reload || !campaignsCache || campaignsCache.length === 0) {
+    const result = await fetchCampaignPages({});
+    if (!result) return { campaigns: [...(campaignsCache || [])], eventSeq: campaignsEventSeq };
+    campaignsCache = result.campaigns;
+    campaignsEventSeq = result.first.headers.get("X-Event-Seq");
+    newCampaignsETag = null;
+  } else {
+    const result = await fetchCampaignPages({ since_id: campaignsCache[0].id }, newCampaignsETag);
+    if (result && !result.notModified) {
+      // An ETag is only worth keeping while since_id (and so the query) stays the same
+      newCampaignsETag = result.campaigns.length ? null : result.first.headers.get("ETag");
+      campaignsCache = [...result.campaigns, ...campaignsCache];
+    }
+  }
+  return { campaigns: [...campaignsCache], eventSeq: campaignsEventSeq };
 }
 
 export async function likeCampaign(id) {
-  await fetch(`http://localhost:8000/campaigns/${id}/like`, { method: "POST" });
+  await fetch(`${API}/campaigns/${id}/like`, { method: "POST" });
 }
 
 export async function shareCampaign(id) {
@@ -13,5 +63,35 @@ export async function shareCampaign(id) {
 }
 
 export async function followBrand(brandName) {
-  await fetch(`http://localhost:8000/brands/${brandName}/follow`, { method: "POST" });
-}
\ No newline at end of file
+  await fetch(`${API}/brands/${brandName}/follow`, { method: "POST" });
+}
+
+// Live feed from event `since` on (default: the current end of the feed). The
+// browser's EventSource reconnects on its own and resumes from the last event
+// id it saw, so no updates are lost between reconnects. `onReset` is called if
+// the server has pruned events the client still needed: reload the snapshot.
+export function subscribeCampaignEvents({ since, onCampaign, onReaction, onReset }) {
+  const query = since != null ? `?last_event_id=${since}` : "";
+  const source = new EventSource(`${API}/campaigns/stream${query}`);
+  source.addEventListener("campaign.created", (e) => onCampaign(JSON.parse(e.data)));
+  source.addEventListener("reaction.recorded", (e) => onReaction(JSON.parse(e.data)));
+  if (onReset) source.addEventListener("feed.reset", () => onReset());
+  return () => source.close();
+}
+
+// Fold a reaction event into a post, replacing any earlier reaction by the same consumer.
+export function applyReaction(post, reaction) {
+  const { post_id, ...entry } = reaction;
+  const reactions = [
+    ...(post.reactions || []).filter((r) => r.consumer_id !== entry.consumer_id),
+    entry,
+  ];
+  return {
+    ...post,
+    reactions,
+    stats: {
+      likes: reactions.filter((r) => r.action === "LIKE").length,
+      shares: reactions.filter((r) => r.action === "SHARE").length,
+    },
+  };
+}
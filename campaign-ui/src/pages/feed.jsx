@@ -13,7 +13,9 @@ import AccountCircleIcon from "@mui/icons-material/AccountCircle";
 
 import { PostCard } from "../components/postcard";
 import {
-  getCampaigns,
+  getCampaignsSnapshot,
+  subscribeCampaignEvents,
+  applyReaction,
   likeCampaign,
   shareCampaign,
   followBrand,
@@ -23,10 +25,40 @@ export function Feed() {
   const [posts, setPosts] = useState([]);
 
   useEffect(() => {
-    const fetchData = () => getCampaigns().then((data) => setPosts(data.reverse()));
-    fetchData();
-    const interval = setInterval(fetchData, 3000);
-    return () => clearInterval(interval);
+    let unsubscribe = () => {};
+    let active = true;
+
+    // Load a snapshot, then stream the events after it from /campaigns/stream.
+    // The stream starts only once the snapshot is applied, and replayed events
+    // it already covers are no-ops, so nothing is lost or overwritten.
+    const load = (reload) =>
+      getCampaignsSnapshot({ reload }).then(({ campaigns, eventSeq }) => {
+        if (!active) return;
+        setPosts(campaigns.reverse());
+        unsubscribe = subscribeCampaignEvents({
+          since: eventSeq,
+          onCampaign: (camp) =>
+            setPosts((prev) =>
+              prev.some((p) => p.id === camp.id)
+                ? prev
+                : [...prev, { ...camp, stats: { likes: 0, shares: 0 }, reactions: [] }]
+            ),
+          onReaction: (reaction) =>
+            setPosts((prev) =>
+              prev.map((p) => (p.id === reaction.post_id ? applyReaction(p, reaction) : p))
+            ),
+          onReset: () => {
+            unsubscribe();
+            load(true);
+          },
+        });
+      });
+
+    load(false);
+    return () => {
+      active = false;
+      unsubscribe();
+    };
   }, []);
 
   return (
@@ -0,0 +1,259 @@
+# interface/analytics.py
+"""
+Engagement rollups kept next to the raw campaign/reaction tables.
+
+Every write to the store adjusts one `rollups` row per (dimension, key) it
+touches, inside the same transaction, so reading a brand's or a round's
+engagement is a primary-key lookup instead of a scan over reactions:
+
+    campaign  key = campaign id
+    brand     key = brand name
+    usp       key = USP text
+    round     key = simulation round (campaigns posted outside a run: "none")
+    trait     key = "<trait>:<low|mid|high>" for each personality trait of
+                    the reacting consumer; when a consumer's stored profile
+                    arrives or changes, all of its reactions move buckets
+
+Rows count campaigns (not for the campaign/trait dimensions), reactions and
+each action. rebuild() recomputes everything from the raw tables in one
+streaming pass, e.g. after importing data written before rollups existed:
+
+    python -m interface.store rebuild-analytics
+"""
+
+import json
+from collections import defaultdict
+
+DIMENSIONS = ("campaign", "brand", "usp", "round", "trait")
+COLUMNS    = ("campaigns", "reactions", "likes", "shares", "ignores")
+
+# Trait values are 0..1; bucket upper bounds
+TRAIT_BUCKETS = ((1 / 3, "low"), (2 / 3, "mid"), (float("inf"), "high"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    dim       TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    campaigns INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    likes     INTEGER NOT NULL DEFAULT 0,
+    shares    INTEGER NOT NULL DEFAULT 0,
+    ignores   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dim, key)
+);
+
+-- Trait profile of every consumer that has reacted, for the trait buckets.
+CREATE TABLE IF NOT EXISTS consumers (
+    id     TEXT PRIMARY KEY,
+    traits TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+_UPSERT = f"""
+INSERT INTO rollups (dim, key, {", ".join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (dim, key) DO UPDATE SET
+    {", ".join(f"{c} = {c} + excluded.{c}" for c in COLUMNS)}
+"""
+
+_ACTION_COLUMN = {"LIKE": 2, "SHARE": 3, "IGNORE": 4}
+
+
+def trait_bucket(value) -> str:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return next(name for bound, name in TRAIT_BUCKETS if value < bound)
+
+
+def trait_keys(traits: dict) -> list:
+    keys = []
+    for name, value in (traits or {}).items():
+        bucket = trait_bucket(value)
+        if bucket is not None:
+            keys.append(f"{name}:{bucket}")
+    return keys
+
+
+def _round_key(round_no) -> str:
+    return "none" if round_no is None else str(round_no)
+
+
+class Deltas:
+    """(dim, key) -> per-column increments, written with one executemany."""
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: [0] * len(COLUMNS))
+
+    def campaign(self, brand: str, usp: str, round_no, counts=(0, 0, 0, 0), sign: int = 1):
+        """
+        One campaign under its brand/usp/round, together with the reaction
+        `counts` (reactions, likes, shares, ignores) it already carries.
+        """
+        for dim, key in (("brand", brand), ("usp", usp), ("round", _round_key(round_no))):
+            row = self.rows[(dim, key)]
+            row[0] += sign
+            for i, n in enumerate(counts, 1):
+                row[i] += sign * n
+
+    def reaction(self, post_id: int, action: str, campaign: tuple, traits: list, sign: int = 1):
+        """`campaign` is (brand, usp, round) or None when the campaign is unknown."""
+        col = _ACTION_COLUMN.get(action, 4)
+        keys = [("campaign", str(post_id))] + [("trait", k) for k in traits]
+        if campaign is not None:
+            brand, usp, round_no = campaign
+            keys += [("brand", brand), ("usp", usp), ("round", _round_key(round_no))]
+        for key in keys:
+            row = self.rows[key]
+            row[1]   += sign
+            row[col] += sign
+
+    def traits(self, action: str, traits: list, n: int = 1, sign: int = 1):
+        """`n` reactions with `action` under the trait buckets only, e.g. when a profile changes."""
+        col = _ACTION_COLUMN.get(action, 4)
+        for key in traits:
+            row = self.rows[("trait", key)]
+            row[1]   += sign * n
+            row[col] += sign * n
+
+    def apply(self, conn):
+        rows = [(dim, key, *vals) for (dim, key), vals in self.rows.items() if any(vals)]
+        if rows:
+            conn.executemany(_UPSERT, rows)
+        if any(v < 0 for row in rows for v in row[2:]):
+            # Keys whose counts moved elsewhere are dropped, as rebuild() would not write them
+            conn.execute("DELETE FROM rollups WHERE campaigns = 0 AND reactions = 0")
+        self.rows.clear()
+
+
+def _chunks(items: list, size: int = 400):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def campaign_info(conn, post_ids) -> dict:
+    """post id -> (brand, usp, round) for the campaigns that exist."""
+    info, ids = {}, sorted(set(post_ids))
+    for chunk in _chunks(ids):
+        rows = conn.execute(
+            f"SELECT id, brand_name, usp, round FROM campaigns WHERE id IN ({','.join('?' * len(chunk))})", chunk
+        )
+        info.update((cid, (brand, usp, round_no)) for cid, brand, usp, round_no in rows)
+    return info
+
+
+def campaign_counts(conn, post_ids) -> dict:
+    """post id -> (reactions, likes, shares, ignores) from the per-campaign rollups."""
+    out, keys = {}, sorted({str(pid) for pid in post_ids})
+    for chunk in _chunks(keys):
+        rows = conn.execute(
+            f"SELECT key, {', '.join(COLUMNS[1:])} FROM rollups WHERE dim = 'campaign' "
+            f"AND key IN ({','.join('?' * len(chunk))})", chunk
+        )
+        out.update((int(key), tuple(values)) for key, *values in rows)
+    return out
+
+
+def consumer_traits(conn, consumer_ids) -> dict:
+    """consumer id -> trait bucket keys, for consumers with a stored profile."""
+    out, ids = {}, sorted(set(consumer_ids))
+    for chunk in _chunks(ids):
+        rows = conn.execute(f"SELECT id, traits FROM consumers WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        out.update((cid, trait_keys(json.loads(traits))) for cid, traits in rows)
+    return out
+
+
+def consumer_actions(conn, consumer_ids) -> dict:
+    """consumer id -> {action: stored reactions} for the consumers that have reacted."""
+    out, ids = defaultdict(dict), sorted(set(consumer_ids))
+    for chunk in _chunks(ids):
+        rows = conn.execute(
+            f"SELECT consumer_id, action, COUNT(*) FROM reactions WHERE consumer_id IN ({','.join('?' * len(chunk))}) "
+            "GROUP BY consumer_id, action", chunk
+        )
+        for cid, action, n in rows:
+            out[cid][action] = n
+    return dict(out)
+
+
+def campaign_reactions(conn, post_ids) -> list:
+    """(consumer_id, post_id, action) of every stored reaction to these campaigns."""
+    out, ids = [], sorted(set(post_ids))
+    for chunk in _chunks(ids):
+        out += conn.execute(
+            f"SELECT consumer_id, post_id, action FROM reactions WHERE post_id IN ({','.join('?' * len(chunk))})", chunk
+        ).fetchall()
+    return out
+
+
+def existing_reactions(conn, keys: list) -> dict:
+    """(consumer_id, post_id) -> action for the keys that are already stored."""
+    out = {}
+    for chunk in _chunks(keys, 200):
+        # Joined from the VALUES list so each key is a primary-key lookup (a row-value IN scans)
+        rows = conn.execute(
+            f"SELECT r.consumer_id, r.post_id, r.action FROM (VALUES {','.join(['(?, ?)'] * len(chunk))}) AS k "
+            "JOIN reactions r ON r.consumer_id = k.column1 AND r.post_id = k.column2",
+            [v for key in chunk for v in key]
+        )
+        out.update(((cid, pid), action) for cid, pid, action in rows)
+    return out
+
+
+# ——— Reads ———
+
+def _row(dim: str, key: str, values) -> dict:
+    row = {"dimension": dim, "key": key, **dict(zip(COLUMNS, values))}
+    if dim in ("campaign", "trait"):
+        del row["campaigns"]
+    engaged = row["likes"] + row["shares"]
+    row["engagement_rate"] = round(engaged / row["reactions"], 4) if row["reactions"] else 0.0
+    return row
+
+
+def get_rollup(conn, dim: str, key: str) -> dict:
+    """One rollup row, or None if nothing has been recorded for it."""
+    values = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM rollups WHERE dim = ? AND key = ?", (dim, str(key))
+    ).fetchone()
+    return _row(dim, str(key), values) if values else None
+
+
+def list_rollups(conn, dim: str) -> list:
+    """All rows of a dimension, most reactions first."""
+    rows = conn.execute(
+        f"SELECT key, {', '.join(COLUMNS)} FROM rollups WHERE dim = ? ORDER BY reactions DESC, key", (dim,)
+    )
+    return [_row(dim, key, values) for key, *values in rows]
+
+
+# ——— Rebuild ———
+
+def rebuild(conn) -> int:
+    """
+    Recompute all rollups from the campaigns, reactions and consumers tables.
+    Rows are streamed from cursors, so memory grows with the number of
+    rollup keys, not with the number of reactions. Returns the rollup rows written.
+    """
+    deltas = Deltas()
+    for brand, usp, round_no in conn.execute("SELECT brand_name, usp, round FROM campaigns"):
+        deltas.campaign(brand, usp, round_no)
+
+    traits_cache = {}
+    rows = conn.execute("""
+        SELECT r.consumer_id, r.post_id, r.action, c.id, c.brand_name, c.usp, c.round, p.traits
+        FROM reactions r
+        LEFT JOIN campaigns c ON c.id = r.post_id
+        LEFT JOIN consumers p ON p.id = r.consumer_id
+    """)
+    for consumer_id, post_id, action, cid, brand, usp, round_no, traits in rows:
+        if consumer_id not in traits_cache:
+            traits_cache[consumer_id] = trait_keys(json.loads(traits)) if traits else []
+        campaign = (brand, usp, round_no) if cid is not None else None
+        deltas.reaction(post_id, action, campaign, traits_cache[consumer_id])
+
+    with conn:
+        conn.execute("DELETE FROM rollups")
+        n = len(deltas.rows)
+        deltas.apply(conn)
+    return n
@@ -1,10 +1,16 @@
 # interface/main.py
 
-import os
-import xml.etree.ElementTree as ET
-from fastapi import FastAPI
+import hashlib
+import time
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from collections import defaultdict
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from interface.routes import posts
+from interface.store import get_store, import_posted, import_xml
+from interface.stream import EventBroadcaster
+from tracing import REGISTRY, span
 
 app = FastAPI()
 app.add_middleware(
@@ -13,68 +19,122 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Event-Seq"],
 )
+app.include_router(posts.router)
+
+@app.middleware("http")
+async def _time_requests(request: Request, call_next):
+    # Per-route latency histogram (time to response headers for streams)
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REGISTRY.observe("http_request_seconds", time.perf_counter() - started, method=request.method,
+                     path=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
+
+_broadcaster = None
+
+def get_broadcaster() -> EventBroadcaster:
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = EventBroadcaster(get_store())
+    return _broadcaster
+
+@app.on_event("startup")
+def _import_legacy_responses():
+    # First start against an empty store: pull in the XML response history and
+    # the campaigns posted before the API wrote to the store, once.
+    store = get_store()
+    if store.is_empty():
+        n_camp, n_react = import_xml(store=store)
+        print(f"[Store] Imported {n_camp} campaign(s) and {n_react} reaction(s) from XML")
+        print(f"[Store] Imported {import_posted(store=store)} posted campaign(s)")
 
 @app.get("/campaigns")
 @app.get("/campaigns/")
-def get_campaigns():
-    # 1) Load campaigns from brand_responses
-    base = os.path.abspath(os.path.join(os.path.dirname(__file__), "../agents/brand_responses"))
-    campaigns = []
-    if os.path.isdir(base):
-        for brand in os.listdir(base):
-            brand_dir = os.path.join(base, brand)
-            if not os.path.isdir(brand_dir):
-                continue
-            for fname in os.listdir(brand_dir):
-                if not fname.endswith(".xml"):
-                    continue
-                path = os.path.join(brand_dir, fname)
-                try:
-                    root = ET.parse(path).getroot()
-                    data = {c.tag: c.text for c in root}
-                    data["brand_name"] = brand
-                    data["id"] = int(data.get("id", 0))
-                    data["usp"] = data.get("usp", "")
-                    data["caption"] = data.get("caption", "")
-                    data["timestamp"] = data.get("timestamp", "")
-                    campaigns.append(data)
-                except ET.ParseError:
-                    continue
-
-    # 2) Load reactions from consumer_responses
-    reactions_map = defaultdict(list)
-    resp_base = os.path.abspath(os.path.join(os.path.dirname(__file__), "../agents/consumer_responses"))
-    if os.path.isdir(resp_base):
-        for consumer_id in os.listdir(resp_base):
-            cdir = os.path.join(resp_base, consumer_id)
-            if not os.path.isdir(cdir):
-                continue
-            for fname in os.listdir(cdir):
-                if not fname.endswith(".xml"):
-                    continue
-                path = os.path.join(cdir, fname)
-                try:
-                    root = ET.parse(path).getroot()
-                    rid = int(root.findtext("post_id", default="0"))
-                    action = root.findtext("action", default="IGNORE")
-                    thought = root.findtext("thought", default="")
-                    reactions_map[rid].append({
-                        "consumer_id": consumer_id,
-                        "action": action,
-                        "thought": thought
-                    })
-                except ET.ParseError:
-                    continue
-
-    # 3) Attach stats & reactions, sort newest first
-    for camp in campaigns:
-        rid = camp["id"]
-        reacts = reactions_map.get(rid, [])
-        likes  = sum(1 for r in reacts if r["action"]=="LIKE")
-        shares = sum(1 for r in reacts if r["action"]=="SHARE")
-        camp["stats"]     = {"likes": likes, "shares": shares}
-        camp["reactions"] = reacts
-
-    campaigns.sort(key=lambda c: c["id"], reverse=True)
-    return campaigns
\ No newline at end of file
+def get_campaigns(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="Return campaigns older than this id (X-Next-Cursor)"),
+    brand: Optional[str] = None,
+    since_id: Optional[int] = Query(None, description="Return only campaigns newer than this id"),
+    since_timestamp: Optional[str] = Query(None, description="ISO timestamp; return only newer campaigns"),
+    include_reactions: bool = True,
+):
+    store = get_store()
+
+    # The ETag covers the store version and the query, so unchanged data costs a 304.
+    etag = '"' + hashlib.sha1(f"{store.version()}|{request.url.query}".encode()).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Read before the campaigns: a stream started after this seq misses nothing the
+    # snapshot lacks (events it already covers are applied idempotently by the client).
+    event_seq = store.last_event_seq()
+
+    # Campaigns newest first, with stats (& reactions) attached
+    with span("api.get_campaigns", include_reactions=include_reactions):
+        campaigns = store.list_campaigns(
+            limit=limit,
+            cursor=cursor,
+            brand=brand,
+            since_id=since_id,
+            since_timestamp=since_timestamp,
+            include_reactions=include_reactions,
+        )
+    response.headers["ETag"] = etag
+    response.headers["X-Event-Seq"] = str(event_seq)
+    if limit is not None and len(campaigns) == limit:
+        response.headers["X-Next-Cursor"] = str(campaigns[-1]["id"])
+    return campaigns
+
+# URL segment -> interface.analytics dimension
+_ANALYTICS_DIMENSIONS = {"campaigns": "campaign", "brands": "brand", "usps": "usp", "rounds": "round", "traits": "trait"}
+
+def _dimension(name: str) -> str:
+    if name not in _ANALYTICS_DIMENSIONS:
+        raise HTTPException(404, f"Unknown analytics dimension {name!r}; use one of {', '.join(_ANALYTICS_DIMENSIONS)}")
+    return _ANALYTICS_DIMENSIONS[name]
+
+@app.get("/analytics/{dimension}")
+def get_analytics(dimension: str):
+    """Engagement rollups (reactions, likes, shares, ignores, engagement_rate) for every key of a dimension."""
+    return get_store().analytics(_dimension(dimension))
+
+@app.get("/analytics/{dimension}/{key:path}")
+def get_analytics_key(dimension: str, key: str):
+    """One rollup row, e.g. /analytics/brands/EnduraStride or /analytics/traits/loyalty:high."""
+    row = get_store().analytics(_dimension(dimension), key)
+    if row is None:
+        raise HTTPException(404, f"No {dimension} analytics for {key!r}")
+    return row
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/campaigns/stream")
+async def stream_campaigns(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id"),
+):
+    """
+    Server-sent events feed of `campaign.created` and `reaction.recorded`.
+    Reconnecting clients resume via the Last-Event-ID header (or ?last_event_id=);
+    new clients start from the current end of the feed.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        since = int(header)
+    elif last_event_id is not None:
+        since = last_event_id
+    else:
+        since = get_store().last_event_seq()
+    return StreamingResponse(
+        get_broadcaster().stream(since, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
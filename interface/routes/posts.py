@@ -1,11 +1,12 @@
-# interface/routes/campaigns.py
+# interface/routes/posts.py
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List
-from db import read_campaigns, write_campaigns
+from interface.store import get_store
 
+# GET /campaigns/ is served by interface.main; posted campaigns go into the
+# same campaign store, so they are listed (and streamed) like the agents' own.
 router = APIRouter(tags=["campaigns"])
 
 class CampaignPost(BaseModel):
@@ -14,16 +15,9 @@ class CampaignPost(BaseModel):
     caption: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-@router.post("/campaigns/", response_model=CampaignPost)
+@router.post("/campaigns/", response_model=CampaignPost, status_code=201)
 def create_campaign(post: CampaignPost):
-    campaigns = read_campaigns()
-    # ensure unique ID
-    if any(c["id"] == post.id for c in campaigns):
-        raise HTTPException(400, "Campaign ID already exists")
-    campaigns.append(post.dict())
-    write_campaigns(campaigns)
+    # The store never overwrites an existing id; nothing stored means a duplicate
+    if not get_store().add_campaigns([post.model_dump()]):
+        raise HTTPException(409, "Campaign ID already exists")
     return post
-
-@router.get("/campaigns/", response_model=List[CampaignPost])
-def list_campaigns():
-    return read_campaigns()
\ No newline at end of file
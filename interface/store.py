@@ -0,0 +1,478 @@
+# interface/store.py
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from xml.etree import ElementTree as ET
+
+from interface import analytics
+
+BASE_DIR   = os.path.dirname(__file__)
+DB_PATH    = os.getenv("MARKETMIND_DB", os.path.join(BASE_DIR, "data", "marketmind.db"))
+AGENTS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "agents"))
+# Campaigns posted to the API before it wrote to this store (whole-file JSON, then JSON Lines)
+POSTED_PATHS = (os.path.join(BASE_DIR, "data", "campaigns.json"), os.path.join(BASE_DIR, "data", "campaigns.jsonl"))
+# Change events kept for resuming streams; older ones are pruned as new ones are written
+EVENTS_KEEP = int(os.getenv("MARKETMIND_EVENTS_KEEP", "100000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id          INTEGER PRIMARY KEY,
+    brand_name  TEXT NOT NULL,
+    caption     TEXT NOT NULL DEFAULT '',
+    usp         TEXT NOT NULL DEFAULT '',
+    timestamp   TEXT NOT NULL DEFAULT '',
+    round       INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_campaigns_brand     ON campaigns(brand_name, id);
+CREATE INDEX IF NOT EXISTS idx_campaigns_timestamp ON campaigns(timestamp);
+
+CREATE TABLE IF NOT EXISTS reactions (
+    consumer_id TEXT NOT NULL,
+    post_id     INTEGER NOT NULL,
+    action      TEXT NOT NULL,
+    thought     TEXT NOT NULL DEFAULT '',
+    timestamp   TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (consumer_id, post_id)
+);
+CREATE INDEX IF NOT EXISTS idx_reactions_post      ON reactions(post_id);
+CREATE INDEX IF NOT EXISTS idx_reactions_timestamp ON reactions(timestamp);
+
+-- Bumped by every write so readers can build cheap ETags.
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+
+-- Ordered change feed behind GET /campaigns/stream; seq doubles as the SSE event id.
+CREATE TABLE IF NOT EXISTS events (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind    TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+_BUMP_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+# AUTOINCREMENT never reuses a pruned seq, so stream ids stay monotonic
+_PRUNE_EVENTS = "DELETE FROM events WHERE seq <= (SELECT MAX(seq) FROM events) - ?"
+
+
+class CampaignStore:
+    """
+    SQLite store for campaigns and consumer reactions. Agents write to it as
+    they produce records and the API reads from it, so listing campaigns is
+    one indexed query instead of a scan over the XML response directories.
+    Each thread gets its own connection; WAL mode lets the simulation write
+    while the API reads.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path   = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(campaigns)")}
+        if "round" not in columns:
+            conn.execute("ALTER TABLE campaigns ADD COLUMN round INTEGER")
+        has_rollups = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+        ).fetchone() is not None
+        conn.executescript(analytics.SCHEMA)
+        # Stores written before rollups existed get them computed once
+        if not has_rollups and not self.is_empty():
+            analytics.rebuild(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ——— Writes ———
+
+    def add_campaign(self, record: dict):
+        self.add_campaigns([record])
+
+    def add_campaigns(self, records: list, emit_events: bool = True) -> int:
+        """
+        Store new campaigns. Ids already in the store are never overwritten:
+        those records are skipped with a warning. Returns the number stored.
+        """
+        rows = [
+            (int(r["id"]), r["brand_name"], r.get("caption", ""), r.get("usp", ""), str(r.get("timestamp", "")),
+             _round_of(r))
+            for r in records
+        ]
+        rows = list({row[0]: row for row in rows}.values())
+        with self._conn() as conn:
+            existing = analytics.campaign_info(conn, [row[0] for row in rows])
+            if existing:
+                print(f"[Store] Refusing to overwrite {len(existing)} existing campaign id(s): "
+                      f"{sorted(existing)[:5]}{' ...' if len(existing) > 5 else ''}")
+                rows = [row for row in rows if row[0] not in existing]
+            # Rollups: reactions may already have arrived for a new campaign
+            counts = analytics.campaign_counts(conn, [row[0] for row in rows])
+            deltas = analytics.Deltas()
+            for cid, brand, _, usp, _, round_no in rows:
+                deltas.campaign(brand, usp, round_no, counts.get(cid, (0, 0, 0, 0)))
+
+            conn.executemany(
+                "INSERT OR IGNORE INTO campaigns (id, brand_name, caption, usp, timestamp, round) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            deltas.apply(conn)
+            conn.execute(_BUMP_VERSION)
+            if emit_events:
+                conn.executemany(
+                    "INSERT INTO events (kind, payload) VALUES ('campaign.created', ?)",
+                    [(json.dumps({"id": cid, "caption": caption, "usp": usp, "timestamp": ts, "brand_name": brand,
+                                  "round": round_no}),)
+                     for cid, brand, caption, usp, ts, round_no in rows]
+                )
+                conn.execute(_PRUNE_EVENTS, (EVENTS_KEEP,))
+        return len(rows)
+
+    def add_reaction(self, consumer_id: str, record: dict):
+        self.add_reactions([{"consumer_id": consumer_id, **record}])
+
+    def add_reactions(self, records: list, emit_events: bool = True) -> int:
+        """
+        Store new reactions. A consumer's existing reaction to a post is never
+        overwritten: such records are skipped with a warning. Returns the
+        number stored.
+        """
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (r["consumer_id"], int(r["post_id"]), r.get("action", "IGNORE"), r.get("thought", ""),
+             r.get("timestamp") or now)
+            for r in records
+        ]
+        # Within a batch a later record for the same (consumer, post) wins
+        rows = list({row[:2]: row for row in rows}.values())
+        profiles = {r["consumer_id"]: r["traits"] for r in records if r.get("traits")}
+        with self._conn() as conn:
+            existing = analytics.existing_reactions(conn, [(cid, pid) for cid, pid, *_ in rows])
+            if existing:
+                print(f"[Store] Refusing to overwrite {len(existing)} existing reaction(s)")
+                rows = [row for row in rows if row[:2] not in existing]
+            keys = [(cid, pid) for cid, pid, *_ in rows]
+            campaigns = analytics.campaign_info(conn, [pid for _, pid in keys])
+            traits = analytics.consumer_traits(conn, [cid for cid, _ in keys] + list(profiles))
+            deltas = analytics.Deltas()
+            if profiles:
+                # Rollups: reactions stored before a consumer's profile (or under an
+                # older one) move into the buckets of the new traits, as rebuild() counts them
+                new_traits = {cid: analytics.trait_keys(t) for cid, t in profiles.items()}
+                changed = [cid for cid, t in new_traits.items() if sorted(t) != sorted(traits.get(cid, []))]
+                for cid, actions in analytics.consumer_actions(conn, changed).items():
+                    for action, n in actions.items():
+                        deltas.traits(action, traits.get(cid, []), n, sign=-1)
+                        deltas.traits(action, new_traits[cid], n)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO consumers (id, traits) VALUES (?, ?)",
+                    [(cid, json.dumps(t)) for cid, t in profiles.items()]
+                )
+                traits.update(new_traits)
+            for cid, pid, action, *_ in rows:
+                deltas.reaction(pid, action, campaigns.get(pid), traits.get(cid, []))
+
+            conn.executemany(
+                "INSERT OR IGNORE INTO reactions (consumer_id, post_id, action, thought, timestamp) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            deltas.apply(conn)
+            conn.execute(_BUMP_VERSION)
+            if emit_events:
+                conn.executemany(
+                    "INSERT INTO events (kind, payload) VALUES ('reaction.recorded', ?)",
+                    [(json.dumps({"consumer_id": consumer_id, "post_id": post_id, "action": action, "thought": thought}),)
+                     for consumer_id, post_id, action, thought, _ in rows]
+                )
+                conn.execute(_PRUNE_EVENTS, (EVENTS_KEEP,))
+        return len(rows)
+
+    def discard_rounds_after(self, round_no: int, after_id: int = 0) -> int:
+        """
+        Delete the campaigns of simulation rounds after `round_no` whose ids
+        are above `after_id`, with their reactions, e.g. the rounds a crashed
+        run stored after its last checkpoint. Campaigns outside a run (no
+        round) are kept. Rollups are adjusted, and a `feed.reset` event tells
+        stream clients to reload. Returns the number of campaigns deleted.
+        """
+        with self._conn() as conn:
+            doomed = conn.execute(
+                "SELECT id, brand_name, usp, round FROM campaigns WHERE round > ? AND id > ?", (round_no, after_id)
+            ).fetchall()
+            if not doomed:
+                return 0
+            ids = [cid for cid, *_ in doomed]
+            campaigns = {cid: (brand, usp, rnd) for cid, brand, usp, rnd in doomed}
+            reactions = analytics.campaign_reactions(conn, ids)
+            traits = analytics.consumer_traits(conn, [cid for cid, *_ in reactions])
+            deltas = analytics.Deltas()
+            for cid, pid, action in reactions:
+                deltas.reaction(pid, action, campaigns[pid], traits.get(cid, []), sign=-1)
+            for brand, usp, rnd in campaigns.values():
+                deltas.campaign(brand, usp, rnd, sign=-1)
+
+            conn.executemany("DELETE FROM reactions WHERE post_id = ?", [(cid,) for cid in ids])
+            conn.executemany("DELETE FROM campaigns WHERE id = ?", [(cid,) for cid in ids])
+            deltas.apply(conn)
+            conn.execute(_BUMP_VERSION)
+            conn.execute("INSERT INTO events (kind, payload) VALUES ('feed.reset', ?)",
+                         (json.dumps({"deleted_campaigns": len(ids)}),))
+            conn.execute(_PRUNE_EVENTS, (EVENTS_KEEP,))
+        return len(ids)
+
+    # ——— Reads ———
+
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM campaigns LIMIT 1").fetchone() is None
+
+    def version(self) -> int:
+        """Monotonic counter that changes whenever campaigns or reactions are written."""
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def max_campaign_id(self) -> int:
+        row = self._conn().execute("SELECT MAX(id) FROM campaigns").fetchone()
+        return row[0] or 0
+
+    def last_event_seq(self) -> int:
+        row = self._conn().execute("SELECT MAX(seq) FROM events").fetchone()
+        return row[0] or 0
+
+    def first_event_seq(self):
+        """Oldest change event still kept (see EVENTS_KEEP), or None if there are none."""
+        return self._conn().execute("SELECT MIN(seq) FROM events").fetchone()[0]
+
+    def events_since(self, seq: int, limit: int = 500) -> list:
+        """Return up to `limit` (seq, kind, payload_json) change events after `seq`, oldest first."""
+        return self._conn().execute(
+            "SELECT seq, kind, payload FROM events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        ).fetchall()
+
+    def analytics(self, dimension: str, key=None):
+        """
+        Engagement rollup for one key of `dimension` (see interface.analytics),
+        or every key of it when `key` is None. Unknown keys return None.
+        """
+        if dimension not in analytics.DIMENSIONS:
+            raise ValueError(f"Unknown analytics dimension {dimension!r}")
+        conn = self._conn()
+        if key is None:
+            return analytics.list_rollups(conn, dimension)
+        return analytics.get_rollup(conn, dimension, key)
+
+    def rebuild_analytics(self) -> int:
+        """Recompute every rollup from the raw tables; returns the number of rollup rows."""
+        n = analytics.rebuild(self._conn())
+        with self._conn() as conn:
+            conn.execute(_BUMP_VERSION)
+        return n
+
+    def list_campaigns(
+        self,
+        limit: int = None,
+        cursor: int = None,
+        brand: str = None,
+        since_id: int = None,
+        since_timestamp: str = None,
+        include_reactions: bool = True
+    ) -> list:
+        """
+        Return campaigns newest first, each with like/share stats and (unless
+        include_reactions is False) its reactions, in the shape served by
+        GET /campaigns.
+
+        :param limit: Page size; None returns every match
+        :param cursor: Only campaigns with id < cursor (the previous page's last id)
+        :param brand: Only campaigns of this brand
+        :param since_id: Only campaigns with id > since_id
+        :param since_timestamp: Only campaigns with an ISO timestamp after this one
+        """
+        where, params = [], []
+        if cursor is not None:
+            where.append("id < ?")
+            params.append(cursor)
+        if since_id is not None:
+            where.append("id > ?")
+            params.append(since_id)
+        if brand is not None:
+            where.append("brand_name = ?")
+            params.append(brand)
+        if since_timestamp is not None:
+            where.append("timestamp > ?")
+            params.append(since_timestamp)
+        page = (
+            "SELECT id, caption, usp, timestamp, brand_name, round FROM campaigns"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY id DESC LIMIT ?"
+        )
+        params.append(-1 if limit is None else limit)
+
+        conn = self._conn()
+        if not include_reactions:
+            # Stats come from the per-campaign rollup rows, not from the reactions
+            rows = conn.execute(f"""
+                WITH page AS ({page})
+                SELECT page.*, COALESCE(ru.likes, 0), COALESCE(ru.shares, 0)
+                FROM page
+                LEFT JOIN rollups ru ON ru.dim = 'campaign' AND ru.key = CAST(page.id AS TEXT)
+                ORDER BY page.id DESC
+            """, params)
+            return [
+                {"id": cid, "caption": caption, "usp": usp, "timestamp": ts, "brand_name": brand_name,
+                 "round": round_no, "stats": {"likes": likes, "shares": shares}}
+                for cid, caption, usp, ts, brand_name, round_no, likes, shares in rows
+            ]
+
+        rows = conn.execute(f"""
+            WITH page AS ({page})
+            SELECT page.*, r.consumer_id, r.action, r.thought
+            FROM page
+            LEFT JOIN reactions r ON r.post_id = page.id
+            ORDER BY page.id DESC, r.rowid
+        """, params)
+        campaigns = []
+        for cid, caption, usp, ts, brand_name, round_no, consumer_id, action, thought in rows:
+            if not campaigns or campaigns[-1]["id"] != cid:
+                campaigns.append({
+                    "id": cid, "caption": caption, "usp": usp, "timestamp": ts, "brand_name": brand_name,
+                    "round": round_no, "stats": {"likes": 0, "shares": 0}, "reactions": []
+                })
+            if consumer_id is None:
+                continue
+            camp = campaigns[-1]
+            camp["reactions"].append({"consumer_id": consumer_id, "action": action, "thought": thought})
+            if action == "LIKE":
+                camp["stats"]["likes"] += 1
+            elif action == "SHARE":
+                camp["stats"]["shares"] += 1
+        return campaigns
+
+
+def _round_of(record: dict):
+    value = record.get("round")
+    return int(value) if value not in (None, "", "None") else None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path: str = None) -> CampaignStore:
+    """Return the process-wide store for `path` (default: MARKETMIND_DB)."""
+    path = path or DB_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CampaignStore(path)
+        return _stores[path]
+
+
+def import_xml(agents_dir: str = AGENTS_DIR, store: CampaignStore = None) -> tuple:
+    """
+    One-shot import of the legacy agents/brand_responses/<brand>/*.xml and
+    agents/consumer_responses/<consumer>/*.xml trees into the store.
+    Returns (campaigns_imported, reactions_imported).
+    """
+    store = store or get_store()
+
+    campaigns = []
+    base = os.path.join(agents_dir, "brand_responses")
+    if os.path.isdir(base):
+        for brand in os.listdir(base):
+            brand_dir = os.path.join(base, brand)
+            if not os.path.isdir(brand_dir):
+                continue
+            for fname in os.listdir(brand_dir):
+                if not fname.endswith(".xml"):
+                    continue
+                try:
+                    root = ET.parse(os.path.join(brand_dir, fname)).getroot()
+                except ET.ParseError:
+                    continue
+                data = {c.tag: c.text or "" for c in root}
+                data["brand_name"] = brand
+                data["id"] = int(data.get("id") or 0)
+                campaigns.append(data)
+
+    reactions = []
+    resp_base = os.path.join(agents_dir, "consumer_responses")
+    if os.path.isdir(resp_base):
+        for consumer_id in os.listdir(resp_base):
+            cdir = os.path.join(resp_base, consumer_id)
+            if not os.path.isdir(cdir):
+                continue
+            for fname in os.listdir(cdir):
+                if not fname.endswith(".xml"):
+                    continue
+                try:
+                    root = ET.parse(os.path.join(cdir, fname)).getroot()
+                except ET.ParseError:
+                    continue
+                reactions.append({
+                    "consumer_id": consumer_id,
+                    "post_id": int(root.findtext("post_id", default="0")),
+                    "action": root.findtext("action", default="IGNORE"),
+                    "thought": root.findtext("thought", default="") or ""
+                })
+
+    # History, not news: keep it out of the live event feed.
+    store.add_campaigns(campaigns, emit_events=False)
+    store.add_reactions(reactions, emit_events=False)
+    return len(campaigns), len(reactions)
+
+
+def import_posted(paths=POSTED_PATHS, store: CampaignStore = None) -> int:
+    """
+    One-shot import of campaigns posted to the API before it wrote to the
+    store: interface/data/campaigns.json and the campaigns.jsonl log.
+    Returns the number of campaigns imported.
+    """
+    store = store or get_store()
+    campaigns = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for line in f:
+                    try:
+                        campaigns.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn line from a crashed writer
+            else:
+                campaigns.extend(json.load(f))
+    campaigns = [c for c in campaigns if isinstance(c, dict) and c.get("id") and c.get("brand_name")]
+    return store.add_campaigns(campaigns, emit_events=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MarketMind campaign store utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-xml", help="import existing XML response directories")
+    imp.add_argument("--agents-dir", default=AGENTS_DIR)
+    imp.add_argument("--db", default=DB_PATH)
+    pos = sub.add_parser("import-posted", help="import campaigns posted to the API's old JSON files")
+    pos.add_argument("--db", default=DB_PATH)
+    reb = sub.add_parser("rebuild-analytics", help="recompute engagement rollups from the raw tables")
+    reb.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == "import-xml":
+        n_camp, n_react = import_xml(args.agents_dir, get_store(args.db))
+        print(f"Imported {n_camp} campaign(s) and {n_react} reaction(s) into {args.db}")
+    elif args.command == "import-posted":
+        print(f"Imported {import_posted(store=get_store(args.db))} campaign(s) into {args.db}")
+    elif args.command == "rebuild-analytics":
+        started = datetime.now()
+        n = get_store(args.db).rebuild_analytics()
+        print(f"Rebuilt {n} rollup row(s) in {(datetime.now() - started).total_seconds():.2f}s")
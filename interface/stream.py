@@ -0,0 +1,105 @@
+# interface/stream.py
+
+import asyncio
+from typing import AsyncIterator
+
+from interface.store import CampaignStore
+
+KEEPALIVE_SECONDS = 15.0
+
+
+class _Subscriber:
+    __slots__ = ("queue", "lagged")
+
+    def __init__(self, maxsize: int):
+        self.queue  = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+
+class EventBroadcaster:
+    """
+    Tails the store's event table once per process and fans new events out
+    to every connected stream, so N open feeds cost one cheap indexed query
+    per poll interval instead of N full GET /campaigns requests.
+    """
+
+    def __init__(self, store: CampaignStore, interval: float = 0.5, queue_size: int = 1000):
+        self.store       = store
+        self.interval    = interval
+        self.queue_size  = queue_size
+        self.subscribers = set()
+        self._task       = None
+
+    def subscribe(self) -> _Subscriber:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._pump())
+        sub = _Subscriber(self.queue_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber):
+        self.subscribers.discard(sub)
+
+    async def _pump(self):
+        # Runs while anyone listens; the next subscribe() starts a new one
+        last = await asyncio.to_thread(self.store.last_event_seq)
+        while self.subscribers:
+            rows = await asyncio.to_thread(self.store.events_since, last)
+            for row in rows:
+                for sub in list(self.subscribers):
+                    try:
+                        sub.queue.put_nowait(row)
+                    except asyncio.QueueFull:
+                        # Slow client: it re-reads the gap from the store itself.
+                        sub.lagged = True
+                last = row[0]
+            if not rows:
+                await asyncio.sleep(self.interval)
+
+    async def stream(self, since: int, is_disconnected) -> AsyncIterator[str]:
+        """
+        Yield SSE frames for every event after `since`: first the backlog from
+        the store, then live events. Subscribing before the backlog read, and
+        skipping any seq already sent, guarantees no gaps and no duplicates.
+        If events after `since` have been pruned from the store, a `feed.reset`
+        event tells the client to reload its snapshot first.
+        """
+        sub = self.subscribe()
+        last = since
+        try:
+            first = await asyncio.to_thread(self.store.first_event_seq)
+            if first is not None and since < first - 1:
+                last = first - 1
+                yield _frame(last, "feed.reset", "{}")
+            while True:
+                # Backlog (and catch-up after the queue overflowed)
+                while True:
+                    rows = await asyncio.to_thread(self.store.events_since, last)
+                    if not rows:
+                        break
+                    for seq, kind, payload in rows:
+                        yield _frame(seq, kind, payload)
+                        last = seq
+                sub.lagged = False
+
+                while not sub.lagged:
+                    if await is_disconnected():
+                        return
+                    try:
+                        seq, kind, payload = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    if seq <= last:
+                        continue
+                    yield _frame(seq, kind, payload)
+                    last = seq
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+        finally:
+            self.unsubscribe(sub)
+
+
+def _frame(seq: int, kind: str, payload: str) -> str:
+    return f"id: {seq}\nevent: {kind}\ndata: {payload}\n\n"
@@ -0,0 +1,72 @@
+# interface/test_analytics.py
+"""Incremental rollups agree with a full rebuild (no network): python -m pytest interface"""
+
+import pytest
+
+from interface import analytics
+from interface import store as store_module
+
+LOW, HIGH = {"loyalty": 0.1, "trend_seeker": 0.9}, {"loyalty": 0.9, "trend_seeker": 0.5}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "DB_PATH", str(tmp_path / "marketmind.db"))
+    return store_module.get_store()
+
+
+def _campaign(cid: int, brand: str, usp: str, round_no) -> dict:
+    return {"id": cid, "brand_name": brand, "caption": f"caption {cid}", "usp": usp,
+            "timestamp": f"2025-01-01T00:00:{cid:02d}", "round": round_no}
+
+
+def _reaction(consumer_id: str, post_id: int, action: str, traits: dict = None) -> dict:
+    return {"consumer_id": consumer_id, "post_id": post_id, "action": action, "thought": "",
+            "timestamp": "2025-01-01T00:01:00", **({"traits": traits} if traits else {})}
+
+
+def _rollups(store) -> dict:
+    return {dim: store.analytics(dim) for dim in analytics.DIMENSIONS}
+
+
+def _assert_matches_rebuild(store):
+    incremental = _rollups(store)
+    store.rebuild_analytics()
+    assert _rollups(store) == incremental
+
+
+def test_incremental_matches_rebuild(store):
+    # Reactions may arrive before their campaign; the campaign brings them into its brand/usp/round
+    store.add_reactions([_reaction("c1", 3, "LIKE", LOW), _reaction("c2", 3, "IGNORE")])
+    store.add_campaigns([_campaign(1, "EnduraStride", "durability", 1),
+                         _campaign(2, "SprintStyle", "style", 1),
+                         _campaign(3, "EnduraStride", "comfort", None)])
+    store.add_reactions([_reaction("c1", 1, "SHARE", LOW), _reaction("c2", 1, "LIKE", HIGH),
+                         _reaction("c3", 2, "IGNORE"), _reaction("c3", 2, "LIKE")])
+    # Duplicates are refused and must not be counted twice
+    store.add_reactions([_reaction("c1", 1, "IGNORE", LOW)])
+    store.add_campaigns([_campaign(1, "Other", "other", 2)])
+
+    assert store.analytics("brand", "EnduraStride")["reactions"] == 4
+    assert store.analytics("round", "none")["campaigns"] == 1
+    _assert_matches_rebuild(store)
+
+
+def test_stored_profile_moves_existing_reactions_into_trait_buckets(store):
+    store.add_campaigns([_campaign(1, "EnduraStride", "durability", 1), _campaign(2, "EnduraStride", "style", 1)])
+    # c1 reacts before its profile is stored: no trait buckets yet
+    store.add_reactions([_reaction("c1", 1, "LIKE"), _reaction("c1", 2, "IGNORE")])
+    assert store.analytics("trait") == []
+    _assert_matches_rebuild(store)
+
+    # Its profile arrives with a later reaction: both earlier reactions move into its buckets
+    store.add_reactions([_reaction("c1", 3, "SHARE", LOW)])
+    low = store.analytics("trait", "loyalty:low")
+    assert (low["reactions"], low["likes"], low["shares"], low["ignores"]) == (3, 1, 1, 1)
+    _assert_matches_rebuild(store)
+
+    # A changed profile moves them again, and the emptied buckets disappear
+    store.add_reactions([_reaction("c1", 4, "LIKE", HIGH)])
+    assert store.analytics("trait", "loyalty:low") is None
+    assert store.analytics("trait", "loyalty:high")["reactions"] == 4
+    _assert_matches_rebuild(store)
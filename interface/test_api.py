@@ -0,0 +1,97 @@
+# interface/test_api.py
+"""API tests against a temporary campaign store (no network): python -m pytest interface"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from interface import store as store_module
+from interface.main import app
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "DB_PATH", str(tmp_path / "marketmind.db"))
+    return store_module.get_store()
+
+
+@pytest.fixture
+def client(store):
+    # Not used as a context manager: the startup import of the legacy XML is skipped
+    return TestClient(app)
+
+
+def _campaign(cid: int, brand: str = "EnduraStride") -> dict:
+    return {"id": cid, "brand_name": brand, "caption": f"caption {cid}", "usp": "durability",
+            "timestamp": f"2025-01-01T00:00:{cid % 60:02d}", "round": 1}
+
+
+# ——— POST /campaigns/ ———
+
+def test_posted_campaign_is_listed(client):
+    res = client.post("/campaigns/", json={"id": 7, "brand_name": "EnduraStride", "caption": "Built to last"})
+    assert res.status_code == 201
+    listed = client.get("/campaigns/").json()
+    assert [(c["id"], c["caption"]) for c in listed] == [(7, "Built to last")]
+
+
+def test_post_duplicate_id_conflicts(client, store):
+    store.add_campaigns([_campaign(7)])
+    res = client.post("/campaigns/", json={"id": 7, "brand_name": "Other", "caption": "overwrite?"})
+    assert res.status_code == 409
+    assert client.get("/campaigns/").json()[0]["brand_name"] == "EnduraStride"
+
+
+# ——— GET /campaigns/ paging and caching ———
+
+def test_cursor_pages_newest_first(client, store):
+    store.add_campaigns([_campaign(cid) for cid in range(1, 6)])
+    pages, cursor = [], None
+    while True:
+        res = client.get("/campaigns/", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200
+        pages.append([c["id"] for c in res.json()])
+        cursor = res.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert cursor == str(pages[-1][-1])
+    assert pages == [[5, 4], [3, 2], [1]]
+
+
+def test_full_last_page_has_cursor_to_empty_page(client, store):
+    store.add_campaigns([_campaign(cid) for cid in range(1, 5)])
+    res = client.get("/campaigns/", params={"limit": 2, "cursor": 3})
+    assert [c["id"] for c in res.json()] == [2, 1]
+    assert res.headers["X-Next-Cursor"] == "1"
+    res = client.get("/campaigns/", params={"limit": 2, "cursor": 1})
+    assert res.json() == []
+    assert "X-Next-Cursor" not in res.headers
+
+
+def test_since_id_returns_only_newer(client, store):
+    store.add_campaigns([_campaign(cid) for cid in range(1, 6)])
+    assert [c["id"] for c in client.get("/campaigns/", params={"since_id": 3}).json()] == [5, 4]
+    assert client.get("/campaigns/", params={"since_id": 5}).json() == []
+    # since_id and cursor bound the same page from both sides
+    res = client.get("/campaigns/", params={"since_id": 1, "cursor": 5})
+    assert [c["id"] for c in res.json()] == [4, 3, 2]
+    assert "X-Next-Cursor" not in res.headers
+
+
+def test_etag_not_modified_until_store_changes(client, store):
+    store.add_campaigns([_campaign(1)])
+    first = client.get("/campaigns/")
+    etag = first.headers["ETag"]
+
+    cached = client.get("/campaigns/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    # Another query is another representation
+    assert client.get("/campaigns/", params={"limit": 1}).headers["ETag"] != etag
+
+    store.add_campaigns([_campaign(2)])
+    changed = client.get("/campaigns/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [c["id"] for c in changed.json()] == [2, 1]
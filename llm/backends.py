@@ -0,0 +1,335 @@
+# llm/backends.py
+"""
+LLM backends the agents can run on, chosen with MARKETMIND_LLM_BACKEND:
+
+    uiuc    remote uiuc.chat API (default; needs UIUC_API_KEY)
+    local   a local OpenAI-compatible model server at MARKETMIND_LLM_URL
+            (llama.cpp server, vLLM, Ollama, ...), no key or network needed
+    stub    RuleBasedLLM: well-formed replies from simple rules, no model at
+            all, for tests and for benchmarking everything around the LLM
+
+With MARKETMIND_LLM_BATCH=N (N > 1), calls to a backend that can batch
+(local, stub) are coalesced across threads into one request of up to N
+prompts; see BatchingLLM.
+
+The HTTP clients (and requests) are only imported when make_llm() builds
+one, so the stub and code that merely imports the agents start fast.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Protocol, runtime_checkable
+
+from llm.defaults import DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT
+
+BACKEND   = os.getenv("MARKETMIND_LLM_BACKEND", "uiuc").lower()
+LLM_URL   = os.getenv("MARKETMIND_LLM_URL")
+LLM_MODEL = os.getenv("MARKETMIND_LLM_MODEL")
+STUB_MODEL = "rule-based-stub"
+LLM_BATCH = int(os.getenv("MARKETMIND_LLM_BATCH", "0"))
+
+
+@runtime_checkable
+class LLMBackend(Protocol):
+    """What agents, CachedLLM and the simulation need from an LLM client."""
+
+    model: str
+    system_prompt: str
+    supports_batch: bool
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        """Completion for `prompt`; `stop` (see llm.stopping) may end it early."""
+        ...
+
+    def generate_batch(self, prompts: List[str], temperature: float = 0.6) -> List[str]:
+        """One completion per prompt, in order."""
+        ...
+
+
+# ——— Rule-based stub ———
+
+_BRAND_RE  = re.compile(r"sports-footwear brand (.+?)\.\s*$", re.MULTILINE)
+_USP_RE    = re.compile(r"^Current USP focus: (.+)$", re.MULTILINE)
+_LENS_RE   = re.compile(r"^Creative lens for this round:\s*\n- (.+)$", re.MULTILINE)
+_NEEDS_RE  = re.compile(r"^- Daily needs: (.*)$", re.MULTILINE)
+_TRAITS_RE = re.compile(r"^- Personality traits: (.*)$", re.MULTILINE)
+_POST_RE   = re.compile(r'^\[post_id: (-?\d+)\]\n- Caption: "(.*)"\n- USP: (.*)$', re.MULTILINE)
+_SINGLE_RE = re.compile(r'^- Caption: "(.*)"\n- USP: (.*)$', re.MULTILINE)
+_WORD_RE   = re.compile(r"[a-z]{4,}")
+
+_OPENERS = ["Lace up", "Own the", "Every step,", "Built for", "Meet your", "From dawn", "Chase the",
+            "Made to", "Your next", "Step into", "Go further", "Light on"]
+_CLOSERS = ["day after day", "without the weight", "from street to trail", "on your terms",
+            "mile after mile", "the way you move", "with room to grow", "all week long"]
+_EMOJIS  = ["🔥", "🚀", "⚡", "🌱", "💪", "👟"]
+_CTAS    = ["Shop now", "Grab yours", "Try them on", "Find your pair", "Step in today", "Join the run"]
+
+
+class RuleBasedLLM:
+    """
+    Offline stand-in that answers agent prompts from rules instead of a
+    model. Brand prompts get two <<A>>/<<B>> captions built from the USP and
+    lens; consumer prompts get reactions scored from the overlap between the
+    post and the consumer's daily needs, nudged by their traits. Replies are
+    a pure function of (seed, prompt), always well-formed, and take
+    microseconds, so whole simulations run without network or GPU.
+    """
+
+    supports_batch = True
+
+    def __init__(self, seed: int = 0, model: str = STUB_MODEL, system_prompt: str = DEFAULT_SYSTEM_PROMPT):
+        self.seed          = seed
+        self.model         = model
+        self.system_prompt = system_prompt
+        self.calls         = 0
+        self._lock         = threading.Lock()
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        with self._lock:
+            self.calls += 1
+        rng = random.Random(hashlib.sha1(f"{self.seed}:{prompt}".encode("utf-8")).digest())
+        if "<<A>>" in prompt:
+            return self._captions(prompt, rng)
+        if "post_id" in prompt:
+            return self._batch_reactions(prompt, rng)
+        return self._reaction(prompt, rng)
+
+    def generate_batch(self, prompts: List[str], temperature: float = 0.6) -> List[str]:
+        return [self.generate(p, temperature) for p in prompts]
+
+    def close(self):
+        pass
+
+    # ——— Brands ———
+
+    @staticmethod
+    def _captions(prompt: str, rng: random.Random) -> str:
+        brand = _BRAND_RE.search(prompt)
+        usp   = _USP_RE.search(prompt)
+        lens  = _LENS_RE.search(prompt)
+        brand = brand.group(1) if brand else "Brand"
+        usp   = usp.group(1).strip() if usp else "comfort"
+        lens  = lens.group(1).strip().rstrip(".") if lens and lens.group(1) != "No lens provided" else ""
+        usp_tag = "".join(re.sub(r"[^0-9A-Za-z]", "", w).title() for w in usp.split()[:2])
+        tags  = f"#{re.sub(r'[^0-9A-Za-z]', '', brand)} #{usp_tag}"
+        lines = []
+        for label, opener in zip(("<<A>>", "<<B>>"), rng.sample(_OPENERS, 2)):
+            scene = f" {lens.lower()}," if lens else ""
+            lines.append(
+                f"{label} {opener}{scene} {usp.lower()} {rng.choice(_CLOSERS)} {rng.choice(_EMOJIS)} "
+                f"{rng.choice(_CTAS)}. {tags}"
+            )
+        return "\n".join(lines) + "\n"
+
+    # ——— Consumers ———
+
+    @staticmethod
+    def _profile(prompt: str):
+        needs = _NEEDS_RE.search(prompt)
+        words = set(_WORD_RE.findall(needs.group(1).lower())) if needs else set()
+        traits = {}
+        m = _TRAITS_RE.search(prompt)
+        for part in (m.group(1).split(",") if m else []):
+            name, _, value = part.strip().partition("=")
+            try:
+                traits[name] = float(value)
+            except ValueError:
+                pass
+        return words, traits
+
+    @staticmethod
+    def _decide(words: set, traits: dict, caption: str, usp: str, rng: random.Random) -> dict:
+        post = set(_WORD_RE.findall(f"{caption} {usp}".lower()))
+        overlap = min(1.0, len(words & post) / 2)
+        score = (0.4 * overlap + 0.25 * traits.get("trend_seeker", 0.5)
+                 + 0.1 * traits.get("loyalty", 0.5) + 0.25 * rng.random())
+        if score >= 0.5:
+            action = "SHARE" if rng.random() < traits.get("trend_seeker", 0.3) / 2 else "LIKE"
+        else:
+            action = "IGNORE"
+        matched = sorted(words & post)[:2]
+        thought = (f"It speaks to my {' and '.join(matched)} needs." if matched
+                   else "It doesn't connect with what I need day to day.")
+        return {"thought": thought, "action": action}
+
+    def _reaction(self, prompt: str, rng: random.Random) -> str:
+        words, traits = self._profile(prompt)
+        m = _SINGLE_RE.search(prompt)
+        caption, usp = (m.group(1), m.group(2)) if m else ("", "")
+        return json.dumps(self._decide(words, traits, caption, usp, rng), ensure_ascii=False)
+
+    def _batch_reactions(self, prompt: str, rng: random.Random) -> str:
+        words, traits = self._profile(prompt)
+        items = [{"post_id": int(pid), **self._decide(words, traits, caption, usp, rng)}
+                 for pid, caption, usp in _POST_RE.findall(prompt)]
+        return json.dumps(items, ensure_ascii=False)
+
+
+# ——— Request coalescing ———
+
+_STOP = object()   # queued by BatchingLLM.close() to end the dispatcher
+
+
+class BatchingLLM:
+    """
+    Coalesces generate() calls made concurrently from many threads into
+    generate_batch() calls of up to `max_batch` prompts on the wrapped
+    backend. A call waits at most `max_wait` seconds for others to join its
+    batch; up to `concurrency` batches are in flight at once. Batched
+    completions are not streamed, so `stop` is ignored; the agents'
+    parsers ignore anything after the answer. close() finishes the calls
+    already queued and stops the dispatcher; generate() raises after it.
+    """
+
+    supports_batch = True
+
+    def __init__(self, llm, max_batch: int = 8, max_wait: float = 0.005, concurrency: int = 4):
+        self.llm           = llm
+        self.model         = getattr(llm, "model", DEFAULT_MODEL)
+        self.system_prompt = getattr(llm, "system_prompt", DEFAULT_SYSTEM_PROMPT)
+        self.max_batch     = max(1, max_batch)
+        self.max_wait      = max_wait
+        self.batches       = 0
+        self.prompts       = 0
+        self._queue        = queue.Queue()
+        self._pool         = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="llm-batch")
+        self._dispatcher   = None
+        self._closed       = False
+        self._lock         = threading.Lock()
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        """Completion for `prompt` from the next batch; `stop` is ignored (see the class docstring)."""
+        fut = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingLLM is closed")
+            self._queue.put((prompt, temperature, fut))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, daemon=True, name="llm-batcher")
+                self._dispatcher.start()
+        return fut.result()
+
+    def generate_batch(self, prompts: List[str], temperature: float = 0.6) -> List[str]:
+        return self.llm.generate_batch(prompts, temperature)
+
+    def _dispatch(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            by_temperature = {}
+            for item in batch:
+                by_temperature.setdefault(item[1], []).append(item)
+            for temperature, items in by_temperature.items():
+                try:
+                    self._pool.submit(self._run, temperature, items)
+                except RuntimeError as e:
+                    # Pool already shut down: fail these calls rather than the dispatcher
+                    for _, _, fut in items:
+                        fut.set_exception(e)
+
+    def _run(self, temperature: float, items: list):
+        with self._lock:
+            self.batches += 1
+            self.prompts += len(items)
+        try:
+            texts = self.llm.generate_batch([prompt for prompt, _, _ in items], temperature)
+        except Exception as e:
+            for _, _, fut in items:
+                fut.set_exception(e)
+            return
+        for (_, _, fut), text in zip(items, texts):
+            fut.set_result(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self.batches, "prompts": self.prompts,
+                    "mean_batch": round(self.prompts / self.batches, 2) if self.batches else 0.0}
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            dispatcher = self._dispatcher
+            if dispatcher is not None:
+                self._queue.put(_STOP)
+        if dispatcher is not None:
+            dispatcher.join()
+        self._pool.shutdown(wait=True)
+        if hasattr(self.llm, "close"):
+            self.llm.close()
+
+
+# ——— Selection ———
+
+def make_llm(backend: str = None, batch: int = None, **kwargs):
+    """
+    Build the configured backend. `kwargs` go to the HTTP clients (pool_size,
+    base_url, rate_limit, ...); the stub takes none. Backends that can batch
+    are wrapped in a BatchingLLM when `batch` (default MARKETMIND_LLM_BATCH) > 1.
+    """
+    backend = (backend or BACKEND).lower()
+    batch = LLM_BATCH if batch is None else batch
+    if backend == "stub":
+        llm = RuleBasedLLM()
+    elif backend in ("local", "openai"):
+        from llm.local_inference import OpenAICompatibleLLM
+        if LLM_URL and "base_url" not in kwargs:
+            kwargs["base_url"] = LLM_URL
+        llm = OpenAICompatibleLLM(**kwargs)
+    elif backend == "uiuc":
+        from llm.local_inference import UIUCChatLLM
+        llm = UIUCChatLLM(**kwargs)
+    else:
+        raise ValueError(f"Unknown LLM backend {backend!r}; use uiuc, local or stub")
+    if batch > 1 and llm.supports_batch:
+        llm = BatchingLLM(llm, max_batch=batch, concurrency=max(1, kwargs.get("pool_size", 4) // batch))
+    return llm
+
+
+def configured_model(backend: str = None) -> str:
+    """Model name make_llm() would use for `backend`, without building a client."""
+    backend = (backend or BACKEND).lower()
+    if backend == "stub":
+        return STUB_MODEL
+    if backend in ("local", "openai"):
+        return LLM_MODEL or DEFAULT_MODEL
+    return DEFAULT_MODEL
+
+
+_default_llm = None
+_default_lock = threading.Lock()
+
+def get_default_llm():
+    """
+    Client shared by agents that were not given one, built by make_llm() on
+    first use rather than when the agents are created.
+    """
+    global _default_llm
+    with _default_lock:
+        if _default_llm is None:
+            _default_llm = make_llm()
+        return _default_llm
@@ -0,0 +1,189 @@
+# llm/cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from llm.backends import configured_model
+from llm.defaults import DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT
+from tracing import inc
+
+
+class CacheMiss(LookupError):
+    """Raised by CachedLLM in replay mode when a prompt has no stored completion."""
+
+
+class PromptCache:
+    """
+    Prompt -> completion store: a SQLite file on disk with an in-memory LRU
+    in front of it. The disk table is bounded to `max_entries`; once over the
+    bound the least recently used rows are evicted in chunks.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50_000, memory_entries: int = 1024):
+        self.path           = path
+        self.max_entries    = max_entries
+        self.memory_entries = memory_entries
+        self.hits   = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock   = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, completion TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions(last_used)")
+        # Which model and system prompt the completions were recorded with (for replays)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        # Row count kept in step with inserts and evictions, so put() never scans the table
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+        raw = json.dumps([model, system_prompt, prompt, round(float(temperature), 4)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, value: str):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            row = self._conn.execute("SELECT completion FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value)
+            now = time.time()
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO completions (key, completion, last_used) VALUES (?, ?, ?)",
+                (key, value, now)
+            ).rowcount
+            if inserted:
+                self._entries += 1
+            else:
+                self._conn.execute("UPDATE completions SET completion = ?, last_used = ? WHERE key = ?",
+                                   (value, now, key))
+            if self._entries > self.max_entries:
+                # Evict a 10% chunk at once so we don't pay this on every insert.
+                excess = self._entries - self.max_entries + max(1, self.max_entries // 10)
+                self._entries -= self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                ).rowcount
+            self._conn.commit()
+
+    def get_meta(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries":  entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLLM:
+    """
+    Wraps an LLMBackend with a PromptCache. Recording stores the client's
+    model and system prompt with the cache; replay keys on those (or, for a
+    cache recorded before they were stored, on the configured backend's
+    model), never calls the wrapped client (which may be None) and raises
+    CacheMiss for a prompt that is not in the cache.
+    """
+
+    def __init__(self, llm, cache: PromptCache, replay: bool = False):
+        if llm is None and not replay:
+            raise ValueError("CachedLLM needs an LLM client unless running in replay mode")
+        self.llm           = llm
+        self.cache         = cache
+        self.replay        = replay
+        if replay:
+            self.model         = cache.get_meta("model") or getattr(llm, "model", None) or configured_model()
+            self.system_prompt = (cache.get_meta("system_prompt")
+                                  or getattr(llm, "system_prompt", DEFAULT_SYSTEM_PROMPT))
+        else:
+            self.model         = getattr(llm, "model", DEFAULT_MODEL)
+            self.system_prompt = getattr(llm, "system_prompt", DEFAULT_SYSTEM_PROMPT)
+            cache.set_meta("model", self.model)
+            cache.set_meta("system_prompt", self.system_prompt)
+
+    @property
+    def supports_batch(self) -> bool:
+        # Replays are answered from the cache whichever way they are asked
+        return self.replay or getattr(self.llm, "supports_batch", False)
+
+    def _lookup(self, prompt: str, temperature: float):
+        key = PromptCache.make_key(self.model, self.system_prompt, prompt, temperature)
+        cached = self.cache.get(key)
+        inc("llm_cache_lookups_total", result="miss" if cached is None else "hit")
+        if cached is None and self.replay:
+            raise CacheMiss(f"No cached completion for prompt {key[:12]} (model {self.model!r}); "
+                            "replay needs a cache recorded with the same model, prompts and seed")
+        return key, cached
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        # `stop` is not part of the key: a prompt is always asked by the same
+        # kind of caller, and its early-terminated completion is what it needs.
+        key, cached = self._lookup(prompt, temperature)
+        if cached is not None:
+            return cached
+        if stop is None:
+            completion = self.llm.generate(prompt, temperature=temperature)
+        else:
+            completion = self.llm.generate(prompt, temperature=temperature, stop=stop)
+        self.cache.put(key, completion)
+        return completion
+
+    def generate_batch(self, prompts: list, temperature: float = 0.6) -> list:
+        """Cached completions, with the misses sent to the wrapped client as one batch."""
+        found = [self._lookup(prompt, temperature) for prompt in prompts]
+        missing = [i for i, (_, cached) in enumerate(found) if cached is None]
+        completions = [cached for _, cached in found]
+        if missing:
+            texts = self.llm.generate_batch([prompts[i] for i in missing], temperature)
+            for i, text in zip(missing, texts):
+                self.cache.put(found[i][0], text)
+                completions[i] = text
+        return completions
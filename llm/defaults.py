@@ -0,0 +1,15 @@
+# llm/defaults.py
+"""
+Model defaults shared by the LLM clients, the prompt cache and the backends.
+Kept apart from llm.local_inference so that importing them (as every agent
+does) does not pull in requests; the HTTP clients are imported when one is
+first built (see llm.backends.make_llm).
+"""
+
+from dotenv import load_dotenv
+
+# .env may set UIUC_API_KEY and the MARKETMIND_LLM_* settings
+load_dotenv()
+
+DEFAULT_MODEL         = "qwen2.5:7b-instruct-fp16"
+DEFAULT_SYSTEM_PROMPT = "You are a senior brand copywriter."
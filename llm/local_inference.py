@@ -1,51 +1,396 @@
-import os, time, requests
-from dotenv import load_dotenv
+import os, json, time, codecs, random, asyncio, logging, threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from llm.defaults import DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT
+from tracing import inc, span
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Local OpenAI-compatible model server (see OpenAICompatibleLLM)
+LOCAL_LLM_URL        = os.getenv("MARKETMIND_LLM_URL", "http://127.0.0.1:8080/v1")
+LOCAL_LLM_MODEL      = os.getenv("MARKETMIND_LLM_MODEL", DEFAULT_MODEL)
+LOCAL_LLM_MAX_TOKENS = int(os.getenv("MARKETMIND_LLM_MAX_TOKENS", "512"))
+
+# Status codes worth retrying; anything else in the 4xx range is a caller bug.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter allowing `rate` requests per second with bursts
+    of up to `capacity`. Safe to share between threads and event loops.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate     = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens  = self.capacity
+        self._last    = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Take a token now (possibly going negative) and return how long the
+        # caller has to wait before it may spend it.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last   = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+def _parse_retry_after(value):
+    """Return the Retry-After header (delta-seconds or HTTP date) in seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _UIUCChatBase:
+    """Configuration, payload and retry policy shared by the sync and async clients."""
+
+    requires_api_key = True
+    supports_batch   = False
 
-class UIUCChatLLM:
     def __init__(self, api_key=None,
-                 model="qwen2.5:7b-instruct-fp16",
+                 model=DEFAULT_MODEL,
                  course_name="MarketMindd",
-                 base_url="https://uiuc.chat/api/chat-api/chat"):
+                 base_url="https://uiuc.chat/api/chat-api/chat",
+                 system_prompt=DEFAULT_SYSTEM_PROMPT,
+                 timeout=(5.0, 60.0),
+                 max_retries=3,
+                 backoff_base=0.5,
+                 backoff_cap=20.0,
+                 rate_limit=None,
+                 pool_size=16):
         self.api_key     = api_key or os.getenv("UIUC_API_KEY")
-        if not self.api_key:
+        if not self.api_key and self.requires_api_key:
             raise ValueError("Missing UIUC.chat API key")
-        self.model       = model
-        self.course_name = course_name
-        self.url         = base_url
+        self.model         = model
+        self.course_name   = course_name
+        self.url           = base_url
+        self.system_prompt = system_prompt
+        self.timeout       = timeout
+        self.max_retries   = max_retries
+        self.backoff_base  = backoff_base
+        self.backoff_cap   = backoff_cap
+        self.pool_size     = pool_size
 
-    def generate(self, prompt: str, temperature: float = 0.6) -> str:
-        payload = {
+        # rate_limit: requests/sec, or a TokenBucket to share between clients
+        if rate_limit is None and os.getenv("UIUC_RATE_LIMIT"):
+            rate_limit = float(os.getenv("UIUC_RATE_LIMIT"))
+        if isinstance(rate_limit, (int, float)):
+            rate_limit = TokenBucket(rate_limit)
+        self.rate_limiter = rate_limit
+
+    def _payload(self, prompt: str, temperature: float, stream: bool = False) -> dict:
+        return {
             "model":         self.model,
             "messages":      [
-                {"role": "system", "content": "You are a senior brand copywriter."},
+                {"role": "system", "content": self.system_prompt},
                 {"role": "user",   "content": prompt}
             ],
             "api_key":       self.api_key,
             "course_name":   self.course_name,
-            "stream":        False,
+            "stream":        stream,
             "temperature":   temperature,
             "retrieval_only": False
         }
 
-        # Try up to 3 times
-        for attempt in range(1, 4):
+    def _text(self, data: dict) -> str:
+        """Completion text of a non-streamed response body."""
+        return data.get("message", "")
+
+    def _retry_delay(self, attempt: int, retry_after=None) -> float:
+        # Server hint wins; otherwise exponential backoff with full jitter.
+        hinted = _parse_retry_after(retry_after)
+        if hinted is not None:
+            return min(hinted, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+
+class UIUCChatLLM(_UIUCChatBase):
+    """
+    Blocking uiuc.chat client. Keeps one pooled `requests.Session` per client so
+    repeated calls (and threads sharing the client) reuse open connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _post(self, payload: dict, stream: bool = False, url: str = None) -> requests.Response:
+        """POST with retries; a streamed response is returned before its body is read."""
+        for attempt in range(1, self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            started = time.monotonic()
             try:
-                print(f"→ [UIUC] Attempt {attempt}, payload keys: {list(payload.keys())}")
-                resp = requests.post(self.url, json=payload, timeout=10)
-                print(f"← [UIUC] Status {resp.status_code}, body: {resp.text[:200]}…")
-                resp.raise_for_status()
-                return resp.json().get("message", "").strip()
-            except requests.exceptions.HTTPError as e:
-                # Server error or bad request
-                print(f"[Error][UIUC] HTTP {resp.status_code} on attempt {attempt}")
-                if attempt == 3:
-                    raise
-                time.sleep(attempt * 1.0)
+                resp = self.session.post(url or self.url, json=payload, timeout=self.timeout, stream=stream)
             except requests.exceptions.RequestException as e:
                 # Network or timeout
-                print(f"[Error][UIUC] Network error: {e} (attempt {attempt})")
-                if attempt == 3:
+                if attempt == self.max_retries:
                     raise
-                time.sleep(attempt * 0.5)
\ No newline at end of file
+                delay = self._retry_delay(attempt)
+                inc("llm_retries_total", reason="network")
+                logger.warning("[UIUC] Network error: %s (attempt %d/%d, retry in %.1fs)",
+                               e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, resp.headers.get("Retry-After"))
+                inc("llm_retries_total", reason=f"http_{resp.status_code}")
+                logger.warning("[UIUC] HTTP %d (attempt %d/%d, retry in %.1fs)",
+                               resp.status_code, attempt, self.max_retries, delay)
+                resp.close()
+                time.sleep(delay)
+                continue
+
+            resp.raise_for_status()
+            logger.debug("[UIUC] HTTP %d in %.2fs", resp.status_code, time.monotonic() - started)
+            return resp
+
+    def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        """
+        Return the completion for `prompt`. With `stop` (a callable taking the
+        text so far, see llm.stopping) the completion is streamed and reading
+        ends as soon as stop(text) is true.
+        """
+        with span("llm.generate", mode="full" if stop is None else "stream"):
+            if stop is None:
+                text = self._text(self._post(self._payload(prompt, temperature)).json())
+            else:
+                text = ""
+                chunks = self.stream(prompt, temperature)
+                try:
+                    for chunk in chunks:
+                        text += chunk
+                        if stop(text):
+                            break
+                finally:
+                    chunks.close()
+        inc("llm_output_chars_total", len(text))
+        return text.strip()
+
+    def stream(self, prompt: str, temperature: float = 0.6):
+        """Yield the completion as text chunks while it is being generated."""
+        resp = self._post(self._payload(prompt, temperature, stream=True), stream=True)
+        try:
+            yield from self._chunks(resp)
+        finally:
+            # Closing early drops the connection, so the server stops generating
+            resp.close()
+
+    def _chunks(self, resp):
+        """Text pieces of a streamed response (uiuc.chat streams plain text)."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for data in resp.iter_content(chunk_size=None):
+            text = decoder.decode(data)
+            if text:
+                yield text
+
+    def generate_batch(self, prompts: list, temperature: float = 0.6) -> list:
+        """One completion per prompt; uiuc.chat has no batch endpoint, so one call each."""
+        return [self.generate(p, temperature=temperature) for p in prompts]
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUIUCChatLLM(_UIUCChatBase):
+    """
+    asyncio uiuc.chat client backed by a pooled `httpx.AsyncClient`.
+    The client is created on first use inside the running loop; call
+    `aclose()` (or use `async with`) to release its connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size)
+            )
+        return self._client
+
+    async def _post(self, payload: dict, stream: bool = False):
+        """POST with retries; a streamed response is returned before its body is read."""
+        import httpx
+        client = self._get_client()
+
+        for attempt in range(1, self.max_retries + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+            started = time.monotonic()
+            try:
+                resp = await client.send(client.build_request("POST", self.url, json=payload), stream=stream)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                inc("llm_retries_total", reason="network")
+                logger.warning("[UIUC] Network error: %s (attempt %d/%d, retry in %.1fs)",
+                               e, attempt, self.max_retries, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, resp.headers.get("Retry-After"))
+                inc("llm_retries_total", reason=f"http_{resp.status_code}")
+                logger.warning("[UIUC] HTTP %d (attempt %d/%d, retry in %.1fs)",
+                               resp.status_code, attempt, self.max_retries, delay)
+                await resp.aclose()
+                await asyncio.sleep(delay)
+                continue
+
+            if resp.is_error and stream:
+                await resp.aread()
+            resp.raise_for_status()
+            logger.debug("[UIUC] HTTP %d in %.2fs", resp.status_code, time.monotonic() - started)
+            return resp
+
+    async def generate(self, prompt: str, temperature: float = 0.6, stop=None) -> str:
+        """See UIUCChatLLM.generate."""
+        with span("llm.generate", mode="full" if stop is None else "stream"):
+            if stop is None:
+                resp = await self._post(self._payload(prompt, temperature))
+                text = self._text(resp.json())
+            else:
+                text = ""
+                chunks = self.stream(prompt, temperature)
+                try:
+                    async for chunk in chunks:
+                        text += chunk
+                        if stop(text):
+                            break
+                finally:
+                    await chunks.aclose()
+        inc("llm_output_chars_total", len(text))
+        return text.strip()
+
+    async def stream(self, prompt: str, temperature: float = 0.6):
+        """Yield the completion as text chunks while it is being generated."""
+        resp = await self._post(self._payload(prompt, temperature, stream=True), stream=True)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            async for data in resp.aiter_bytes():
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        finally:
+            await resp.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class OpenAICompatibleLLM(UIUCChatLLM):
+    """
+    Client for a local model server speaking the OpenAI API (llama.cpp's
+    server, vLLM, Ollama, LM Studio, ...) at `base_url`, e.g.
+    http://127.0.0.1:8080/v1. Same retries, pooling and streaming as
+    UIUCChatLLM; no API key needed unless the server asks for one.
+    generate_batch() sends all prompts in one /completions request, which
+    these servers schedule together.
+    """
+
+    requires_api_key = False
+    supports_batch   = True
+
+    def __init__(self, base_url: str = LOCAL_LLM_URL, model: str = LOCAL_LLM_MODEL, api_key: str = None, **kwargs):
+        super().__init__(model=model, base_url=base_url.rstrip("/"), **kwargs)
+        # Never fall back to UIUC_API_KEY: that key is not for this server
+        self.api_key = api_key or os.getenv("MARKETMIND_LLM_API_KEY")
+        if self.api_key:
+            self.session.headers["Authorization"] = f"Bearer {self.api_key}"
+        self.chat_url        = f"{self.url}/chat/completions"
+        self.completions_url = f"{self.url}/completions"
+
+    def _payload(self, prompt: str, temperature: float, stream: bool = False) -> dict:
+        return {
+            "model":       self.model,
+            "messages":    [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user",   "content": prompt}
+            ],
+            "stream":      stream,
+            "temperature": temperature
+        }
+
+    def _post(self, payload: dict, stream: bool = False, url: str = None) -> requests.Response:
+        return super()._post(payload, stream=stream, url=url or self.chat_url)
+
+    def _text(self, data: dict) -> str:
+        choices = data.get("choices") or [{}]
+        return (choices[0].get("message") or {}).get("content") or ""
+
+    def _chunks(self, resp):
+        # Server-sent events: "data: {json}" lines, ending with "data: [DONE]"
+        for line in resp.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                return
+            choices = json.loads(data).get("choices") or [{}]
+            text = (choices[0].get("delta") or {}).get("content")
+            if text:
+                yield text
+
+    def generate_batch(self, prompts: list, temperature: float = 0.6) -> list:
+        """Completions for all `prompts` from a single /completions request."""
+        if not prompts:
+            return []
+        payload = {
+            "model":       self.model,
+            "prompt":      [f"{self.system_prompt}\n\n{p}" for p in prompts],
+            "temperature": temperature,
+            "max_tokens":  LOCAL_LLM_MAX_TOKENS
+        }
+        with span("llm.generate", mode="batch"):
+            choices = self._post(payload, url=self.completions_url).json().get("choices", [])
+        texts = [""] * len(prompts)
+        for i, choice in enumerate(choices):
+            index = choice.get("index", i)
+            if 0 <= index < len(texts):
+                texts[index] = (choice.get("text") or "").strip()
+        inc("llm_output_chars_total", sum(len(t) for t in texts))
+        return texts
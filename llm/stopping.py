@@ -0,0 +1,46 @@
+# llm/stopping.py
+"""
+Stop conditions for streamed generations. Each takes the text received so
+far and returns True once the caller has everything it needs, at which point
+the client stops reading and drops the rest of the completion.
+"""
+
+import os
+
+# Opt-in until the uiuc.chat streaming format is verified: with MARKETMIND_STREAMING=1
+# agents stream their completions and stop reading once the reply is complete.
+STREAMING = os.getenv("MARKETMIND_STREAMING", "0") == "1"
+
+
+def closed_json(text: str, opener: str = "{") -> bool:
+    """True once the first `opener` ({ or [) in `text` has been closed (string-aware)."""
+    start = text.find(opener)
+    if start == -1:
+        return False
+    depth, in_string, escaped = 0, False, False
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+
+def closed_json_object(text: str) -> bool:
+    return closed_json(text, "{")
+
+
+def closed_json_array(text: str) -> bool:
+    return closed_json(text, "[")
+
@@ -0,0 +1,70 @@
+# llm/test_cache.py
+"""Unit tests for llm.cache (no network): python -m pytest llm"""
+
+import pytest
+
+from llm.backends import RuleBasedLLM
+from llm.cache import CachedLLM, CacheMiss, PromptCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PromptCache(str(tmp_path / "cache.db"), max_entries=10, memory_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_memory_and_disk_hits_and_misses(cache):
+    assert cache.get("a") is None
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.put("c", "3")                 # pushes "a" out of the 2-entry LRU
+    assert cache.get("c") == "3"        # LRU hit
+    assert cache.get("a") == "1"        # disk hit
+    assert cache.get("z") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 3)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_overwrite_keeps_one_row(cache):
+    cache.put("a", "1")
+    cache.put("a", "2")
+    cache._memory.clear()
+    assert cache.get("a") == "2"
+    assert cache.stats()["entries"] == 1
+
+
+def test_eviction_bounds_disk_and_drops_least_recent(cache):
+    for i in range(10):
+        cache.put(f"k{i}", str(i))
+    cache._memory.clear()
+    assert cache.get("k0") == "0"       # now the most recently used row
+    cache.put("k10", "10")              # over the bound: evicts the oldest chunk
+    assert cache.stats()["entries"] == 9
+    cache._memory.clear()
+    assert cache.get("k0") == "0"
+    assert cache.get("k1") is None
+    assert cache.get("k2") is None
+
+
+def test_row_count_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = PromptCache(path, max_entries=5)
+    for i in range(5):
+        first.put(f"k{i}", str(i))
+    first.close()
+    second = PromptCache(path, max_entries=5)
+    second.put("k5", "5")
+    assert second.stats()["entries"] == 4
+    second.close()
+
+
+def test_replay_serves_recorded_and_raises_on_miss(cache):
+    CachedLLM(RuleBasedLLM(), cache).generate("hello")
+    replay = CachedLLM(None, cache, replay=True)
+    assert replay.generate("hello") == RuleBasedLLM().generate("hello")
+    with pytest.raises(CacheMiss):
+        replay.generate("never recorded")
+    with pytest.raises(CacheMiss):
+        replay.generate_batch(["hello", "never recorded"])
@@ -0,0 +1,81 @@
+# llm/test_stopping.py
+"""Unit tests for llm.stopping and streamed early termination (no network): python -m pytest llm"""
+
+import importlib
+
+import pytest
+
+from llm import stopping
+from llm.local_inference import UIUCChatLLM
+from llm.stopping import closed_json_array, closed_json_object
+
+
+class _StreamedResponse:
+    """Stands in for a streamed requests.Response; records how much was read."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read   = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk.encode("utf-8")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def streamed(monkeypatch):
+    """UIUCChatLLM whose stream comes from a list of chunks."""
+    def make(chunks):
+        llm = UIUCChatLLM(api_key="test")
+        resp = _StreamedResponse(chunks)
+        monkeypatch.setattr(llm, "_post", lambda payload, stream=False, url=None: resp)
+        return llm, resp
+    return make
+
+
+def test_closed_json_object_is_string_aware():
+    assert not closed_json_object('Sure: {"action": "LIKE", "thought": "a } in text')
+    assert not closed_json_object('{"thought": "escaped \\" quote }"')
+    assert closed_json_object('{"action": "LIKE", "thought": "a } in text"}')
+    assert closed_json_object('noise {"a": {"b": [1, 2]}} trailing {')
+    assert not closed_json_object("no json here")
+
+
+def test_closed_json_array():
+    assert not closed_json_array('[{"post_id": 1}, {"post_id": 2}')
+    assert closed_json_array('[{"post_id": 1}, {"post_id": 2}]\nExplanation: ...')
+    assert closed_json_array('{"note": "x"} [ ]')
+
+
+def test_generate_stops_reading_once_the_reply_is_complete(streamed):
+    chunks = ['{"action": "LI', 'KE", "thought": "comfy', ' }"}', "\nThat is my reaction", " and more", " text."]
+    llm, resp = streamed(chunks)
+    assert llm.generate("prompt", stop=closed_json_object) == '{"action": "LIKE", "thought": "comfy }"}'
+    assert resp.read == 3
+    assert resp.closed
+
+
+def test_generate_reads_everything_without_a_stop_condition_met(streamed):
+    chunks = ['{"action": ', '"IGNORE"', ", ..."]
+    llm, resp = streamed(chunks)
+    assert llm.generate("prompt", stop=closed_json_object) == "".join(chunks)
+    assert resp.read == len(chunks)
+    assert resp.closed
+
+
+@pytest.mark.parametrize("value, expected", [(None, False), ("0", False), ("1", True)])
+def test_streaming_is_opt_in(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("MARKETMIND_STREAMING", raising=False)
+    else:
+        monkeypatch.setenv("MARKETMIND_STREAMING", value)
+    try:
+        assert importlib.reload(stopping).STREAMING is expected
+    finally:
+        monkeypatch.undo()
+        importlib.reload(stopping)
@@ -0,0 +1,116 @@
+# simulation/checkpoint.py
+"""
+Round-level checkpoints for long simulation runs.
+
+A checkpoint holds what run() would otherwise only keep in memory: the last
+completed round, running totals, each brand's campaign history, USP order
+and bandit statistics, each consumer's reaction history, the `seen` map, the
+state of the global and per-brand RNGs and, in seeded runs, the virtual
+clock and id sequence. Trigram counts, recent captions, openers, hashtags
+and the similarity index are not stored; they are rebuilt by replaying the
+brand's campaign history.
+"""
+
+import gzip
+import json
+import os
+import random
+from collections import deque
+from typing import Dict, Set
+
+from simulation import determinism
+
+VERSION = 1
+
+
+def _tuplify(value):
+    return tuple(_tuplify(v) for v in value) if isinstance(value, list) else value
+
+
+def save_checkpoint(path: str, round_no: int, totals: dict, brands: dict, consumers, seen: Dict[str, Set[int]]):
+    """
+    Write the state after `round_no` to `path` (gzipped JSON), atomically:
+    a crash while saving leaves the previous checkpoint in place.
+    Consumer histories are only saved for agents that live in memory; a
+    Population view rebuilds its agents on access, so only `seen` is kept.
+    """
+    state = {
+        "version": VERSION,
+        "round": round_no,
+        "totals": totals,
+        "rng": random.getstate(),
+        "clock": determinism.state(),
+        "brands": {
+            name: {"history": agent.history, "usps": agent.profile.get("usps", []),
+                   "bandit": agent.scheduler.state() if agent.scheduler else None,
+                   "rng": agent.rng.getstate()}
+            for name, agent in brands.items()
+        },
+        "consumers": {} if hasattr(consumers, "population") else {
+            cid: list(agent.history) for cid, agent in consumers.items() if agent.history
+        },
+        "seen": {cid: sorted(ids) for cid, ids in seen.items() if ids},
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')!r} in {path}")
+    return state
+
+
+def restore_checkpoint(state: dict, brands: dict, consumers, seen: Dict[str, Set[int]]) -> int:
+    """
+    Apply a loaded checkpoint to freshly built agents and `seen`.
+    Returns the last completed round; the run continues from the next one.
+    """
+    for name, saved in state["brands"].items():
+        agent = brands.get(name)
+        if agent is None:
+            print(f"[WARN] Checkpoint brand {name} not loaded – skipping its state")
+            continue
+        agent.reset_memory()
+        for record in saved["history"]:
+            agent._remember(record)
+        if saved["usps"]:
+            agent.profile["usps"] = list(saved["usps"])
+        if saved.get("bandit") and agent.scheduler is not None:
+            agent.scheduler.load_state(saved["bandit"])
+        if saved.get("rng"):
+            agent.rng.setstate(_tuplify(saved["rng"]))
+
+    if not hasattr(consumers, "population"):
+        for cid, history in state["consumers"].items():
+            agent = consumers.get(cid)
+            if agent is not None:
+                agent.history = deque(history, maxlen=agent.history.maxlen)
+
+    for cid, ids in state["seen"].items():
+        if cid in seen:
+            seen[cid].update(ids)
+
+    random.setstate(_tuplify(state["rng"]))
+    determinism.restore_state(state.get("clock"))
+    return state["round"]
+
+
+def discard_unsaved(state: dict, store) -> int:
+    """
+    Delete what a crashed run stored after its last checkpoint: campaigns of
+    later rounds (and their reactions) with ids past the last id the
+    checkpoint had handed out. Resuming regenerates those rounds, so keeping
+    them would leave each one in the store twice. Returns the campaigns deleted.
+    """
+    last_id = (state.get("clock") or {}).get("last_id")
+    if last_id is None:
+        # Checkpoints without the id sequence: the largest id in any brand's history
+        last_id = max((r["id"] for b in state["brands"].values() for r in b["history"]), default=0)
+    return store.discard_rounds_after(state["round"], last_id)
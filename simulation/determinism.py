@@ -0,0 +1,160 @@
+# simulation/determinism.py
+"""
+Clock, id allocation and random streams shared by the agents, switchable
+to a seeded mode in which the same inputs produce the same run.
+
+Default (wall-clock) mode:
+    now()        datetime.utcnow()
+    sleep(s)     time.sleep(s)
+    next_id()    current time in ms, bumped past the last id handed out,
+                 so concurrent brands never get the same campaign id
+    rng_for(n)   an unseeded random.Random
+
+Seeded mode (configure(seed), or MARKETMIND_SEED):
+    now()        a virtual clock starting at VIRTUAL_EPOCH that only moves
+                 when the simulation sleeps, so sleeping costs no time
+    next_id()    monotonic ids derived from the virtual clock
+    rng_for(n)   random.Random seeded from (seed, n): each agent draws from
+                 its own stream, whatever order threads run in
+
+Agents take their clock, ids and RNG from here at call time, so configure()
+applies to agents that already exist as long as they are reseeded
+(see reseed()).
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# Seed for a reproducible run (unset: wall-clock mode).
+SEED = os.getenv("MARKETMIND_SEED")
+# Timezone-aware, so ids derived from the virtual clock are the same on every host
+VIRTUAL_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class WallClock:
+    virtual = False
+
+    def now(self) -> datetime:
+        return datetime.utcnow()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time: sleep() advances it instantly, nothing else does."""
+
+    virtual = True
+
+    def __init__(self, start: datetime = VIRTUAL_EPOCH):
+        self._now  = start
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += timedelta(seconds=max(0.0, seconds))
+
+
+class IdAllocator:
+    """Collision-free, increasing ids: the clock's ms, or last id + 1 if that is not larger."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        now = self.clock.now()
+        # Naive datetimes are UTC here; timestamp() would read them as local time
+        stamp = int((now if now.tzinfo else now.replace(tzinfo=timezone.utc)).timestamp() * 1000)
+        with self._lock:
+            self._last = max(self._last + 1, stamp)
+            return self._last
+
+
+_seed  = None
+_clock = WallClock()
+_ids   = IdAllocator(_clock)
+
+
+def configure(seed=None):
+    """
+    Switch to seeded mode with `seed` (virtual clock, fresh id sequence,
+    seeded global `random`), or back to wall-clock mode with None.
+    """
+    global _seed, _clock, _ids
+    _seed  = None if seed is None else str(seed)
+    _clock = WallClock() if seed is None else VirtualClock()
+    _ids   = IdAllocator(_clock)
+    if seed is not None:
+        random.seed(f"{seed}:global")
+
+
+def seeded() -> bool:
+    return _seed is not None
+
+
+def now() -> datetime:
+    return _clock.now()
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def next_id() -> int:
+    return _ids.next_id()
+
+
+def rng_for(name: str) -> random.Random:
+    """Independent random stream for the agent called `name`."""
+    return random.Random(f"{_seed}:{name}") if _seed is not None else random.Random()
+
+
+def reseed(rng: random.Random, name: str):
+    """Reset an existing stream from rng_for() to the current seed, in place."""
+    if _seed is not None:
+        rng.seed(f"{_seed}:{name}")
+
+
+def state() -> dict:
+    """Clock position and last id, for checkpoints of seeded runs."""
+    return {"seed": _seed, "now": _clock.now().isoformat() if _clock.virtual else None, "last_id": _ids._last}
+
+
+def reserve_ids(last_id):
+    """
+    Make every later id larger than `last_id`, e.g. the largest id already
+    in the campaign store, so runs that start from the same virtual epoch do
+    not hand out ids an earlier run has stored.
+    """
+    with _ids._lock:
+        _ids._last = max(_ids._last, last_id or 0)
+
+
+def restore_state(saved: dict):
+    """Continue a seeded run's virtual clock and id sequence from state()."""
+    if not saved or not _clock.virtual or saved.get("seed") != _seed:
+        return
+    if saved.get("now"):
+        saved_now = datetime.fromisoformat(saved["now"])
+        if saved_now.tzinfo is None:  # checkpoints written before the epoch carried a timezone
+            saved_now = saved_now.replace(tzinfo=timezone.utc)
+        _clock.advance((saved_now - _clock.now()).total_seconds())
+    with _ids._lock:
+        _ids._last = max(_ids._last, saved.get("last_id") or 0)
+
+
+if SEED is not None:
+    configure(SEED)
@@ -1,15 +1,39 @@
 # simulation/run_simulation.py
 
-import os, time, requests
+import os, time, argparse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Set, List
 
 from agents.brand_agent import BrandAgent
 from agents.consumer_agent import ConsumerAgent, load_consumer_profiles
 from agents.brand_profiles import load_profile
+from llm.backends import LLMBackend, make_llm
+from llm.cache import PromptCache, CachedLLM
+from agents import sinks
+from agents.parsing import PARSE_STATS
+from simulation.checkpoint import save_checkpoint, load_checkpoint, restore_checkpoint, discard_unsaved
+from tracing import METRICS_PORT, REGISTRY, span, start_metrics_server
+from simulation import determinism
 
-BACKEND = "http://localhost:8000"
+# Upper bound on concurrent LLM-backed agent calls (brand generations or
+# consumer evaluations) in flight at any one time.
+MAX_IN_FLIGHT = int(os.getenv("MARKETMIND_MAX_IN_FLIGHT", "8"))
+# Opt-in prompt->completion cache (SQLite file path); replay serves only from it.
+LLM_CACHE_PATH = os.getenv("MARKETMIND_LLM_CACHE")
+LLM_REPLAY     = os.getenv("MARKETMIND_LLM_REPLAY", "") == "1"
+# Posts judged per consumer LLM call; 1 evaluates every post separately.
+BATCH_SIZE = int(os.getenv("MARKETMIND_BATCH_SIZE", "8"))
+# Surrogate pre-screen: pairs whose affinity is within this margin of the
+# consumer's decision_threshold go to the LLM, the rest are decided locally.
+# Unset disables the surrogate (every pair goes to the LLM).
+SURROGATE_MARGIN = float(os.getenv("MARKETMIND_SURROGATE_MARGIN")) if os.getenv("MARKETMIND_SURROGATE_MARGIN") else None
+# Optional JSON Lines consumer population used instead of agents/consumer_profiles.
+POPULATION_PATH = os.getenv("MARKETMIND_POPULATION")
+# Opt-in checkpoint file, rewritten after every CHECKPOINT_EVERY completed rounds.
+CHECKPOINT_PATH  = os.getenv("MARKETMIND_CHECKPOINT")
+CHECKPOINT_EVERY = int(os.getenv("MARKETMIND_CHECKPOINT_EVERY", "1"))
 
-def load_brand_agents(folder: str = "agents/brand_profiles") -> Dict[str, BrandAgent]:
+def load_brand_agents(folder: str = "agents/brand_profiles", llm: LLMBackend = None) -> Dict[str, BrandAgent]:
     agents = {}
     if not os.path.isdir(folder):
         print(f"[ERROR] Brand profiles folder missing: {folder}")
@@ -20,76 +44,281 @@ def load_brand_agents(folder: str = "agents/brand_profiles") -> Dict[str, BrandA
                 profile = load_profile(fname)
                 name = profile.get("name")
                 if name:
-                    agents[name] = BrandAgent(profile=profile)
+                    agents[name] = BrandAgent(profile=profile, llm=llm)
             except Exception as e:
                 print(f"[WARN] Skipping {fname}: {e}")
     return agents
 
-def fetch_campaigns() -> List[dict]:
-    try:
-        r = requests.get(f"{BACKEND}/campaigns/", timeout=8)
-        if r.ok:
-            return r.json()
-        print(f"[WARN] GET /campaigns status={r.status_code}")
-    except Exception as e:
-        print(f"[WARN] fetch_campaigns: {e}")
-    return []
-
-def run(rounds: int = 3, pause: float = 0.7):
+def brand_phase(
+    brands: Dict[str, BrandAgent],
+    pool: ThreadPoolExecutor,
+    verbose: bool = True,
+    round_no: int = None
+) -> List[dict]:
+    """
+    Generate one campaign per brand concurrently, tagged with `round_no`.
+    Campaign ids are allocated up front in brand order, so they do not
+    depend on which generation finishes first.
+    Output is printed in brand order regardless of completion order.
+    Returns the campaigns posted this round, in brand order, as handed to
+    the sink. This is the round barrier: every brand has finished when it
+    returns, so the consumer phase starts on them without reading them back.
+    """
+    jobs = []
+    for bname, bagent in brands.items():
+        if verbose:
+            print(f"[Brand] {bname}: generating campaign...")
+        jobs.append((bname, pool.submit(bagent.generate_campaign, round_no=round_no,
+                                        campaign_id=determinism.next_id())))
+
+    campaigns: List[dict] = []
+    for bname, fut in jobs:
+        caption = fut.result()
+        campaigns.append({"brand_name": bname, **brands[bname].history[-1]})
+        if verbose:
+            print(f"  → [{bname}] Posted id={campaigns[-1]['id']}: {caption[:90]}{'…' if len(caption)>90 else ''}")
+    return campaigns
+
+def consumer_phase(
+    consumers: Dict[str, ConsumerAgent],
+    campaigns: List[dict],
+    seen: Dict[str, Set[int]],
+    pool: ThreadPoolExecutor,
+    batch_size: int = BATCH_SIZE,
+    verbose: bool = True,
+    surrogate=None,
+    surrogate_margin: float = None
+) -> Dict[str, List[dict]]:
+    """
+    Fan out every unseen (consumer, post) evaluation of the round to the pool,
+    packing up to `batch_size` posts of one consumer into a single LLM call.
+    With a SurrogateScorer, only pairs near the consumer's decision threshold
+    are sent to the LLM; the others are recorded from the surrogate's score.
+    The `seen` map is checked before scheduling and updated as results come
+    back; reactions are collected (and printed) in consumer, then post order.
+    Returns a map of consumer_id -> list of reaction dicts.
+    """
+    step = max(1, batch_size)
+    scores = escalate = None
+    if surrogate is not None and campaigns:
+        scores, escalate = surrogate.triage(campaigns, surrogate_margin)
+        col = {id(c): j for j, c in enumerate(campaigns)}
+
+    jobs = {}
+    decided = {}
+    for cid, cagent in consumers.items():
+        queued = set()
+        pending = []
+        decided[cid] = {}
+        row = surrogate.index.get(cid) if scores is not None else None
+        for camp in campaigns:
+            pid = camp["id"]
+            if pid in seen[cid] or pid in queued:
+                continue
+            queued.add(pid)
+            if row is not None and not escalate[row, col[id(camp)]]:
+                score, thr = float(scores[row, col[id(camp)]]), cagent.threshold
+                decided[cid][pid] = cagent.record_reaction(camp, {
+                    "thought": f"[surrogate] affinity {score:.2f} vs threshold {thr:.2f}",
+                    "action": surrogate.decide(score, thr, surrogate_margin)
+                })
+                continue
+            pending.append(camp)
+        jobs[cid] = [
+            ([c["id"] for c in chunk], pool.submit(cagent.batch_evaluate, chunk, step))
+            for chunk in (pending[i:i + step] for i in range(0, len(pending), step))
+        ]
+
+    results: Dict[str, List[dict]] = {}
+    for cid, cjobs in jobs.items():
+        by_pid = dict(decided[cid])
+        for pids, fut in cjobs:
+            by_pid.update(zip(pids, fut.result()))
+        if verbose:
+            print(f"[Consumer] {consumers[cid].name} reacting to {len(by_pid)} new post(s)"
+                  + (f" ({len(decided[cid])} by surrogate)" if decided[cid] else ""))
+        results[cid] = []
+        # campaign order, whichever path decided the post
+        for camp in campaigns:
+            pid = camp["id"]
+            if pid not in by_pid or pid in seen[cid]:
+                continue
+            reaction = by_pid[pid]
+            seen[cid].add(pid)
+            results[cid].append(reaction)
+            if verbose:
+                print(f"   - Post {pid} => {reaction['action']}")
+    return results
+
+def feed_back(brands: Dict[str, BrandAgent], campaigns: List[dict], reactions):
+    """Group reaction records by post and hand each campaign's actions to its brand."""
+    by_name = {agent.name: agent for agent in brands.values()}
+    owner = {c["id"]: by_name.get(c.get("brand_name")) for c in campaigns}
+    actions: Dict[int, List[str]] = {}
+    for r in reactions:
+        if owner.get(r.get("post_id")) is not None:
+            actions.setdefault(r["post_id"], []).append(r["action"])
+    for pid, acts in actions.items():
+        owner[pid].record_feedback(pid, acts)
+
+def run(
+    rounds: int = 3,
+    pause: float = 0.7,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    cache_path: str = LLM_CACHE_PATH,
+    replay: bool = LLM_REPLAY,
+    batch_size: int = BATCH_SIZE,
+    surrogate_margin: float = SURROGATE_MARGIN,
+    population_path: str = POPULATION_PATH,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    resume: bool = False,
+    seed=determinism.SEED,
+    brands: Dict[str, BrandAgent] = None,
+    consumers: Dict[str, ConsumerAgent] = None,
+    verbose: bool = True
+) -> dict:
+    """
+    Run the simulation. Brands and consumers are loaded from their profile
+    folders unless passed in (e.g. by benchmarks with their own LLM client);
+    `population_path` loads consumers from a JSON Lines file into a columnar
+    Population whose agents are only created as each round needs them.
+    With `checkpoint_path`, state is saved every `checkpoint_every` rounds
+    and `resume=True` continues after the last saved round, so `rounds` is
+    the total for the whole run, not the number still to go.
+    With a `seed`, the run is reproducible: every brand draws from its own
+    seeded random stream, ids and timestamps come from a virtual clock and
+    pauses cost no wall time (see simulation.determinism).
+    Returns a small summary: rounds run, campaigns posted, reactions recorded.
+    """
     print(">>> Simulation starting")
-    brands = load_brand_agents()
-    consumers_profiles = load_consumer_profiles()
-    consumers = {cid: ConsumerAgent(p) for cid, p in consumers_profiles.items()}
+    if replay and not cache_path:
+        print("❌ Replay mode needs an LLM cache path – aborting.")
+        return {}
+    if resume and not (checkpoint_path and os.path.exists(checkpoint_path)):
+        print(f"❌ No checkpoint to resume from at {checkpoint_path} – aborting.")
+        return {}
+    if seed is not None:
+        determinism.configure(seed)
+        print(f"[Seed] Deterministic run with seed {seed} (virtual clock)")
+
+    cache = None
+    if brands is None or consumers is None:
+        # One client for every agent so they share its connection pool and rate limit
+        llm = None if replay else make_llm(pool_size=max(1, max_in_flight))
+        if cache_path:
+            cache = PromptCache(cache_path)
+            llm = CachedLLM(llm, cache, replay=replay)
+            print(f"[Cache] Using {cache_path}" + (f" (replay only, model {llm.model})" if replay else ""))
+        if brands is None:
+            brands = load_brand_agents(llm=llm)
+        if consumers is None and population_path:
+            from agents.population import Population
+            consumers = Population.from_jsonl(population_path).as_agents(llm)
+        elif consumers is None:
+            consumers_profiles = load_consumer_profiles()
+            consumers = {cid: ConsumerAgent(p, llm=llm) for cid, p in consumers_profiles.items()}
 
     if not brands:
         print("❌ No brands loaded – aborting.")
-        return
+        return {}
     if not consumers:
         print("❌ No consumers loaded – aborting.")
-        return
+        return {}
 
     print(f"✅ Loaded {len(brands)} brand(s) and {len(consumers)} consumer(s).")
+    if seed is not None:
+        for bagent in brands.values():
+            bagent.reseed()
 
     seen: Dict[str, Set[int]] = {cid: set() for cid in consumers}
+    surrogate = None
+    if surrogate_margin is not None:
+        from simulation.surrogate import SurrogateScorer
+        population = getattr(consumers, "population", None)
+        surrogate = (SurrogateScorer.from_population(population) if population is not None
+                     else SurrogateScorer.from_agents(consumers))
+        print(f"[Surrogate] Pre-screening with margin {surrogate_margin}")
+    totals = {"rounds": 0, "campaigns": 0, "reactions": 0}
+    from interface.store import get_store
+    start = 1
+    if resume:
+        state = load_checkpoint(checkpoint_path)
+        start = restore_checkpoint(state, brands, consumers, seen) + 1
+        totals.update(state["totals"])
+        print(f"[Checkpoint] Resuming from {checkpoint_path} after round {start - 1}")
+        discarded = discard_unsaved(state, get_store())
+        if discarded:
+            print(f"[Checkpoint] Discarded {discarded} campaign(s) stored after round {start - 1}")
+    # Ids continue after the stored campaigns; a seeded run would otherwise reuse them
+    determinism.reserve_ids(get_store().max_campaign_id())
 
-    for r_i in range(1, rounds + 1):
-        print(f"\n=== ROUND {r_i} ===")
-        new_ids: Set[int] = set()
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+        print(f"[Metrics] Serving /metrics on port {METRICS_PORT}")
+    run_started = time.perf_counter()
 
-        # Brand phase
-        for bname, bagent in brands.items():
-            print(f"[Brand] {bname}: generating campaign...")
-            caption = bagent.generate_campaign()
-            cid = bagent.history[-1]["id"]
-            new_ids.add(cid)
-            print(f"  → Posted id={cid}: {caption[:90]}{'…' if len(caption)>90 else ''}")
-
-        time.sleep(pause)
-
-        # Consumer phase
-        campaign_list = fetch_campaigns()
-        new_campaigns = [c for c in campaign_list if c.get("id") in new_ids]
-
-        for cid, cagent in consumers.items():
-            print(f"[Consumer] {cagent.name} reacting to {len(new_campaigns)} new post(s)")
-            for camp in new_campaigns:
-                pid = camp["id"]
-                if pid in seen[cid]:
-                    continue
-                reaction = cagent.evaluate_post(camp)
-                seen[cid].add(pid)
-                print(f"   - Post {pid} => {reaction['action']}")
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        for r_i in range(start, rounds + 1):
+            print(f"\n=== ROUND {r_i} ===")
+            with span("sim.round"):
+                # Brand phase
+                with span("sim.brand_phase"):
+                    new_campaigns = brand_phase(brands, pool, verbose, r_i)
+                # Store the round's campaigns before anyone reacts to them
+                with span("sim.flush"):
+                    sinks.flush_all()
+
+                # Consumer phase on the campaigns the brand phase just returned
+                with span("sim.consumer_phase"):
+                    reactions = consumer_phase(consumers, new_campaigns, seen, pool, batch_size, verbose,
+                                               surrogate, surrogate_margin)
+                with span("sim.flush"):
+                    sinks.flush_all()
+
+                # Reaction feedback for bandit schedulers, then rotate USPs (round-robin brands only)
+                feed_back(brands, new_campaigns, (r for rs in reactions.values() for r in rs))
+                for bname, bagent in brands.items():
+                    bagent.cycle_usp()
+
+                totals["rounds"]    += 1
+                totals["campaigns"] += len(new_campaigns)
+                totals["reactions"] += sum(len(r) for r in reactions.values())
 
-        # Rotate USPs
-        for bname, bagent in brands.items():
-            bagent.cycle_usp()
+                with span("sim.pause"):
+                    determinism.sleep(pause)
 
-        time.sleep(pause)
+                # After the pause, so a seeded run resumes with the clock where it left off
+                if checkpoint_path and (r_i % max(1, checkpoint_every) == 0 or r_i == rounds):
+                    with span("sim.checkpoint"):
+                        save_checkpoint(checkpoint_path, r_i, totals, brands, consumers, seen)
+                    if verbose:
+                        print(f"[Checkpoint] Saved round {r_i} to {checkpoint_path}")
 
     print("\n=== DONE ===")
     for bname, bagent in brands.items():
         s = bagent.summary()
         print(f"[Summary] {bname}: {s['campaigns_run']} campaigns; last USP = {s['last_usp']}")
+        if "bandit" in s:
+            b = s["bandit"]
+            print(f"[Bandit] {bname} ({b['kind']}): best USP = {b['best_usp']}; best lens = {b['best_lens']}")
+    sinks.flush_all()
+    print(f"[Sink] {sinks.get_default_sink().stats()}")
+    print(f"[Parse] {PARSE_STATS.stats()}")
+    if cache:
+        print(f"[Cache] {cache.stats()}")
+        cache.close()
+    print(f"\n[Trace] {time.perf_counter() - run_started:.2f}s run time by span:")
+    print(REGISTRY.report(time.perf_counter() - run_started))
+    return totals
 
 if __name__ == "__main__":
-    run(rounds=5)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the MarketMind simulation")
+    parser.add_argument("--rounds", type=int, default=5, help="total rounds, including resumed ones")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="checkpoint file (enables checkpointing)")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint file")
+    parser.add_argument("--seed", default=determinism.SEED, help="reproducible run with this seed")
+    args = parser.parse_args()
+    run(rounds=args.rounds, checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+        resume=args.resume, seed=args.seed)
@@ -0,0 +1,352 @@
+# simulation/sharded.py
+"""
+Sharded simulation: the consumer population is split across worker
+processes, on this machine or on other hosts of the local network.
+
+    # coordinator plus 4 local worker processes
+    python -m simulation.sharded coordinator --shards 4 --rounds 5 --local-workers
+
+    # or start workers yourself, e.g. on other hosts
+    python -m simulation.sharded coordinator --shards 2 --bind 0.0.0.0:50000
+    python -m simulation.sharded worker --connect 10.0.0.5:50000 --shard 0 --shards 2
+    python -m simulation.sharded worker --connect 10.0.0.5:50000 --shard 1 --shards 2
+
+The coordinator runs the brand phase, sends each round's new campaigns to
+every shard and waits until all shards have reported (the round barrier).
+Workers evaluate their shard with the usual consumer_phase and send the
+reactions back; the coordinator persists them through its own sink, so only
+the coordinator needs the campaign store. Consumers are assigned to shards
+by a stable hash of their id, so every worker picks the same partition from
+the same profiles. UIUC_RATE_LIMIT applies per process.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Set
+
+from agents import sinks
+from agents.consumer_agent import ConsumerAgent, load_consumer_profiles
+from interface.store import get_store
+from llm.cache import PromptCache, CachedLLM
+from llm.backends import make_llm
+from simulation.run_simulation import (
+    BATCH_SIZE, LLM_CACHE_PATH, MAX_IN_FLIGHT, POPULATION_PATH, SURROGATE_MARGIN,
+    brand_phase, consumer_phase, feed_back, load_brand_agents
+)
+from simulation import determinism
+
+AUTHKEY = os.getenv("MARKETMIND_SHARD_AUTHKEY", "marketmind").encode("utf-8")
+DEFAULT_ADDRESS = ("127.0.0.1", 50000)
+# Seconds the coordinator waits for every shard to get ready or finish a round.
+ROUND_TIMEOUT = float(os.getenv("MARKETMIND_SHARD_TIMEOUT", "600"))
+# How often a waiting coordinator checks that its local workers are still alive.
+_POLL_INTERVAL = 0.5
+
+
+def shard_of(consumer_id: str, shards: int) -> int:
+    """Stable shard index for a consumer (same on every host and run)."""
+    return zlib.crc32(consumer_id.encode("utf-8")) % shards
+
+
+# ——— Queues served by the coordinator's manager process ———
+
+_task_queues = {}
+_results = None
+
+def _task_queue(shard: int):
+    return _task_queues.setdefault(shard, queue.Queue())
+
+def _result_queue():
+    global _results
+    if _results is None:
+        _results = queue.Queue()
+    return _results
+
+
+class ShardManager(BaseManager):
+    pass
+
+ShardManager.register("task_queue", callable=_task_queue)
+ShardManager.register("result_queue", callable=_result_queue)
+
+
+def _parse_address(value: str):
+    host, _, port = value.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+class _CollectSink(sinks.ResponseSink):
+    """Keeps a worker's reactions in memory until they are shipped to the coordinator."""
+
+    def __init__(self):
+        super().__init__(flush_every=1 << 30)
+        self.collected = []
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        self.collected.extend(reactions)
+
+    def drain(self) -> list:
+        self.flush()
+        out, self.collected = self.collected, []
+        return out
+
+
+# ——— Worker ———
+
+def load_shard(shard: int, shards: int, llm, sink, population_path: str = POPULATION_PATH):
+    """consumer_id -> ConsumerAgent for the consumers that belong to `shard`."""
+    if population_path:
+        from agents.population import Population
+        pop = Population()
+        with open(population_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    profile = json.loads(line)
+                    if shard_of(profile["id"], shards) == shard:
+                        pop.add(profile)
+        return pop.as_agents(llm, sink=sink)
+    return {
+        cid: ConsumerAgent(p, llm=llm, sink=sink)
+        for cid, p in load_consumer_profiles().items()
+        if shard_of(cid, shards) == shard
+    }
+
+
+def run_worker(
+    shard: int,
+    shards: int,
+    address=DEFAULT_ADDRESS,
+    authkey: bytes = AUTHKEY,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    batch_size: int = BATCH_SIZE,
+    surrogate_margin: float = SURROGATE_MARGIN,
+    cache_path: str = LLM_CACHE_PATH,
+    population_path: str = POPULATION_PATH,
+    llm_url: str = None,
+    backend: str = None,
+    seed=determinism.SEED,
+    connect_timeout: float = 30.0
+):
+    """
+    Serve rounds for one shard until the coordinator sends the stop message.
+    With a `seed` (the coordinator's), reaction timestamps follow the
+    coordinator's virtual clock, which comes with every round.
+    """
+    if seed is not None:
+        determinism.configure(seed)
+    manager = ShardManager(address=address, authkey=authkey)
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            manager.connect()
+            break
+        except (ConnectionRefusedError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    tasks, results = manager.task_queue(shard), manager.result_queue()
+
+    try:
+        llm = make_llm(backend, pool_size=max(1, max_in_flight), **({"base_url": llm_url} if llm_url else {}))
+        cache = None
+        if cache_path:
+            cache = PromptCache(cache_path)
+            llm = CachedLLM(llm, cache)
+        sink = _CollectSink()
+        consumers = load_shard(shard, shards, llm, sink, population_path)
+        seen: Dict[str, Set[int]] = {cid: set() for cid in consumers}
+
+        surrogate = None
+        if surrogate_margin is not None and consumers:
+            from simulation.surrogate import SurrogateScorer
+            population = getattr(consumers, "population", None)
+            surrogate = (SurrogateScorer.from_population(population) if population is not None
+                         else SurrogateScorer.from_agents(consumers))
+    except Exception as e:
+        # Tell the coordinator instead of leaving it waiting for "ready"
+        results.put({"kind": "error", "shard": shard, "round": None, "error": repr(e)})
+        raise
+
+    results.put({"kind": "ready", "shard": shard, "consumers": len(consumers)})
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            determinism.restore_state(task.get("clock"))
+            try:
+                consumer_phase(consumers, task["campaigns"], seen, pool, batch_size, False,
+                               surrogate, surrogate_margin)
+                results.put({"kind": "round", "shard": shard, "round": task["round"],
+                             "reactions": sink.drain()})
+            except Exception as e:
+                results.put({"kind": "error", "shard": shard, "round": task["round"], "error": repr(e)})
+    if cache:
+        cache.close()
+
+
+# ——— Coordinator ———
+
+def _gather(results, shards: int, kind: str, round_no: int = None, timeout: float = ROUND_TIMEOUT,
+            procs: list = None) -> List[dict]:
+    """
+    Round barrier: wait for one `kind` message from every shard. Raises if a
+    shard reports an error, a local worker process (`procs`, by shard) exits,
+    or `timeout` seconds pass.
+    """
+    got = {}
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while len(got) < shards:
+        remaining = deadline - time.monotonic() if deadline is not None else _POLL_INTERVAL
+        if remaining <= 0:
+            missing = sorted(set(range(shards)) - set(got))
+            raise RuntimeError(f"Shard(s) {missing} did not report {kind} within {timeout}s")
+        try:
+            msg = results.get(timeout=min(remaining, _POLL_INTERVAL))
+        except queue.Empty:
+            for s, p in enumerate(procs or []):
+                if s not in got and p.exitcode is not None:
+                    raise RuntimeError(f"Shard {s} worker exited with code {p.exitcode} before reporting {kind}")
+            continue
+        if msg["kind"] == "error":
+            stage = "during setup" if msg["round"] is None else f"in round {msg['round']}"
+            raise RuntimeError(f"Shard {msg['shard']} failed {stage}: {msg['error']}")
+        if msg["kind"] == kind and msg.get("round") == round_no:
+            got[msg["shard"]] = msg
+    return [got[s] for s in range(shards)]
+
+
+def run_sharded(
+    rounds: int = 3,
+    shards: int = 2,
+    address=DEFAULT_ADDRESS,
+    authkey: bytes = AUTHKEY,
+    local_workers: bool = False,
+    worker_kwargs: dict = None,
+    brands: dict = None,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    pause: float = 0.7,
+    round_timeout: float = ROUND_TIMEOUT,
+    seed=determinism.SEED,
+    sink: sinks.ResponseSink = None,
+    verbose: bool = True
+) -> dict:
+    """
+    Coordinate a sharded run. With `local_workers` one worker process per
+    shard is started here; otherwise workers are expected to connect to
+    `address`. The shards' reactions go to `sink` (default: the campaign
+    store). With a `seed` the run reproduces a single-process run() with the
+    same seed, brands and consumers. Returns the same totals as run().
+    Raises RuntimeError if a shard fails, a local worker dies, or a shard
+    takes longer than `round_timeout` seconds to get ready or finish a round.
+    """
+    print(">>> Sharded simulation starting")
+    if seed is not None:
+        determinism.configure(seed)
+        print(f"[Seed] Deterministic run with seed {seed} (virtual clock)")
+    manager = ShardManager(address=address, authkey=authkey)
+    manager.start()
+    results = manager.result_queue()
+    tasks = [manager.task_queue(s) for s in range(shards)]
+
+    procs = []
+    if local_workers:
+        ctx = multiprocessing.get_context("spawn")
+        for s in range(shards):
+            p = ctx.Process(target=run_worker, args=(s, shards, manager.address, authkey),
+                            kwargs={"seed": seed, **(worker_kwargs or {})}, daemon=True)
+            p.start()
+            procs.append(p)
+
+    totals = {"rounds": 0, "campaigns": 0, "reactions": 0}
+    try:
+        determinism.reserve_ids(get_store().max_campaign_id())
+        if brands is None:
+            llm = make_llm(pool_size=max(1, max_in_flight))
+            brands = load_brand_agents(llm=llm)
+        if not brands:
+            print("❌ No brands loaded – aborting.")
+            return {}
+        if seed is not None:
+            for bagent in brands.values():
+                bagent.reseed()
+
+        ready = _gather(results, shards, "ready", timeout=round_timeout, procs=procs)
+        print(f"✅ {len(brands)} brand(s); {shards} shard(s) with "
+              f"{', '.join(str(m['consumers']) for m in ready)} consumer(s).")
+        sink = sink or sinks.get_default_sink()
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+            for r_i in range(1, rounds + 1):
+                print(f"\n=== ROUND {r_i} ===")
+                started = time.perf_counter()
+                new_campaigns = brand_phase(brands, pool, verbose, r_i)
+                sinks.flush_all()
+
+                for q in tasks:
+                    q.put({"round": r_i, "campaigns": new_campaigns, "clock": determinism.state()})
+                reports = _gather(results, shards, "round", r_i, round_timeout, procs)
+
+                n_reactions = 0
+                for report in reports:
+                    for record in report["reactions"]:
+                        sink.write_reaction(record)
+                    n_reactions += len(report["reactions"])
+                sink.flush()
+
+                feed_back(brands, new_campaigns, (r for report in reports for r in report["reactions"]))
+                for bagent in brands.values():
+                    bagent.cycle_usp()
+                totals["rounds"]    += 1
+                totals["campaigns"] += len(new_campaigns)
+                totals["reactions"] += n_reactions
+                print(f"[Round {r_i}] {n_reactions} reaction(s) from {shards} shard(s) "
+                      f"in {time.perf_counter() - started:.2f}s")
+                determinism.sleep(pause)
+    finally:
+        for q in tasks:
+            q.put(None)
+        for p in procs:
+            p.join(timeout=10)
+        manager.shutdown()
+
+    print("\n=== DONE ===")
+    print(f"[Sink] {sink.stats()}")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded MarketMind simulation")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    coord = sub.add_parser("coordinator")
+    coord.add_argument("--shards", type=int, required=True)
+    coord.add_argument("--rounds", type=int, default=5)
+    coord.add_argument("--bind", default="%s:%d" % DEFAULT_ADDRESS, help="host:port the workers connect to")
+    coord.add_argument("--local-workers", action="store_true", help="start one worker process per shard here")
+    coord.add_argument("--round-timeout", type=float, default=ROUND_TIMEOUT,
+                       help="seconds to wait for every shard per round (default %(default)s)")
+    coord.add_argument("--seed", default=determinism.SEED, help="reproducible run with this seed")
+
+    worker = sub.add_parser("worker")
+    worker.add_argument("--connect", default="%s:%d" % DEFAULT_ADDRESS, help="coordinator host:port")
+    worker.add_argument("--shard", type=int, required=True)
+    worker.add_argument("--shards", type=int, required=True)
+    worker.add_argument("--llm-url", help="chat endpoint (default: uiuc.chat)")
+    worker.add_argument("--backend", help="LLM backend (default: MARKETMIND_LLM_BACKEND)")
+    worker.add_argument("--seed", default=determinism.SEED, help="the coordinator's seed")
+
+    args = parser.parse_args()
+    if args.role == "coordinator":
+        run_sharded(rounds=args.rounds, shards=args.shards, address=_parse_address(args.bind),
+                    local_workers=args.local_workers, round_timeout=args.round_timeout, seed=args.seed)
+    else:
+        run_worker(args.shard, args.shards, address=_parse_address(args.connect), llm_url=args.llm_url,
+                   backend=args.backend, seed=args.seed)
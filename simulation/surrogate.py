@@ -0,0 +1,139 @@
+# simulation/surrogate.py
+
+import re
+import zlib
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Post vocabulary that speaks to each personality trait (matched as word prefixes).
+TRAIT_KEYWORDS = {
+    "loyalty":                ["join", "community", "family", "trusted", "classic", "original", "again", "crew"],
+    "trend_seeker":           ["new", "drop", "designer", "style", "trend", "fresh", "limited", "exclusive", "look", "colorway"],
+    "value_shopper":          ["value", "price", "pricing", "afford", "save", "saving", "deal", "direct", "budget", "durab", "last"],
+    "sustainability_concern": ["eco", "recycl", "sustainab", "green", "planet", "repair", "reuse", "earth"],
+}
+
+
+def _words(text: str) -> list:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _hashed_bow(texts: list, dim: int) -> np.ndarray:
+    """L2-normalised hashed bag-of-words, one row per text."""
+    mat = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for w in _words(text):
+            mat[i, zlib.crc32(w.encode("utf-8")) % dim] += 1.0
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.where(norms == 0, 1.0, norms)
+
+
+class SurrogateScorer:
+    """
+    Cheap stand-in for the consumer LLM call. Consumers are embedded once as a
+    trait matrix (C×T) and a hashed daily-needs matrix (C×D); each round's
+    posts become a trait-keyword matrix (B×T) and a hashed caption/USP matrix
+    (B×D). One pass of matrix products gives the C×B affinity matrix.
+
+    Pairs whose affinity is within `margin` of the consumer's
+    decision_threshold are escalated to the LLM. For the rest the surrogate
+    decides: LIKE above the band (SHARE well above it), IGNORE below it.
+    """
+
+    def __init__(self, ids: list, traits: np.ndarray, needs: list, thresholds: np.ndarray,
+                 trait_names: list, dim: int = 256, need_weight: float = 0.5,
+                 gain: float = 6.0, bias: float = 0.35, need_rows: np.ndarray = None):
+        """
+        `needs` holds each consumer's daily-needs text or, with `need_rows`,
+        only the distinct texts plus every consumer's index into them.
+        """
+        self.ids         = list(ids)
+        self.index       = {cid: i for i, cid in enumerate(self.ids)}
+        self.trait_names = list(trait_names)
+        self.dim         = dim
+        self.need_weight = need_weight
+        self.gain        = gain
+        self.bias        = bias
+
+        traits = np.asarray(traits, dtype=np.float32)
+        # Row-normalise so consumers with many strong traits don't dominate.
+        totals = traits.sum(axis=1, keepdims=True)
+        self.traits     = traits / np.where(totals == 0, 1.0, totals)
+        self.needs      = _hashed_bow(needs, dim)
+        if need_rows is not None:
+            self.needs = self.needs[need_rows]
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+
+    @classmethod
+    def from_agents(cls, agents: dict, **kwargs) -> "SurrogateScorer":
+        """Build from a consumer_id -> ConsumerAgent map (in its iteration order)."""
+        names = list(TRAIT_KEYWORDS)
+        for agent in agents.values():
+            names.extend(k for k in agent.traits if k not in names)
+        traits = [[float(a.traits.get(n, 0.0)) for n in names] for a in agents.values()]
+        needs  = [" ".join(a.daily_needs) for a in agents.values()]
+        return cls(
+            ids=list(agents),
+            traits=np.array(traits, dtype=np.float32).reshape(len(agents), len(names)),
+            needs=needs,
+            thresholds=np.array([a.threshold for a in agents.values()], dtype=np.float32),
+            trait_names=names,
+            **kwargs
+        )
+
+    @classmethod
+    def from_population(cls, population, **kwargs) -> "SurrogateScorer":
+        """Build straight from a Population's columns, without creating agents."""
+        names = list(population.trait_names)
+        traits = population.trait_matrix()
+        extra = [n for n in TRAIT_KEYWORDS if n not in names]
+        if extra:
+            traits = np.hstack([traits, np.zeros((len(population), len(extra)), dtype=np.float32)])
+        # Populations share a few thousand distinct needs lists: hash each once
+        needs, need_rows = population.distinct_needs()
+        return cls(
+            ids=population.ids,
+            traits=traits,
+            needs=needs,
+            need_rows=need_rows,
+            thresholds=np.frombuffer(population.thresholds, dtype=np.float32),
+            trait_names=names + extra,
+            **kwargs
+        )
+
+    def _post_traits(self, posts: list) -> np.ndarray:
+        mat = np.zeros((len(posts), len(self.trait_names)), dtype=np.float32)
+        for i, post in enumerate(posts):
+            words = _words(f"{post.get('caption', '')} {post.get('usp', '')}")
+            hashtags = " ".join(w for w in (post.get("caption") or "").lower().split() if w.startswith("#"))
+            for j, trait in enumerate(self.trait_names):
+                keys = TRAIT_KEYWORDS.get(trait, [trait.split("_")[0]])
+                hits = sum(1 for w in words if any(w.startswith(k) for k in keys))
+                hits += sum(1 for k in keys if k in hashtags)
+                mat[i, j] = min(1.0, hits / 2.0)
+        return mat
+
+    def affinity(self, posts: list) -> np.ndarray:
+        """C×B matrix of affinities in (0, 1)."""
+        post_traits = self._post_traits(posts)
+        post_words  = _hashed_bow([f"{p.get('caption', '')} {p.get('usp', '')}" for p in posts], self.dim)
+        raw = self.traits @ post_traits.T + self.need_weight * (self.needs @ post_words.T)
+        return 1.0 / (1.0 + np.exp(-self.gain * (raw - self.bias)))
+
+    def triage(self, posts: list, margin: float):
+        """
+        Score every consumer against `posts`.
+        Returns (affinity, escalate) where escalate[c, b] marks pairs inside the
+        uncertainty band around the consumer's decision threshold.
+        """
+        scores   = self.affinity(posts)
+        escalate = np.abs(scores - self.thresholds[:, None]) < margin
+        return scores, escalate
+
+    def decide(self, score: float, threshold: float, margin: float) -> str:
+        if score >= threshold + 2 * margin:
+            return "SHARE"
+        if score >= threshold + margin:
+            return "LIKE"
+        return "IGNORE"
@@ -0,0 +1,94 @@
+# simulation/test_checkpoint.py
+"""Resuming from a checkpoint after a crash (no network): python -m pytest simulation"""
+
+import os
+import shutil
+
+import pytest
+
+from agents.brand_agent import BrandAgent
+from agents.brand_profiles import load_profile
+from agents.consumer_agent import ConsumerAgent, load_consumer_profiles
+from agents.sinks import SQLiteSink
+from interface import store as store_module
+from llm.backends import RuleBasedLLM
+from simulation import determinism
+from simulation.run_simulation import run
+
+SEED = 42
+
+
+def _run(monkeypatch, store, rounds: int, checkpoint: str = None, resume: bool = False) -> dict:
+    """A seeded run on the rule-based stub writing to `store`, with fresh agents."""
+    monkeypatch.setattr(store_module, "DB_PATH", store.path)
+    llm, sink = RuleBasedLLM(), SQLiteSink(store)
+    brands = {}
+    for fname in sorted(os.listdir("agents/brand_profiles")):
+        if fname.endswith(".json"):
+            profile = load_profile(fname)
+            brands[profile["name"]] = BrandAgent(profile, llm=llm, sink=sink)
+    consumers = {cid: ConsumerAgent(p, llm=llm, sink=sink) for cid, p in sorted(load_consumer_profiles().items())}
+    totals = run(rounds=rounds, seed=SEED, brands=brands, consumers=consumers, cache_path=None,
+                 surrogate_margin=None, checkpoint_path=checkpoint, checkpoint_every=1, resume=resume,
+                 verbose=False)
+    sink.flush()
+    return totals
+
+
+def _contents(store) -> tuple:
+    conn = store._conn()
+    campaigns = conn.execute("SELECT id, brand_name, caption, usp, timestamp, round FROM campaigns ORDER BY id").fetchall()
+    reactions = conn.execute("SELECT * FROM reactions ORDER BY consumer_id, post_id").fetchall()
+    return campaigns, reactions
+
+
+@pytest.fixture(autouse=True)
+def reset_determinism():
+    yield
+    determinism.configure(None)
+
+
+def test_resume_after_crash_leaves_no_duplicates(tmp_path, monkeypatch):
+    store = store_module.get_store(str(tmp_path / "resumed.db"))
+    checkpoint = str(tmp_path / "sim.ckpt.gz")
+    _run(monkeypatch, store, 2, checkpoint)
+    shutil.copy(checkpoint, checkpoint + ".round2")
+    # Round 3 reaches the store but the process dies before its checkpoint is written
+    _run(monkeypatch, store, 3, checkpoint, resume=True)
+    shutil.copy(checkpoint + ".round2", checkpoint)
+    first_event = store.last_event_seq()
+
+    totals = _run(monkeypatch, store, 3, checkpoint, resume=True)
+    campaigns, reactions = _contents(store)
+    brands = {c[1] for c in campaigns}
+    assert sorted((c[1], c[5]) for c in campaigns) == sorted((b, r) for b in brands for r in (1, 2, 3))
+    assert totals["campaigns"] == len(campaigns)
+    assert totals["reactions"] == len(reactions)
+    assert [kind for _, kind, _ in store.events_since(first_event)][0] == "feed.reset"
+
+    # Rollups lost the discarded round's counts exactly
+    rollups = {dim: store.analytics(dim) for dim in ("campaign", "brand", "usp", "round", "trait")}
+    store.rebuild_analytics()
+    assert {dim: store.analytics(dim) for dim in rollups} == rollups
+
+    # And the store holds what an uninterrupted run would have written
+    fresh = store_module.get_store(str(tmp_path / "fresh.db"))
+    _run(monkeypatch, fresh, 3)
+    assert _contents(store) == _contents(fresh)
+
+
+def test_discard_keeps_campaigns_outside_the_run(tmp_path):
+    store = store_module.get_store(str(tmp_path / "marketmind.db"))
+    store.add_campaigns([
+        {"id": 1, "brand_name": "A", "usp": "u", "round": 5},      # earlier run, lower id
+        {"id": 10, "brand_name": "A", "usp": "u", "round": None},  # posted to the API
+        {"id": 11, "brand_name": "A", "usp": "u", "round": 3},     # crashed round
+    ])
+    store.add_reactions([{"consumer_id": "c", "post_id": 11, "action": "LIKE"},
+                         {"consumer_id": "c", "post_id": 1, "action": "SHARE"}])
+    assert store.discard_rounds_after(2, after_id=5) == 1
+    assert [c["id"] for c in store.list_campaigns()] == [10, 1]
+    assert store.analytics("campaign", "11") is None
+    assert store.analytics("round", "3") is None
+    assert store.analytics("brand", "A")["reactions"] == 1
+    assert store.discard_rounds_after(2, after_id=5) == 0
@@ -0,0 +1,81 @@
+# simulation/test_sharded.py
+"""Sharded runs with local worker processes on the rule-based stub: python -m pytest simulation"""
+
+import os
+from collections import Counter
+
+import pytest
+
+from agents.brand_agent import BrandAgent
+from agents.brand_profiles import load_profile
+from agents.population import Population
+from agents.profile_generator import generate_profiles, write_profiles
+from agents.sinks import ResponseSink
+from interface import store as store_module
+from llm.backends import RuleBasedLLM
+from simulation import determinism
+from simulation.run_simulation import run
+from simulation.sharded import run_sharded, shard_of
+
+ROUNDS, SEED = 2, 11
+
+
+class _ListSink(ResponseSink):
+    def __init__(self):
+        super().__init__(flush_every=1 << 30)
+        self.campaigns, self.reactions = [], []
+
+    def _write_batch(self, campaigns: list, reactions: list):
+        self.campaigns.extend(campaigns)
+        self.reactions.extend(reactions)
+
+
+def _brands(sink) -> dict:
+    llm = RuleBasedLLM()
+    profiles = [load_profile(f) for f in sorted(os.listdir("agents/brand_profiles")) if f.endswith(".json")]
+    return {p["name"]: BrandAgent(p, llm=llm, sink=sink) for p in profiles}
+
+
+def _key(reaction: dict) -> tuple:
+    return reaction["consumer_id"], reaction["post_id"], reaction["action"], reaction["thought"], reaction["timestamp"]
+
+
+@pytest.fixture
+def population(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "DB_PATH", str(tmp_path / "marketmind.db"))
+    path = str(tmp_path / "population.jsonl")
+    write_profiles(path, 24, seed=5)
+    yield path
+    determinism.configure(None)
+
+
+def _single(population: str) -> _ListSink:
+    sink = _ListSink()
+    consumers = Population.from_jsonl(population).as_agents(RuleBasedLLM(), sink=sink)
+    run(rounds=ROUNDS, seed=SEED, brands=_brands(sink), consumers=consumers, cache_path=None,
+        surrogate_margin=None, checkpoint_path=None, verbose=False)
+    sink.flush()
+    return sink
+
+
+@pytest.mark.parametrize("shards", [2, 3])
+def test_sharded_matches_single_process(population, shards):
+    expected = _single(population)
+
+    brand_sink, sink = _ListSink(), _ListSink()
+    totals = run_sharded(rounds=ROUNDS, shards=shards, address=("127.0.0.1", 0), local_workers=True,
+                         worker_kwargs={"backend": "stub", "population_path": population, "surrogate_margin": None,
+                                        "cache_path": None},
+                         brands=_brands(brand_sink), seed=SEED, sink=sink, round_timeout=120, verbose=False)
+    sink.flush()
+    brand_sink.flush()
+
+    assert sorted(c["id"] for c in brand_sink.campaigns) == sorted(c["id"] for c in expected.campaigns)
+    assert sorted(map(_key, sink.reactions)) == sorted(map(_key, expected.reactions))
+
+    # Every consumer reacts to every campaign exactly once, on exactly one shard
+    consumers = {p["id"] for p in generate_profiles(24, seed=5)}
+    pairs = Counter((r["consumer_id"], r["post_id"]) for r in sink.reactions)
+    assert set(pairs.values()) == {1}
+    assert len(pairs) == len(consumers) * len(brand_sink.campaigns) == totals["reactions"]
+    assert len({shard_of(cid, shards) for cid in consumers}) > 1
@@ -0,0 +1,89 @@
+# simulation/test_surrogate.py
+"""The vectorised surrogate against a per-consumer reference (no network): python -m pytest simulation"""
+
+import math
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from agents.population import Population
+from agents.profile_generator import generate_profiles
+from llm.backends import RuleBasedLLM
+from simulation.surrogate import TRAIT_KEYWORDS, SurrogateScorer
+
+POSTS = [
+    {"caption": "New limited drop: a fresh designer colorway #style", "usp": "trend-forward design"},
+    {"caption": "Built to last, priced to save. Durable soles for every budget.", "usp": "durability"},
+    {"caption": "Recycled uppers that are kind to the planet #eco", "usp": "sustainability"},
+    {"caption": "Join the EnduraStride crew for a morning jog around the neighborhood", "usp": "comfort"},
+    {"caption": "", "usp": ""},
+]
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[a-z']+", (text or "").lower())
+
+
+def _bow(text: str, dim: int) -> dict:
+    counts = {}
+    for w in _words(text):
+        h = zlib.crc32(w.encode("utf-8")) % dim
+        counts[h] = counts.get(h, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {h: v / norm for h, v in counts.items()}
+
+
+def _reference(profile: dict, post: dict, dim=256, need_weight=0.5, gain=6.0, bias=0.35) -> float:
+    """One consumer against one post, the long way."""
+    traits = profile["personality_traits"]
+    total = sum(traits.values()) or 1.0
+    text = f"{post['caption']} {post['usp']}"
+    words = _words(text)
+    hashtags = " ".join(w for w in post["caption"].lower().split() if w.startswith("#"))
+    raw = 0.0
+    for trait, value in traits.items():
+        keys = TRAIT_KEYWORDS.get(trait, [trait.split("_")[0]])
+        hits = sum(1 for w in words if any(w.startswith(k) for k in keys)) + sum(1 for k in keys if k in hashtags)
+        raw += value / total * min(1.0, hits / 2.0)
+    needs, post_words = _bow(" ".join(profile["daily_needs"]), dim), _bow(text, dim)
+    raw += need_weight * sum(v * post_words.get(h, 0.0) for h, v in needs.items())
+    return 1.0 / (1.0 + math.exp(-gain * (raw - bias)))
+
+
+@pytest.fixture
+def profiles():
+    return list(generate_profiles(30, seed=9))
+
+
+@pytest.mark.parametrize("build", ["agents", "population"])
+def test_affinity_matches_reference(profiles, build):
+    pop = Population.from_profiles(profiles)
+    if build == "agents":
+        scorer = SurrogateScorer.from_agents(dict(pop.as_agents(RuleBasedLLM())))
+    else:
+        scorer = SurrogateScorer.from_population(pop)
+    scores = scorer.affinity(POSTS)
+    assert scores.shape == (len(profiles), len(POSTS))
+    expected = np.array([[_reference(p, post) for post in POSTS] for p in profiles])
+    rows = [scorer.index[p["id"]] for p in profiles]
+    np.testing.assert_allclose(scores[rows], expected, atol=1e-5)
+
+
+def test_triage_escalates_the_uncertainty_band(profiles):
+    scorer = SurrogateScorer.from_population(Population.from_profiles(profiles))
+    margin = 0.1
+    _, escalate = scorer.triage(POSTS, margin)
+    distance = np.array([[abs(_reference(p, post) - p["decision_threshold"]) for post in POSTS] for p in profiles])
+    rows = [scorer.index[p["id"]] for p in profiles]
+    clear = np.abs(distance - margin) > 1e-5   # leave out pairs on the band's edge
+    assert 0 < escalate.sum() < escalate.size
+    assert np.array_equal(escalate[rows][clear], (distance < margin)[clear])
+
+
+def test_decide_bands():
+    scorer = SurrogateScorer([], np.zeros((0, 0)), [], np.zeros(0), [])
+    assert scorer.decide(0.70, 0.5, 0.1) == "SHARE"
+    assert scorer.decide(0.65, 0.5, 0.1) == "LIKE"
+    assert scorer.decide(0.55, 0.5, 0.1) == "IGNORE"
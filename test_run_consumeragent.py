@@ -32,7 +32,7 @@ def test_run_consumeragent():
         print(f"Post {r['post_id']}: {r['action']}")
         print(f"  Thought: {r['thought']}\n")
 
-    print("✅ XML files should now be in agents/consumer_responses/{consumer.id}/")
+    print("✅ Reactions recorded in the campaign store (set MARKETMIND_XML_EXPORT=1 for XML copies)")
 
 if __name__ == "__main__":
     test_run_consumeragent()
\ No newline at end of file
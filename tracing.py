@@ -0,0 +1,213 @@
+# tracing.py
+"""
+Lightweight in-process tracing: spans, counters and histograms.
+
+    from tracing import span, traced, inc
+
+    with span("sim.consumer_phase"):
+        ...
+
+    @traced("brand.generate_campaign")
+    def generate_campaign(...): ...
+
+Span durations go into the `marketmind_span_seconds` histogram labelled by
+span name. REGISTRY.render() produces the Prometheus text format (served at
+/metrics by the API, and by the simulation when MARKETMIND_METRICS_PORT is
+set); REGISTRY.report() is the per-run summary table.
+"""
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "marketmind_"
+# Serve the simulation's own /metrics on this port (unset: off).
+METRICS_PORT = os.getenv("MARKETMIND_METRICS_PORT")
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)   # last slot is +Inf
+        self.sum    = 0.0
+        self.count  = 0
+        self.max    = 0.0
+
+
+class Registry:
+    """Thread-safe store of counters and histograms keyed by (name, labels)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets  = tuple(buckets)
+        self._lock    = threading.Lock()
+        self._counters = {}
+        self._hists    = {}
+        self.started  = time.perf_counter()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _key(labels))
+        slot = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = i
+                break
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = _Histogram(len(self.buckets))
+            h.counts[slot] += 1
+            h.sum   += value
+            h.count += 1
+            h.max    = max(h.max, value)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("span_errors_total", span=name, **labels)
+            raise
+        finally:
+            self.observe("span_seconds", time.perf_counter() - started, span=name, **labels)
+
+    def traced(self, name: str):
+        """Decorator: run the function inside span(name)."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._hists.clear()
+            self.started = time.perf_counter()
+
+    # ——— Output ———
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            hists = sorted((k, (list(h.counts), h.sum, h.count)) for k, h in self._hists.items())
+        lines, typed = [], set()
+        for (name, key), value in counters:
+            metric = PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_fmt_labels(key)} {value:g}")
+        for (name, key), (counts, total, count) in hists:
+            metric = PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{_fmt_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_fmt_labels(key)} {total:.6f}")
+            lines.append(f"{metric}_count{_fmt_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _quantile(self, counts: list, count: int, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        target, cumulative = q * count, 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def summary(self) -> list:
+        """One dict per span: count, total/mean/max seconds and approximate p50/p95."""
+        with self._lock:
+            rows = [(dict(key), h.count, h.sum, h.max, list(h.counts))
+                    for (name, key), h in self._hists.items() if name == "span_seconds"]
+            errors = {dict(key).get("span"): v for (name, key), v in self._counters.items()
+                      if name == "span_errors_total"}
+        out = []
+        for labels, count, total, peak, counts in rows:
+            name = labels.pop("span")
+            out.append({
+                "span": name,
+                "labels": labels,
+                "count": count,
+                "total_s": round(total, 4),
+                "mean_ms": round(total / count * 1000, 2) if count else 0.0,
+                "p50_ms": round(min(self._quantile(counts, count, 0.50), peak) * 1000, 2),
+                "p95_ms": round(min(self._quantile(counts, count, 0.95), peak) * 1000, 2),
+                "max_ms": round(peak * 1000, 2),
+                "errors": int(errors.get(name, 0)),
+            })
+        return sorted(out, key=lambda r: -r["total_s"])
+
+    def report(self, wall_seconds: float = None) -> str:
+        """
+        Per-span table, largest total time first, with each span's share of
+        the run. Spans that run concurrently (LLM calls) can exceed 100%.
+        """
+        wall = wall_seconds or (time.perf_counter() - self.started)
+        lines = [f"{'span':<32}{'count':>8}{'total s':>10}{'share':>8}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for r in self.summary():
+            name = r["span"] + ("" if not r["labels"] else "{" + ",".join(f"{k}={v}" for k, v in r["labels"].items()) + "}")
+            lines.append(f"{name[:31]:<32}{r['count']:>8}{r['total_s']:>10.2f}{r['total_s'] / wall:>8.1%}"
+                         f"{r['mean_ms']:>10.1f}{r['p95_ms']:>10.0f}{r['max_ms']:>10.1f}")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+span     = REGISTRY.span
+traced   = REGISTRY.traced
+inc      = REGISTRY.inc
+observe  = REGISTRY.observe
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY):
+    """Serve registry.render() at /metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server